@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RankedObject, ExpertLog, PairwiseMatrix
+from .models import RankedObject, ExpertLog, PairwiseMatrix, ConsensusJob
 
 
 @admin.register(RankedObject)
@@ -19,4 +19,11 @@ class ExpertLogAdmin(admin.ModelAdmin):
 @admin.register(PairwiseMatrix)
 class PairwiseMatrixAdmin(admin.ModelAdmin):
     list_display = ['id', 'created_at']
+    ordering = ['-created_at']
+
+
+@admin.register(ConsensusJob)
+class ConsensusJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status']
     ordering = ['-created_at']
\ No newline at end of file
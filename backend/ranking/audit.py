@@ -0,0 +1,99 @@
+"""Buffered ExpertLog writer.
+
+log_action() queues an entry in memory; a background thread writes the
+queue with one bulk_create once EXPERT_LOG_BATCH_SIZE entries are waiting
+or every EXPERT_LOG_FLUSH_INTERVAL seconds, so requests don't wait on a
+write transaction for their audit line. Whatever is still queued is
+written at interpreter exit. With EXPERT_LOG_ASYNC off (e.g. in tests)
+every entry is saved on the spot instead.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .db import write_transaction
+from .models import ExpertLog
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_pending = []
+_worker = None
+
+# Entries written and entries lost (queue full or failed write) so far
+stats = {"flushed": 0, "dropped": 0}
+
+
+def log_action(action, payload, expert=None):
+    # Stamped now, not at flush time, so the log keeps its order
+    entry = ExpertLog(
+        expert=expert, action=action, payload=payload, timestamp=timezone.now()
+    )
+    if not settings.EXPERT_LOG_ASYNC:
+        entry.save()
+        with _lock:
+            stats["flushed"] += 1
+        return
+    with _lock:
+        if len(_pending) >= settings.EXPERT_LOG_MAX_PENDING:
+            stats["dropped"] += 1
+            return
+        _pending.append(entry)
+        full = len(_pending) >= settings.EXPERT_LOG_BATCH_SIZE
+    _start_worker()
+    if full:
+        _wakeup.set()
+
+
+def flush_logs():
+    """Writes every queued entry now; returns how many were written."""
+    with _lock:
+        batch = _pending[:]
+        _pending.clear()
+    if not batch:
+        return 0
+    try:
+        with write_transaction():
+            ExpertLog.objects.bulk_create(batch)
+    except Exception:
+        logger.exception("Dropping %d expert log entries", len(batch))
+        with _lock:
+            stats["dropped"] += len(batch)
+        return 0
+    with _lock:
+        stats["flushed"] += len(batch)
+    return len(batch)
+
+
+def log_stats():
+    with _lock:
+        return {**stats, "pending": len(_pending)}
+
+
+def _run_worker():
+    while True:
+        _wakeup.wait(settings.EXPERT_LOG_FLUSH_INTERVAL)
+        _wakeup.clear()
+        flush_logs()
+        # The thread keeps no connection open between flushes
+        connection.close()
+
+
+def _start_worker():
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(
+            target=_run_worker, name="expert-log-writer", daemon=True
+        )
+        _worker.start()
+
+
+atexit.register(flush_logs)
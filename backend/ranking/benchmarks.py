@@ -0,0 +1,348 @@
+"""Reproducible benchmarks for the consensus engine and the API hot paths.
+
+Used by ``manage.py benchmark``. Every input comes from a seeded RNG, so
+two runs on the same machine measure the same work and a saved JSON
+baseline can flag regressions.
+"""
+
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from .cache import invalidate_consensus_cache
+from .heuristics import HEURISTIC_SOLVERS
+from .models import Expert, PairwiseMatrix, RankedObject
+from .views import calculate_consensus_stream
+
+# Input shapes: independent random (partly partial) rankings; reversed
+# pairs of one order, where huge numbers of orders tie; cyclic shifts of
+# one order, where every pair is contested and search bounds are weakest
+EXPERT_KINDS = ["random", "ties", "adversarial"]
+
+# Largest n each solver is benchmarked at by default. The exhaustive ones
+# grow as n!, so past these every case of theirs just runs into the
+# timeout and a full grid takes hours; --all-sizes lifts the caps to set
+# them against the exact solvers at 10-12 anyway.
+SOLVER_MAX_N = {
+    "exhaustive": 8,
+    "sjt": 9,
+    "vectorized": 9,
+    "exact": 12,
+    **{solver: 12 for solver in HEURISTIC_SOLVERS},
+}
+
+FULL_GRID = {
+    "solvers": ["exhaustive", "vectorized", "sjt", "exact", "local_search"],
+    "sizes": [4, 6, 8, 10, 12],
+    "experts": [1, 10, 50, 200],
+}
+QUICK_GRID = {
+    "solvers": ["exhaustive", "vectorized", "sjt", "exact", "local_search"],
+    "sizes": [4, 6, 8],
+    "experts": [1, 10, 50],
+}
+
+
+def synthetic_experts(n, m, kind, seed):
+    """(objects, obj_ids, expert_data) as load_consensus_inputs returns them."""
+    rnd = random.Random(f"{kind}-{n}-{m}-{seed}")
+    obj_ids = list(range(1, n + 1))
+    objects = {oid: RankedObject(id=oid, name=f"Object {oid}") for oid in obj_ids}
+    base = obj_ids[:]
+    rnd.shuffle(base)
+    expert_data = []
+    for e in range(m):
+        if kind == "ties":
+            order = base if e % 2 == 0 else base[::-1]
+            weight = 1.0
+        elif kind == "adversarial":
+            shift = e % n
+            order = base[shift:] + base[:shift]
+            weight = 1.0
+        else:
+            order = rnd.sample(obj_ids, n)
+            if rnd.random() < 0.3:
+                order = order[: rnd.randint(1, n)]
+            weight = rnd.choice([0.5, 1.0, 2.0])
+        expert_data.append(
+            {
+                "name": f"Expert {e + 1}",
+                "order": list(order),
+                "ranks": {oid: idx + 1 for idx, oid in enumerate(order)},
+                "weight": weight,
+            }
+        )
+    return objects, obj_ids, expert_data
+
+
+def run_stream(stream, timeout):
+    """Consumes SSE events up to the result; returns (seconds, payload).
+
+    The payload is None when the run went past ``timeout`` seconds.
+    """
+    start = time.perf_counter()
+    try:
+        for event in stream:
+            if '"type": "result"' in event:
+                return time.perf_counter() - start, json.loads(event[6:])
+            if time.perf_counter() - start > timeout:
+                return time.perf_counter() - start, None
+    finally:
+        stream.close()
+    return time.perf_counter() - start, None
+
+
+def bench_engine(solver, n, m, kind, seed, timeout, memory):
+    objects, obj_ids, expert_data = synthetic_experts(n, m, kind, seed)
+
+    def stream():
+        return calculate_consensus_stream(
+            expert_data,
+            objects,
+            obj_ids,
+            solver=solver,
+            solution_limit=settings.CONSENSUS_SOLUTION_LIMIT or None,
+            # Engine runs only; nothing is written to the database
+            store=False,
+        )
+
+    seconds, result = run_stream(stream(), timeout)
+    case = {
+        "name": f"engine/{solver}/n{n}/m{m}/{kind}",
+        "seconds": round(seconds, 6),
+        "timed_out": result is None,
+    }
+    if result is None:
+        return case
+    case["solve_seconds"] = round(result["execution_time"], 6)
+    if solver not in HEURISTIC_SOLVERS:
+        case["perms_per_sec"] = round(math.factorial(n) / max(seconds, 1e-9))
+    case["criteria"] = result["criteria"]
+    case["solution_counts"] = result["solution_counts"]
+    if memory:
+        tracemalloc.start()
+        run_stream(stream(), timeout)
+        case["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return case
+
+
+def engine_cases(grid, seed, timeout, memory, log=None, all_sizes=False):
+    cases = []
+    for solver in grid["solvers"]:
+        for n in grid["sizes"]:
+            if n > SOLVER_MAX_N[solver] and not all_sizes:
+                continue
+            for m in grid["experts"]:
+                for kind in EXPERT_KINDS:
+                    case = bench_engine(solver, n, m, kind, seed, timeout, memory)
+                    if log:
+                        log(case)
+                    cases.append(case)
+    return cases
+
+
+def timed(fn, repeat):
+    """Median and max seconds of ``repeat`` calls of ``fn``."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[-1]
+
+
+def percentile(samples, q):
+    """The ``q`` (0..1) percentile of sorted ``samples``, nearest rank."""
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def concurrent_saves(obj_ids, expert_ids, writers, saves, seed):
+    """``writers`` threads posting ``saves`` rankings each, all at once.
+
+    Returns the sorted latencies and how many saves failed (e.g. with
+    "database is locked").
+    """
+    barrier = threading.Barrier(writers)
+    lock = threading.Lock()
+    latencies = []
+    failed = [0]
+
+    def writer(index):
+        rnd = random.Random(seed + index)
+        client = Client(raise_request_exception=False)
+        try:
+            barrier.wait()
+            for _ in range(saves):
+                start = time.perf_counter()
+                # As the frontend saves: without the matrix in the reply
+                response = client.post(
+                    "/api/save-ranking/?fields=id,expert,created_at",
+                    {
+                        "order": rnd.sample(obj_ids, len(obj_ids)),
+                        "expertId": rnd.choice(expert_ids),
+                    },
+                    content_type="application/json",
+                )
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    if response.status_code != 200:
+                        failed[0] += 1
+        finally:
+            # Each thread has its own connection
+            connection.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), failed[0]
+
+
+def populate_db(objects, experts, rankings, seed):
+    rnd = random.Random(seed)
+    RankedObject.objects.bulk_create(
+        [RankedObject(name=f"Object {i}") for i in range(objects)]
+    )
+    obj_ids = list(RankedObject.objects.values_list("id", flat=True))
+    Expert.objects.bulk_create([Expert(name=f"Expert {i}") for i in range(experts)])
+    for expert in Expert.objects.all():
+        batch = [
+            PairwiseMatrix(
+                expert=expert, order_json=json.dumps(rnd.sample(obj_ids, len(obj_ids)))
+            )
+            for _ in range(rankings)
+        ]
+        PairwiseMatrix.objects.bulk_create(batch)
+        expert.latest_ranking = (
+            PairwiseMatrix.objects.filter(expert=expert).order_by("-id").first()
+        )
+        expert.save(update_fields=["latest_ranking"])
+    return obj_ids
+
+
+def api_cases(objects, experts, rankings, seed, repeat, writers=50, log=None):
+    """Times the DB-heavy endpoints on a throwaway populated database (an
+    SQLite file, or a test database on PostgreSQL), then save-ranking/
+    under ``writers`` concurrent writers."""
+    workdir = tempfile.mkdtemp(prefix="ranking-bench-")
+    if connection.vendor == "sqlite":
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(
+            workdir, "bench.sqlite3"
+        )
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    log_async = settings.EXPERT_LOG_ASYNC
+    settings.EXPERT_LOG_ASYNC = False
+    cases = []
+    try:
+        obj_ids = populate_db(objects, experts, rankings, seed)
+        client = Client()
+        rnd = random.Random(seed)
+        expert_ids = list(Expert.objects.values_list("id", flat=True))
+        shape = f"o{objects}/e{experts}/r{rankings}"
+
+        def save_ranking():
+            order = rnd.sample(obj_ids, len(obj_ids))
+            client.post(
+                "/api/save-ranking/",
+                {"order": order, "expertId": rnd.choice(expert_ids)},
+                content_type="application/json",
+            )
+
+        def collective_csv():
+            response = client.get("/api/collective-csv/")
+            for _ in response.streaming_content:
+                pass
+
+        def consensus():
+            invalidate_consensus_cache()
+            response = client.post(
+                "/api/calculate-consensus/",
+                {"solver": "local_search"},
+                content_type="application/json",
+            )
+            for _ in response.streaming_content:
+                pass
+
+        for name, fn in (
+            ("save_ranking", save_ranking),
+            ("collective_csv", collective_csv),
+            ("calculate_consensus", consensus),
+        ):
+            median, worst = timed(fn, repeat)
+            case = {
+                "name": f"api/{name}/{shape}",
+                "seconds": round(median, 6),
+                "max_seconds": round(worst, 6),
+            }
+            if log:
+                log(case)
+            cases.append(case)
+
+        if writers:
+            latencies, failed = concurrent_saves(
+                obj_ids, expert_ids, writers, repeat, seed
+            )
+            case = {
+                "name": f"api/save_ranking_concurrent/{shape}/w{writers}",
+                "seconds": round(percentile(latencies, 0.5), 6),
+                "p99_seconds": round(percentile(latencies, 0.99), 6),
+                "max_seconds": round(latencies[-1], 6),
+                "failed": failed,
+            }
+            if log:
+                log(case)
+            cases.append(case)
+    finally:
+        settings.EXPERT_LOG_ASYNC = log_async
+        invalidate_consensus_cache()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return cases
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# Cases faster than this in both runs are too noisy to compare
+COMPARE_MIN_SECONDS = 0.05
+
+
+def compare(cases, baseline, tolerance):
+    """Cases slower than their baseline by more than ``tolerance`` (a
+    fraction), as (name, baseline seconds, seconds)."""
+    before = {case["name"]: case for case in baseline.get("cases", [])}
+    slower = []
+    for case in cases:
+        old = before.get(case["name"])
+        if not old or old.get("timed_out") or case.get("timed_out"):
+            continue
+        if max(old["seconds"], case["seconds"]) < COMPARE_MIN_SECONDS:
+            continue
+        if case["seconds"] > old["seconds"] * (1 + tolerance):
+            slower.append((case["name"], old["seconds"], case["seconds"]))
+    return slower
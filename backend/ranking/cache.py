@@ -0,0 +1,80 @@
+"""Content-addressed cache of consensus results.
+
+Results are stored under a hash of everything that shapes them: the
+objects, each expert's latest order and weight, and the criteria and
+solution limit. Every exact solver gives the same result for the same
+inputs, so only the heuristic solvers get their own keys, and the exact
+one when it may stop counting ties at the solution limit.
+Entries live in a small in-process LRU ("consensus" cache) backed by a
+size-bounded on-disk store ("consensus_disk").
+
+Apart from them, the "consensus_warm" cache keeps the last optimum of
+each criterion per set of objects. It survives invalidation, so after an
+expert re-saves a ranking the next run can start from the old optimum.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import caches
+
+from .heuristics import HEURISTIC_SOLVERS
+
+
+def consensus_cache_key(
+    expert_data,
+    objects,
+    obj_ids,
+    criteria,
+    solution_limit,
+    solver="exhaustive",
+    count_ties=False,
+):
+    inputs = {
+        "objects": [[oid, objects[oid].name] for oid in obj_ids],
+        "experts": [[e["name"], e["order"], e["weight"]] for e in expert_data],
+        "criteria": criteria,
+        "solution_limit": solution_limit,
+    }
+    if solver == "exact" and solution_limit and not count_ties:
+        inputs["counts"] = "lower_bound"
+    if solver in HEURISTIC_SOLVERS:
+        inputs["solver"] = solver
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+    return f"consensus:{digest}"
+
+
+def get_cached_result(key):
+    result = caches["consensus"].get(key)
+    if result is None:
+        result = caches["consensus_disk"].get(key)
+        if result is not None:
+            caches["consensus"].set(key, result)
+    return result
+
+
+def store_result(key, result):
+    caches["consensus"].set(key, result)
+    caches["consensus_disk"].set(key, result)
+
+
+def invalidate_consensus_cache():
+    """Drops every stored result; called whenever objects or rankings change."""
+    caches["consensus"].clear()
+    caches["consensus_disk"].clear()
+
+
+def warm_start_key(obj_ids):
+    digest = hashlib.sha256(json.dumps(sorted(obj_ids)).encode()).hexdigest()
+    return f"consensus-warm:{digest}"
+
+
+def get_warm_start(obj_ids):
+    """{criterion: {"order", "distances"}} of the last run on these objects."""
+    return caches["consensus_warm"].get(warm_start_key(obj_ids)) or {}
+
+
+def store_warm_start(obj_ids, state):
+    # Merged, so a run on some of the criteria keeps the others' optima
+    key = warm_start_key(obj_ids)
+    caches["consensus_warm"].set(key, {**get_warm_start(obj_ids), **state})
@@ -0,0 +1,1231 @@
+"""Consensus search engines: the exhaustive oracle and exact solvers."""
+
+import heapq
+import itertools
+import math
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+# Values accepted in the "solver" field of calculate-consensus/
+CONSENSUS_SOLVERS = ["exhaustive", "vectorized", "sjt", "exact"]
+
+# (result key, distance, aggregate) for every criterion the exact solver runs
+EXACT_SEARCHES = [
+    ("k1_rank", "rank", "sum"),
+    ("k2_rank", "rank", "max"),
+    ("k1_hamming", "hamming", "sum"),
+    ("k2_hamming", "hamming", "max"),
+]
+CRITERIA = [key for key, _, _ in EXACT_SEARCHES]
+
+# The Kemeny subset DP keeps one float per subset of objects (8 MB at 20)
+KEMENY_DP_MAX_N = 20
+
+
+def new_tracker(limit=None, stream=False, count_all=False):
+    """Best value so far, its first ``limit`` tied solutions and the number
+    of ties.
+
+    With ``stream`` set, every new tie is also queued in ``pending`` (and
+    ``reset`` flags an improved value) until the consensus stream drains
+    it into a ``solutions`` event.
+
+    The exhaustive engines see every order and always count all ties. The
+    exact solvers stop looking for ties once ``count_settled`` and clear
+    ``count_exact``, so ``count`` is then a lower bound; ``count_all``
+    makes them go on and count every tie.
+    """
+    return {
+        "val": float("inf"),
+        "solutions": [],
+        "count": 0,
+        "limit": limit,
+        "pending": [] if stream else None,
+        "reset": False,
+        "count_all": count_all,
+        "count_exact": True,
+    }
+
+
+def new_trackers(limit=None, stream=False, count_all=False):
+    return {key: new_tracker(limit, stream, count_all) for key in CRITERIA}
+
+
+def tracker_full(tracker):
+    limit = tracker["limit"]
+    return limit is not None and len(tracker["solutions"]) >= limit
+
+
+def count_settled(tracker):
+    """Whether more ties of the current value would change nothing but the
+    count: the tracker is full, streams nothing and need not count all."""
+    return (
+        tracker_full(tracker)
+        and tracker["pending"] is None
+        and not tracker["count_all"]
+    )
+
+
+def update_best(tracker, val, order, dists):
+    if val < tracker["val"]:
+        tracker["val"] = val
+        tracker["solutions"] = []
+        tracker["count"] = 0
+        # Ties skipped so far were of the old value
+        tracker["count_exact"] = True
+        if tracker["pending"] is not None:
+            tracker["pending"] = []
+            tracker["reset"] = True
+    elif val != tracker["val"]:
+        return
+    tracker["count"] += 1
+    keep = not tracker_full(tracker)
+    if keep or tracker["pending"] is not None:
+        sol = {"order": list(order), "distances": list(dists)}
+        if keep:
+            tracker["solutions"].append(sol)
+        if tracker["pending"] is not None:
+            tracker["pending"].append(sol)
+
+
+def drain_pending(tracker):
+    """Takes the ties queued for streaming; returns (reset, solutions)."""
+    pending = tracker["pending"] or []
+    reset = tracker["reset"]
+    if tracker["pending"] is not None:
+        tracker["pending"] = []
+    tracker["reset"] = False
+    return reset, pending
+
+
+def hamming_distance(cand_pairs, exp_pairs):
+    return len(cand_pairs.symmetric_difference(exp_pairs))
+
+
+def rank_distance(cand_ranks, exp_ranks, obj_ids):
+    n = len(obj_ids)
+    d = 0
+    for oid in obj_ids:
+        r_exp = exp_ranks.get(oid, n + 1)
+        d += abs(cand_ranks[oid] - r_exp)
+    return d
+
+
+def expert_distance(exp_ranks, order, criterion):
+    """Rank or Hamming distance of one expert (``exp_ranks``) from ``order``
+    (object ids), without the expert's pair set."""
+    n = len(order)
+    if criterion == "rank":
+        return sum(
+            abs(p + 1 - exp_ranks.get(oid, n + 1)) for p, oid in enumerate(order)
+        )
+    d = 0
+    for i, a in enumerate(order):
+        ra = exp_ranks.get(a)
+        for b in order[i + 1 :]:
+            rb = exp_ranks.get(b)
+            if ra is None or rb is None:
+                d += 1
+            elif rb < ra:
+                d += 2
+    return d
+
+
+def lex_permutations(items, start=0, stop=None):
+    """``itertools.permutations(items)`` restricted to indexes [start, stop).
+
+    The index of a permutation is its position in lexicographic order; in
+    the factorial number system each digit picks one of the remaining
+    items, so the range splits into whole subtrees handed to
+    ``itertools.permutations`` plus partial ones we recurse into.
+    """
+    total = math.factorial(len(items))
+    stop = total if stop is None else min(stop, total)
+    yield from _lex_range((), tuple(items), start, stop)
+
+
+def _lex_range(prefix, rest, start, stop):
+    size = math.factorial(len(rest))
+    if start >= stop:
+        return
+    if start == 0 and stop == size:
+        for tail in itertools.permutations(rest):
+            yield prefix + tail
+        return
+    sub = size // len(rest)
+    for i, item in enumerate(rest):
+        lo = max(start - i * sub, 0)
+        hi = min(stop - i * sub, sub)
+        if lo < hi:
+            yield from _lex_range(prefix + (item,), rest[:i] + rest[i + 1 :], lo, hi)
+
+
+def merge_trackers(first, second):
+    """Combines trackers of two consecutive enumeration ranges, in order."""
+    if second["val"] < first["val"]:
+        return second
+    if second["val"] == first["val"]:
+        merged = dict(first)
+        merged["count"] = first["count"] + second["count"]
+        merged["count_exact"] = first["count_exact"] and second["count_exact"]
+        merged["solutions"] = first["solutions"] + second["solutions"]
+        if first["limit"] is not None:
+            merged["solutions"] = merged["solutions"][: first["limit"]]
+        return merged
+    return first
+
+
+def exhaustive_search(
+    prepared_experts, obj_ids, start=0, stop=None, trackers=None, criteria=CRITERIA
+):
+    """Scores every permutation under the requested criteria.
+
+    ``start``/``stop`` restrict the search to a range of lexicographic
+    permutation indexes. K1 values come from the aggregated matrices of
+    ``build_aggregate_tables``; only K2 and candidates that may tie or beat
+    a K1 best are scored expert by expert. Yields the number of candidates
+    checked every 2000 permutations and returns the four trackers keyed
+    like the ``rankings`` payload (``trackers`` if given, fresh unbounded
+    ones otherwise; criteria not requested are left untouched).
+    """
+    n = len(obj_ids)
+    if trackers is None:
+        trackers = new_trackers()
+    best_k1_r = trackers["k1_rank"]
+    best_k2_r = trackers["k2_rank"]
+    best_k1_h = trackers["k1_hamming"]
+    best_k2_h = trackers["k2_hamming"]
+    want = set(criteria)
+    need_k2 = "k2_rank" in want or "k2_hamming" in want
+
+    tables = build_cost_tables(prepared_experts, obj_ids)
+    weights = [t["weight"] for t in tables]
+    agg = build_aggregate_tables(tables, n)
+    position = agg["position"].tolist()
+    precedence = agg["precedence"].tolist()
+
+    count = 0
+    for perm in lex_permutations(range(n), start, stop):
+        count += 1
+        cand_order = [obj_ids[i] for i in perm]
+        d_ranks_vector = None
+        d_hams_vector = None
+
+        if need_k2:
+            cand_ranks = {oid: i + 1 for i, oid in enumerate(cand_order)}
+            cand_pairs = set()
+            for i in range(n):
+                for j in range(i + 1, n):
+                    cand_pairs.add((cand_order[i], cand_order[j]))
+            d_ranks_vector = []
+            d_hams_vector = []
+            for exp in prepared_experts:
+                d_ranks_vector.append(rank_distance(cand_ranks, exp["ranks"], obj_ids))
+                d_hams_vector.append(hamming_distance(cand_pairs, exp["pairs"]))
+            if "k2_rank" in want:
+                max_rank = max(d_ranks_vector, default=0)
+                update_best(best_k2_r, max_rank, cand_order, d_ranks_vector)
+            if "k2_hamming" in want:
+                max_ham = max(d_hams_vector, default=0)
+                update_best(best_k2_h, max_ham, cand_order, d_hams_vector)
+
+        # With the K2 vectors at hand K1 is just their weighted sum
+        if "k1_rank" in want and d_ranks_vector is None:
+            sum_rank = 0.0
+            for p in range(n):
+                sum_rank += position[perm[p]][p]
+            if sum_rank <= best_k1_r["val"] + k1_tolerance(best_k1_r["val"]):
+                d_ranks_vector = order_dists(tables, perm, "rank")
+        if "k1_rank" in want and d_ranks_vector is not None:
+            val = aggregate_value(d_ranks_vector, weights, "sum")
+            update_best(best_k1_r, val, cand_order, d_ranks_vector)
+        if "k1_hamming" in want and d_hams_vector is None:
+            sum_ham = 0.0
+            for i in range(n):
+                row = precedence[perm[i]]
+                for j in range(i + 1, n):
+                    sum_ham += row[perm[j]]
+            if sum_ham <= best_k1_h["val"] + k1_tolerance(best_k1_h["val"]):
+                d_hams_vector = order_dists(tables, perm, "hamming")
+        if "k1_hamming" in want and d_hams_vector is not None:
+            val = aggregate_value(d_hams_vector, weights, "sum")
+            update_best(best_k1_h, val, cand_order, d_hams_vector)
+
+        if count % 2000 == 0:
+            yield count
+
+    return trackers
+
+
+def build_cost_tables(prepared_experts, obj_ids, with_pairs=True):
+    """Index-based per-expert rank and pair-penalty tables for the solvers.
+
+    The O(n^2) pair penalties are only needed by the Hamming criteria and
+    can be skipped with ``with_pairs=False``.
+    """
+    n = len(obj_ids)
+    tables = []
+    for exp in prepared_experts:
+        ranks = [exp["ranks"].get(oid, n + 1) for oid in obj_ids]
+        if not with_pairs:
+            tables.append({"weight": exp["weight"], "ranks": ranks, "pen": None})
+            continue
+        pairs = exp["pairs"]
+        # pen[a][b] = Hamming cost of placing a before b:
+        # 0 if the expert agrees, 2 if they disagree, 1 if they didn't rank both
+        pen = [[0] * n for _ in range(n)]
+        for a in range(n):
+            for b in range(n):
+                if a == b:
+                    continue
+                if (obj_ids[a], obj_ids[b]) in pairs:
+                    pen[a][b] = 0
+                elif (obj_ids[b], obj_ids[a]) in pairs:
+                    pen[a][b] = 2
+                else:
+                    pen[a][b] = 1
+        tables.append({"weight": exp["weight"], "ranks": ranks, "pen": pen})
+    return tables
+
+
+def position_costs(weights, rank_rows, n):
+    """``cost[o, p]``: weighted footrule cost of object o at position p + 1,
+    summed over the experts."""
+    positions = np.arange(1, n + 1)
+    cost = np.zeros((n, n))
+    for w, row in zip(weights, rank_rows):
+        cost += w * np.abs(positions[None, :] - np.asarray(row)[:, None])
+    return cost
+
+
+def precedence_costs(weights, pens, n):
+    """``cost[a, b]``: weighted Hamming cost of a anywhere before b, summed
+    over the experts."""
+    cost = np.zeros((n, n))
+    for w, pen in zip(weights, pens):
+        cost += w * np.asarray(pen, dtype=float).reshape(n, n)
+    return cost
+
+
+def build_aggregate_tables(tables, n):
+    """The K1 criteria of all experts folded into two n x n matrices.
+
+    The weighted footrule of an order is the sum of ``position`` over its
+    (object, position) cells and its weighted Hamming distance the sum of
+    ``precedence`` over its ordered pairs, so K1 scoring costs the same
+    whatever the number of experts. ``precedence`` is None for tables
+    built without pairs.
+    """
+    weights = [t["weight"] for t in tables]
+    with_pairs = bool(tables) and tables[0]["pen"] is not None
+    return {
+        "position": position_costs(weights, [t["ranks"] for t in tables], n),
+        "precedence": (
+            precedence_costs(weights, [t["pen"] for t in tables], n)
+            if with_pairs or not tables
+            else None
+        ),
+    }
+
+
+def order_dists(tables, order, criterion):
+    """Per-expert rank or Hamming distances of ``order`` (object indexes)."""
+    if criterion == "rank":
+        return [
+            sum(abs(p + 1 - t["ranks"][o]) for p, o in enumerate(order))
+            for t in tables
+        ]
+    return [
+        sum(t["pen"][a][b] for i, a in enumerate(order) for b in order[i + 1 :])
+        for t in tables
+    ]
+
+
+# Decimals K1 values are rounded to: orders whose weighted sums only differ
+# by float rounding (0.3 * 3 against 0.9) are ties, so every engine keeps
+# the same first ties whether or not it goes on to see the rest
+K1_DIGITS = 9
+
+
+def k1_tolerance(val):
+    # Aggregated K1 sums add the same terms in another order than the
+    # per-expert ones, so they can differ from them in the last bits; a
+    # candidate this close to the best is re-scored expert by expert
+    if val == float("inf"):
+        return val
+    return 1e-9 * max(1.0, abs(val))
+
+
+def aggregate_value(dists, weights, aggregate):
+    """K1 (weighted sum) or K2 (max) value of a distance vector.
+
+    Summed in expert order and rounded to ``K1_DIGITS``, exactly like the
+    exhaustive loop, so ties compare equal bit for bit.
+    """
+    if aggregate == "max":
+        return max(dists, default=0)
+    val = 0
+    for d, w in zip(dists, weights):
+        val += d * w
+    return round(val, K1_DIGITS)
+
+
+def _take_block(tracker, vals, perms, dists, obj_ids, cast):
+    # Block version of update_best; rows are already in enumeration order.
+    # cast turns the NumPy minimum into the plain number the scalar loop has
+    low = cast(vals.min())
+    if low > tracker["val"]:
+        return
+    rows = np.flatnonzero(vals == low)
+    for i, row in enumerate(rows):
+        if low == tracker["val"] and tracker_full(tracker) and tracker["pending"] is None:
+            # Nothing more to store, just count the rest
+            tracker["count"] += len(rows) - i
+            break
+        update_best(
+            tracker,
+            low,
+            [obj_ids[j] for j in perms[row]],
+            [int(d) for d in dists[:, row]],
+        )
+
+
+def _take_k1_block(tracker, agg_vals, perms, dists_of, weights, obj_ids, cast):
+    # Block K1 update from aggregated values: only the rows that can tie
+    # the block minimum are scored per expert (``dists_of(rows)``), and
+    # summed expert by expert like the scalar loop
+    low = agg_vals.min()
+    if low > tracker["val"] + k1_tolerance(tracker["val"]):
+        return
+    rows = np.flatnonzero(agg_vals <= low + k1_tolerance(low))
+    dists = dists_of(rows)
+    vals = np.zeros(len(rows))
+    for e in range(len(weights)):
+        vals += dists[e] * weights[e]
+    # Python's rounding, as aggregate_value does it
+    vals = np.array([round(val, K1_DIGITS) for val in vals.tolist()])
+    _take_block(tracker, vals, perms[rows], dists, obj_ids, cast)
+
+
+def vectorized_search(
+    prepared_experts,
+    obj_ids,
+    start=0,
+    stop=None,
+    trackers=None,
+    block_size=None,
+    criteria=CRITERIA,
+):
+    """Exhaustive search scored a block of permutations at a time with NumPy.
+
+    Permutations come from ``lex_permutations`` in the same order as
+    ``exhaustive_search`` and are packed into (block, n) index arrays. K1
+    values of a block are lookups in the aggregated n x n matrices; for K2
+    the expert ranks are an experts x objects matrix and the pair
+    penalties an experts x n^2 table, so every criterion of a block is a
+    handful of array operations. Yields candidates checked after every
+    block and returns the same trackers as ``exhaustive_search``.
+    """
+    n = len(obj_ids)
+    m = len(prepared_experts)
+    tables = build_cost_tables(prepared_experts, obj_ids)
+    weights = np.array([t["weight"] for t in tables], dtype=float)
+    ranks = np.array([t["ranks"] for t in tables], dtype=np.int32).reshape(m, n)
+    pens = np.array([t["pen"] for t in tables], dtype=np.int32).reshape(m, n * n)
+    agg = build_aggregate_tables(tables, n)
+    position = agg["position"]
+    precedence = agg["precedence"].reshape(n * n)
+    positions = np.arange(1, n + 1, dtype=np.int32)
+    columns = np.arange(n)
+    first, second = np.triu_indices(n, k=1)
+    want = set(criteria)
+    need_k2 = "k2_rank" in want or "k2_hamming" in want
+    if block_size is None:
+        # Keep the largest intermediate around 4M cells; without K2 it has
+        # no experts axis
+        width = max(1, n, len(first)) * (max(1, m) if need_k2 else 1)
+        block_size = max(1, (1 << 22) // width)
+
+    if trackers is None:
+        trackers = new_trackers()
+    # The scalar loop's K1 sums are floats unless there are no experts
+    sum_cast = float if m else int
+    perms = lex_permutations(range(n), start, stop)
+    count = 0
+    while True:
+        chunk = list(itertools.islice(perms, block_size))
+        if not chunk:
+            break
+        block = np.array(chunk, dtype=np.int32).reshape(len(chunk), n)
+        pair_idx = block[:, first] * n + block[:, second]
+
+        d_ranks = d_hams = None
+        if need_k2:
+            d_ranks = np.abs(ranks[:, block] - positions).sum(axis=2)
+            d_hams = pens[:, pair_idx].sum(axis=2)
+            max_rank = d_ranks.max(axis=0, initial=0)
+            max_ham = d_hams.max(axis=0, initial=0)
+            if "k2_rank" in want:
+                _take_block(
+                    trackers["k2_rank"], max_rank, block, d_ranks, obj_ids, int
+                )
+            if "k2_hamming" in want:
+                _take_block(
+                    trackers["k2_hamming"], max_ham, block, d_hams, obj_ids, int
+                )
+
+        def rank_dists(rows):
+            if d_ranks is not None:
+                return d_ranks[:, rows]
+            return np.abs(ranks[:, block[rows]] - positions).sum(axis=2)
+
+        def ham_dists(rows):
+            if d_hams is not None:
+                return d_hams[:, rows]
+            return pens[:, pair_idx[rows]].sum(axis=2)
+
+        if "k1_rank" in want:
+            agg_rank = position[block, columns].sum(axis=1)
+            _take_k1_block(
+                trackers["k1_rank"],
+                agg_rank,
+                block,
+                rank_dists,
+                weights,
+                obj_ids,
+                sum_cast,
+            )
+        if "k1_hamming" in want:
+            agg_ham = precedence[pair_idx].sum(axis=1)
+            _take_k1_block(
+                trackers["k1_hamming"],
+                agg_ham,
+                block,
+                ham_dists,
+                weights,
+                obj_ids,
+                sum_cast,
+            )
+
+        count += len(chunk)
+        yield count
+
+    return trackers
+
+
+def plain_changes(n):
+    """Adjacent swaps that walk all n! permutations (Steinhaus-Johnson-Trotter).
+
+    Knuth's Algorithm P: yields the left position ``p`` of each swap of
+    positions ``p`` and ``p + 1``, amortized O(1) per step.
+    """
+    c = [0] * (n + 1)
+    o = [1] * (n + 1)
+    while True:
+        j = n
+        s = 0
+        while True:
+            if j < 1:
+                return
+            q = c[j] + o[j]
+            if q < 0:
+                o[j] = -o[j]
+                j -= 1
+                continue
+            if q == j:
+                if j == 1:
+                    return
+                s += 1
+                o[j] = -o[j]
+                j -= 1
+                continue
+            break
+        left = j - max(c[j], q) + s
+        c[j] = q
+        # Knuth's positions are 1-based
+        yield left - 1
+
+
+def sjt_search(prepared_experts, obj_ids, trackers=None, criteria=CRITERIA):
+    """Exhaustive search visiting permutations by adjacent transpositions.
+
+    Swapping neighbours a, b changes the aggregated K1 values through four
+    position costs and one pair, and each expert's K2 distances through
+    two rank terms and one pair, so every candidate costs O(1) for K1 and
+    O(m) for K2 instead of O(n^2 * m). Ties are sorted back into
+    lexicographic order at the end, and a bounded tracker keeps the
+    lexicographically first ones rather than the first found, so the
+    result matches ``exhaustive_search`` exactly.
+    """
+    n = len(obj_ids)
+    m = len(prepared_experts)
+    tables = build_cost_tables(prepared_experts, obj_ids)
+    weights = [t["weight"] for t in tables]
+    rank_rows = [t["ranks"] for t in tables]
+    pens = [t["pen"] for t in tables]
+    agg = build_aggregate_tables(tables, n)
+    position = agg["position"].tolist()
+    precedence = agg["precedence"].tolist()
+    want = set(criteria)
+    need_k2 = "k2_rank" in want or "k2_hamming" in want
+
+    perm = list(range(n))
+    d_ranks = d_hams = None
+    if need_k2:
+        d_ranks = [sum(abs(p + 1 - row[p]) for p in range(n)) for row in rank_rows]
+        d_hams = [
+            sum(pen[a][b] for a in range(n) for b in range(a + 1, n)) for pen in pens
+        ]
+
+    def k1_sums():
+        # From scratch, also to drop the float drift of the running sums
+        sum_rank = sum(position[o][p] for p, o in enumerate(perm))
+        sum_ham = sum(
+            precedence[a][b] for i, a in enumerate(perm) for b in perm[i + 1 :]
+        )
+        return sum_rank, sum_ham
+
+    agg_rank, agg_ham = k1_sums()
+    if trackers is None:
+        trackers = new_trackers()
+    index_of = {oid: i for i, oid in enumerate(obj_ids)}
+    # Kept ties of bounded trackers as (negated lex key, solution), so the
+    # heap top is the lexicographically last one
+    heaps = {key: [] for key in CRITERIA}
+    experts = range(m)
+
+    def keep(key, val, cand_order, dists):
+        tracker = trackers[key]
+        heap = heaps[key]
+        if val < tracker["val"]:
+            heap.clear()
+        full = val == tracker["val"] and tracker_full(tracker)
+        update_best(tracker, val, cand_order, dists)
+        if tracker["limit"] is None or val != tracker["val"]:
+            return
+        neg_key = [-index_of[oid] for oid in cand_order]
+        if not full:
+            heapq.heappush(heap, (neg_key, tracker["solutions"][-1]))
+        elif neg_key > heap[0][0]:
+            sol = {"order": list(cand_order), "distances": list(dists)}
+            heapq.heapreplace(heap, (neg_key, sol))
+
+    def keep_k1(key, agg_val, criterion, dists):
+        best = trackers[key]["val"]
+        if agg_val > best + k1_tolerance(best):
+            return
+        if dists is None:
+            dists = order_dists(tables, perm, criterion)
+        val = aggregate_value(dists, weights, "sum")
+        keep(key, val, [obj_ids[i] for i in perm], dists)
+
+    def score():
+        if need_k2:
+            cand_order = [obj_ids[i] for i in perm]
+            if "k2_rank" in want:
+                keep("k2_rank", max(d_ranks, default=0), cand_order, d_ranks)
+            if "k2_hamming" in want:
+                keep("k2_hamming", max(d_hams, default=0), cand_order, d_hams)
+        if "k1_rank" in want:
+            keep_k1("k1_rank", agg_rank, "rank", d_ranks)
+        if "k1_hamming" in want:
+            keep_k1("k1_hamming", agg_ham, "hamming", d_hams)
+
+    score()
+    count = 1
+    for p in plain_changes(n):
+        a = perm[p]
+        b = perm[p + 1]
+        agg_rank += (
+            position[a][p + 1] + position[b][p] - position[a][p] - position[b][p + 1]
+        )
+        agg_ham += precedence[b][a] - precedence[a][b]
+        if need_k2:
+            for e in experts:
+                row = rank_rows[e]
+                ra = row[a]
+                rb = row[b]
+                d_ranks[e] += (
+                    abs(p + 1 - rb)
+                    + abs(p + 2 - ra)
+                    - abs(p + 1 - ra)
+                    - abs(p + 2 - rb)
+                )
+                pen = pens[e]
+                d_hams[e] += pen[b][a] - pen[a][b]
+        perm[p] = b
+        perm[p + 1] = a
+        score()
+        count += 1
+        if count % 2000 == 0:
+            agg_rank, agg_ham = k1_sums()
+            yield count
+
+    for key, tracker in trackers.items():
+        if tracker["limit"] is not None:
+            tracker["solutions"] = [sol for _, sol in heaps[key]]
+        tracker["solutions"].sort(
+            key=lambda sol: [index_of[oid] for oid in sol["order"]]
+        )
+    return trackers
+
+
+def chunked_search(
+    engine,
+    prepared_experts,
+    obj_ids,
+    trackers,
+    start=0,
+    chunk=20000,
+    on_chunk=None,
+    criteria=CRITERIA,
+):
+    """Runs an index-range engine over [start, n!) a chunk at a time.
+
+    ``engine`` is ``exhaustive_search`` or ``vectorized_search``; the same
+    trackers carry over between chunks, so the result equals one full run.
+    After each chunk ``on_chunk(position, trackers)`` can persist a
+    checkpoint that a later call resumes from via ``start``.
+    """
+    total = math.factorial(len(obj_ids))
+    position = start
+    while position < total:
+        stop = min(total, position + chunk)
+        search = engine(
+            prepared_experts, obj_ids, position, stop, trackers, criteria=criteria
+        )
+        for count in search:
+            yield position + count
+        position = stop
+        if on_chunk:
+            on_chunk(position, trackers)
+        yield position
+    return trackers
+
+
+# Candidates checked by all shard workers of the current pool, and the
+# flag that stops them when the search is closed early
+_shard_progress = None
+_shard_cancelled = None
+
+
+def _init_shard_worker(counter, cancelled):
+    global _shard_progress, _shard_cancelled
+    _shard_progress = counter
+    _shard_cancelled = cancelled
+
+
+def _search_shard(prepared_experts, obj_ids, start, stop, vectorized, limit, criteria):
+    engine = vectorized_search if vectorized else exhaustive_search
+    search = engine(
+        prepared_experts, obj_ids, start, stop, new_trackers(limit), criteria=criteria
+    )
+    reported = 0
+    while True:
+        if _shard_cancelled.is_set():
+            search.close()
+            return None
+        try:
+            count = next(search)
+        except StopIteration as done:
+            count = stop - start
+            trackers = done.value
+        else:
+            trackers = None
+        with _shard_progress.get_lock():
+            _shard_progress.value += count - reported
+        reported = count
+        if trackers is not None:
+            return trackers
+
+
+def sharded_search(
+    prepared_experts,
+    obj_ids,
+    workers,
+    vectorized=False,
+    trackers=None,
+    criteria=CRITERIA,
+):
+    """Exhaustive search split into lexicographic index ranges over processes.
+
+    The n! range is cut into a few shards per worker, each shard keeps its
+    own trackers, and the parent merges them in index order so values and
+    tie order match a single-process run. Yields the candidates checked by
+    all workers together and returns the merged trackers. Ties only reach
+    the ``pending`` queue of ``trackers`` after the merge.
+    """
+    if trackers is None:
+        trackers = new_trackers()
+    limit = trackers["k1_rank"]["limit"]
+    total = math.factorial(len(obj_ids))
+    shards = max(1, min(total, workers * 4))
+    bounds = [total * i // shards for i in range(shards + 1)]
+    counter = multiprocessing.Value("q", 0)
+    cancelled = multiprocessing.Event()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_shard_worker,
+        initargs=(counter, cancelled),
+    )
+    try:
+        futures = [
+            pool.submit(
+                _search_shard,
+                prepared_experts,
+                obj_ids,
+                lo,
+                hi,
+                vectorized,
+                limit,
+                criteria,
+            )
+            for lo, hi in zip(bounds, bounds[1:])
+        ]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            yield counter.value
+        merged = futures[0].result()
+        for future in futures[1:]:
+            shard = future.result()
+            merged = {key: merge_trackers(merged[key], shard[key]) for key in merged}
+        for key, tracker in trackers.items():
+            for field in ("val", "solutions", "count"):
+                tracker[field] = merged[key][field]
+            if tracker["pending"] is not None:
+                tracker["pending"] = list(tracker["solutions"])
+                tracker["reset"] = True
+        return trackers
+    finally:
+        # Shards already running stop at their next progress step
+        cancelled.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _rank_tail_bounds(ranks, rest_idx, first_pos):
+    # Footrule between each expert's remaining ranks and positions
+    # first_pos..n. Sorted-to-sorted matching is optimal for |x - y| costs.
+    tails = np.sort(ranks[:, rest_idx], axis=1)
+    positions = np.arange(first_pos, first_pos + len(rest_idx))
+    return np.abs(tails - positions).sum(axis=1)
+
+
+def branch_and_bound(
+    tables, obj_ids, criterion, aggregate, upper_bound=float("inf"), tracker=None
+):
+    """Exact search for the best orders under one criterion.
+
+    ``criterion`` is ``"rank"`` or ``"hamming"``, ``aggregate`` is ``"sum"``
+    (weighted, K1) or ``"max"`` (K2). Prefixes are extended position by
+    position in ``obj_ids`` order and a prefix is dropped once its lower
+    bound exceeds the best value found, so ties come out in the same order
+    as ``itertools.permutations``; once the tracker is ``count_settled`` a
+    prefix that can at best tie is dropped too.
+
+    K1 bounds one prefix cost in the aggregated matrices of
+    ``build_aggregate_tables``, so its nodes cost the same for any number
+    of experts and only complete orders are scored per expert. K2 bounds
+    every expert's distance at once in NumPy and takes the largest of
+    them and of the mean distance, whose sum is bounded jointly; all are
+    rounded up to the parity each expert's distance has whatever the
+    order. K2 stays within a few seconds up to 10 objects and 50 experts;
+    at 12 objects contested rankings can take about a minute, so requests
+    are held to ``CONSENSUS_EXACT_MAX_N`` objects.
+    ``upper_bound`` must be a value some order actually reaches.
+
+    Yields the number of candidates covered so far (visited or pruned) and
+    returns a tracker dict like the one used by the exhaustive search.
+    """
+    n = len(obj_ids)
+    weights = [t["weight"] for t in tables]
+    fact = [math.factorial(k) for k in range(n + 1)]
+    if tracker is None:
+        tracker = new_tracker()
+    tracker["val"] = min(tracker["val"], upper_bound)
+    state = {"covered": 0, "nodes": 0}
+
+    # Bounding rows: one for the summed K1 costs of all experts, one per
+    # expert for K2
+    if aggregate == "sum":
+        agg = build_aggregate_tables(tables, n)
+        m = 1
+        if criterion == "rank":
+            position = agg["position"][None]
+        else:
+            pens = agg["precedence"][None]
+    else:
+        m = len(tables)
+        if criterion == "rank":
+            ranks = np.array([t["ranks"] for t in tables], dtype=np.int64)
+            ranks = ranks.reshape(m, n)
+            position = np.abs(np.arange(1, n + 1) - ranks[:, :, None])
+            # sum |p - r| has the parity of sum (p - r) whatever the order
+            parity = (n * (n + 1) // 2 - ranks.sum(axis=1)) % 2
+        else:
+            pens = np.array([t["pen"] for t in tables], dtype=np.int64)
+            pens = pens.reshape(m, n, n)
+            # Only a pair the expert left unranked costs an odd 1, either way
+            parity = np.triu(pens, 1).sum(axis=(1, 2)) % 2
+        # The mean is only held to a parity all experts share
+        shared_parity = int(parity[0]) if len(set(parity.tolist())) == 1 else None
+
+    if criterion == "rank":
+        # Cheapest position from p on for each object, summed over the rows
+        summed = position.sum(axis=0)
+        suffix_min = np.minimum.accumulate(summed[:, ::-1], axis=1)[:, ::-1]
+        suffix_min = np.vstack([suffix_min.T, np.zeros((1, n), summed.dtype)])
+    else:
+        # Cheapest cost of a pair whatever the order; one expert (or the
+        # aggregate) can always reach it for all remaining pairs at once
+        min_pens = np.minimum(pens, pens.transpose(0, 2, 1))
+        tails = np.triu(min_pens, 1).sum(axis=(1, 2))
+        summed = pens.sum(axis=0)
+        joint_min = np.minimum(summed, summed.T)
+        state["joint_tail"] = np.triu(joint_min, 1).sum()
+
+    def with_parity(bounds, par):
+        # Smallest values from bounds on that an order can give the experts
+        return bounds + (bounds - par) % 2
+
+    def prunable(bound):
+        best = tracker["val"]
+        if best == float("inf"):
+            return False
+        # Float sums may differ in the last bits from the leaf value
+        tol = 1e-9 * max(1.0, abs(best))
+        if bound > best + tol:
+            return True
+        # Once no more ties are kept only a better order is worth a visit
+        if count_settled(tracker) and bound >= best - tol:
+            tracker["count_exact"] = False
+            return True
+        return False
+
+    order = []
+    used = np.zeros(n, dtype=bool)
+    partial = np.zeros(m, dtype=position.dtype if criterion == "rank" else pens.dtype)
+
+    def visit(pos):
+        if pos == n:
+            if aggregate == "sum":
+                dists = order_dists(tables, order, criterion)
+            else:
+                dists = partial.tolist()
+            val = aggregate_value(dists, weights, aggregate)
+            update_best(tracker, val, [obj_ids[i] for i in order], dists)
+            state["covered"] += 1
+            return
+
+        for idx in range(n):
+            if used[idx]:
+                continue
+            used[idx] = True
+            rest_idx = np.flatnonzero(~used)
+            if criterion == "rank":
+                steps = position[:, idx, pos]
+                joint_rest = suffix_min[pos + 1, rest_idx].sum()
+                if aggregate == "sum":
+                    rest = joint_rest
+                else:
+                    rest = _rank_tail_bounds(ranks, rest_idx, pos + 2)
+            else:
+                steps = pens[:, idx, rest_idx].sum(axis=1)
+                undo = min_pens[:, idx, rest_idx].sum(axis=1)
+                # In place: the arrays are shared by every level
+                tails[:] -= undo
+                rest = tails
+                joint_undo = joint_min[idx, rest_idx].sum()
+                state["joint_tail"] -= joint_undo
+                joint_rest = state["joint_tail"]
+
+            bounds = partial + steps + rest
+            if aggregate == "sum":
+                bound = bounds[0]
+            elif m:
+                bound = int(with_parity(bounds, parity).max())
+                # The experts' largest distance is at least their mean
+                total = int(partial.sum() + steps.sum() + joint_rest)
+                mean = -(-total // m)
+                if shared_parity is not None:
+                    mean = int(with_parity(mean, shared_parity))
+                bound = max(bound, mean)
+            else:
+                bound = 0
+            if prunable(bound):
+                state["covered"] += fact[n - pos - 1]
+            else:
+                partial[:] += steps
+                order.append(idx)
+                yield from visit(pos + 1)
+                order.pop()
+                partial[:] -= steps
+
+            if criterion == "hamming":
+                tails[:] += undo
+                state["joint_tail"] += joint_undo
+            used[idx] = False
+
+            state["nodes"] += 1
+            if state["nodes"] % 1000 == 0:
+                yield state["covered"]
+
+    yield from visit(0)
+    return tracker
+
+
+def _hungarian(cost):
+    # Min-cost perfect matching of rows to columns with dual potentials
+    # (classic O(n^3) shortest augmenting path version, inner scans in NumPy)
+    n = len(cost)
+    cost = np.asarray(cost, dtype=float)
+    u = np.zeros(n + 1)
+    v = np.zeros(n + 1)
+    match_col = np.zeros(n + 1, dtype=np.int64)  # column -> row, 1-based, 0 = free
+    way = np.zeros(n + 1, dtype=np.int64)
+    for row in range(1, n + 1):
+        match_col[0] = row
+        col0 = 0
+        minv = np.full(n + 1, np.inf)
+        used = np.zeros(n + 1, dtype=bool)
+        while True:
+            used[col0] = True
+            row0 = match_col[col0]
+            free = ~used[1:]
+            cur = cost[row0 - 1] - u[row0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = col0
+            # First free column with the smallest slack
+            slack = np.where(free, minv[1:], np.inf)
+            col1 = int(slack.argmin()) + 1
+            delta = slack[col1 - 1]
+            u[match_col[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            col0 = col1
+            if match_col[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            match_col[col0] = match_col[col1]
+            col0 = col1
+    row_to_col = [0] * n
+    for col in range(1, n + 1):
+        row_to_col[match_col[col] - 1] = col - 1
+    return row_to_col, u[1:].tolist(), v[1:].tolist()
+
+
+def footrule_assignment(tables, obj_ids, tracker=None):
+    """Exact K1 rank consensus as an objects x positions assignment problem.
+
+    The weighted footrule splits into a per-object, per-position cost, so
+    one Hungarian run gives the optimum. Every co-optimal order uses only
+    edges with zero reduced cost, and these are enumerated position by
+    position in ``obj_ids`` order to fill the tie set exactly like the
+    exhaustive search does, until ``count_settled``. Yields the number of
+    orders enumerated every 1000 and returns the tracker.
+    """
+    n = len(obj_ids)
+    weights = [t["weight"] for t in tables]
+    cost = build_aggregate_tables(tables, n)["position"].tolist()
+    obj_to_pos, u, v = _hungarian(cost)
+    tol = 1e-9 * max([1.0] + [abs(c) for line in cost for c in line])
+    tight = [
+        [o for o in range(n) if cost[o][p] - u[o] - v[p] <= tol] for p in range(n)
+    ]
+    tight_sets = [set(objs) for objs in tight]
+
+    if tracker is None:
+        tracker = new_tracker()
+    found = [0]
+    pos_to_obj = [0] * n
+    for o, p in enumerate(obj_to_pos):
+        pos_to_obj[p] = o
+
+    def rematch(pos, obj, pos_to_obj, obj_to_pos):
+        # Put obj at pos and find a new tight place for the object it
+        # displaces among positions after pos (alternating path search).
+        # Returns the updated matching or None.
+        start = pos_to_obj[pos]
+        target = obj_to_pos[obj]
+        prev = {start: None}
+        queue = [start]
+        while queue:
+            cur = queue.pop(0)
+            for q in range(pos + 1, n):
+                if cur not in tight_sets[q]:
+                    continue
+                nxt = pos_to_obj[q]
+                if q == target:
+                    new_p2o = list(pos_to_obj)
+                    new_o2p = list(obj_to_pos)
+                    new_p2o[pos] = obj
+                    new_o2p[obj] = pos
+                    # Walk the chain back: cur takes q, its old holder moves on
+                    while cur is not None:
+                        new_p2o[q] = cur
+                        new_o2p[cur] = q
+                        q = obj_to_pos[cur]
+                        cur = prev[cur]
+                    return new_p2o, new_o2p
+                if nxt not in prev:
+                    prev[nxt] = cur
+                    queue.append(nxt)
+        return None
+
+    order = []
+
+    def visit(pos, pos_to_obj, obj_to_pos):
+        if pos == n:
+            dists = order_dists(tables, order, "rank")
+            update_best(
+                tracker,
+                aggregate_value(dists, weights, "sum"),
+                [obj_ids[o] for o in order],
+                dists,
+            )
+            found[0] += 1
+            if found[0] % 1000 == 0:
+                yield found[0]
+            return
+        for obj in tight[pos]:
+            if obj_to_pos[obj] < pos:
+                continue
+            if pos_to_obj[pos] == obj:
+                matching = (pos_to_obj, obj_to_pos)
+            else:
+                matching = rematch(pos, obj, pos_to_obj, obj_to_pos)
+                if matching is None:
+                    continue
+            if count_settled(tracker):
+                # Every tight step completes to one more co-optimal order
+                tracker["count_exact"] = False
+                return
+            order.append(obj)
+            yield from visit(pos + 1, *matching)
+            order.pop()
+
+    yield from visit(0, pos_to_obj, obj_to_pos)
+    return tracker
+
+
+def kemeny_dp(tables, obj_ids, tracker=None):
+    """Exact K1 Hamming (weighted Kemeny) consensus by DP over object subsets.
+
+    ``rest[S]`` is the cheapest cost of ordering the objects outside ``S``
+    after everything in ``S``, filled layer by layer from the full set
+    down, O(2^n * n^2) overall. Co-optimal orders are then walked forward
+    from the empty set in ``obj_ids`` order, keeping only steps that can
+    still reach the optimum, and re-scored per expert so values and ties
+    match the exhaustive search, until ``count_settled``. Yields the number
+    of orders walked every 1000 and returns the tracker.
+    """
+    n = len(obj_ids)
+    weights = [t["weight"] for t in tables]
+    # cost[a][b] = weighted Hamming cost of putting a anywhere before b
+    cost = build_aggregate_tables(tables, n)["precedence"]
+    row_sums = cost.sum(axis=1)
+    bits = np.int64(1) << np.arange(n, dtype=np.int64)
+
+    size = 1 << n
+    masks = np.arange(size, dtype=np.int64)
+    in_set = (masks[:, None] & bits) != 0
+    layer_of = in_set.sum(axis=1)
+    rest = np.full(size, np.inf)
+    rest[size - 1] = 0.0
+    for k in range(n - 1, -1, -1):
+        layer = masks[layer_of == k]
+        placed = in_set[layer]
+        # Placing x next costs everything x goes before: row sum minus the
+        # objects already placed
+        step = row_sums[None, :] - placed.astype(float) @ cost.T
+        cand = step + rest[layer[:, None] | bits[None, :]]
+        cand[placed] = np.inf
+        rest[layer] = cand.min(axis=1)
+
+    opt = rest[0]
+    tol = 1e-9 * max(1.0, abs(opt))
+    if tracker is None:
+        tracker = new_tracker()
+    found = [0]
+    order = []
+
+    def visit(mask, acc):
+        if len(order) == n:
+            dists = order_dists(tables, order, "hamming")
+            update_best(
+                tracker,
+                aggregate_value(dists, weights, "sum"),
+                [obj_ids[o] for o in order],
+                dists,
+            )
+            found[0] += 1
+            if found[0] % 1000 == 0:
+                yield found[0]
+            return
+        for x in range(n):
+            if mask & (1 << x):
+                continue
+            step = row_sums[x] - sum(cost[x][y] for y in order)
+            nxt = mask | (1 << x)
+            if acc + step + rest[nxt] <= opt + tol:
+                if count_settled(tracker):
+                    # The step still reaches the optimum: one more tie
+                    tracker["count_exact"] = False
+                    return
+                order.append(x)
+                yield from visit(nxt, acc + step)
+                order.pop()
+
+    yield from visit(0, 0.0)
+    return tracker
+
+
+def branch_and_bound_criteria(criteria, n):
+    """The criteria ``exact_search`` hands to branch and bound for n objects."""
+    return [
+        key
+        for key, _, aggregate in EXACT_SEARCHES
+        if key in criteria
+        and (aggregate == "max" or (key == "k1_hamming" and n > KEMENY_DP_MAX_N))
+    ]
+
+
+def exact_search(prepared_experts, obj_ids, criteria=CRITERIA, trackers=None):
+    """Solves the requested criteria exactly, one search per criterion.
+
+    K1 rank is an assignment problem, K1 Hamming a subset DP up to
+    ``KEMENY_DP_MAX_N`` objects; the rest go through branch and bound.
+    Yields candidates covered across all searches (n! per criterion) and
+    returns the trackers keyed like ``exhaustive_search``.
+    """
+    with_pairs = any(key.endswith("hamming") for key in criteria)
+    tables = build_cost_tables(prepared_experts, obj_ids, with_pairs)
+    space = math.factorial(len(obj_ids))
+    if trackers is None:
+        trackers = new_trackers()
+    searches = [s for s in EXACT_SEARCHES if s[0] in criteria]
+    for i, (key, criterion, aggregate) in enumerate(searches):
+        # Only branch and bound knows how much of the space it covered; the
+        # other solvers yield just so streamed ties get drained
+        covers = False
+        if key == "k1_rank":
+            search = footrule_assignment(tables, obj_ids, trackers[key])
+        elif key == "k1_hamming" and len(obj_ids) <= KEMENY_DP_MAX_N:
+            search = kemeny_dp(tables, obj_ids, trackers[key])
+        else:
+            search = branch_and_bound(
+                tables, obj_ids, criterion, aggregate, tracker=trackers[key]
+            )
+            covers = True
+        while True:
+            try:
+                covered = next(search)
+            except StopIteration:
+                break
+            yield i * space + (covered if covers else 0)
+        yield (i + 1) * space
+    return trackers
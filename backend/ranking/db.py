@@ -0,0 +1,26 @@
+"""Write transactions that queue inside the process on SQLite.
+
+SQLite takes one writer at a time, and writers that find the database
+locked poll for it with growing sleeps, so under a burst of saves some of
+them keep losing the race until the busy timeout. Threads of this
+process therefore wait on a lock for their turn instead and only other
+processes go through SQLite's busy handler. Other databases lock rows
+themselves and get a plain atomic block.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+_write_lock = threading.RLock()
+
+
+@contextmanager
+def write_transaction():
+    if connection.vendor != "sqlite":
+        with transaction.atomic():
+            yield
+        return
+    with _write_lock, transaction.atomic():
+        yield
@@ -0,0 +1,321 @@
+"""Approximate consensus for catalogs too big for the exact solvers.
+
+Borda, Copeland and median-rank orders come straight from the experts'
+ranks; local search starts from the best of them (and the K1 rank
+optimum, which an assignment gives in polynomial time) and improves it
+per criterion. Every criterion also gets a lower bound on its optimum, so
+``val - lower_bound`` bounds how far the answer is from optimal.
+"""
+
+import math
+
+import numpy as np
+
+from .consensus import (
+    CRITERIA,
+    EXACT_SEARCHES,
+    _hungarian,
+    aggregate_value,
+    build_cost_tables,
+    k1_tolerance,
+    new_trackers,
+    position_costs,
+    precedence_costs,
+    update_best,
+)
+
+# Values of the "solver" field that run a heuristic instead of a search
+HEURISTIC_SOLVERS = ["borda", "copeland", "median_rank", "local_search"]
+
+# Upper limit on local search passes over the order per criterion
+LOCAL_SEARCH_MAX_PASSES = 50
+
+
+def heuristic_tables(prepared_experts, obj_ids):
+    """NumPy versions of the cost tables, built without any pair sets.
+
+    ``ranks[e, o]`` is expert e's rank of object o (n + 1 if unranked) and
+    ``pen[e, a, b]`` the Hamming cost of placing a before b, like the
+    ``pen`` of build_cost_tables. ``prec`` and ``position`` are the
+    aggregated K1 matrices of build_aggregate_tables.
+    """
+    n = len(obj_ids)
+    m = len(prepared_experts)
+    tables = build_cost_tables(prepared_experts, obj_ids, with_pairs=False)
+    weights = np.array([t["weight"] for t in tables], dtype=float)
+    ranks = np.array([t["ranks"] for t in tables], dtype=np.int64).reshape(m, n)
+    ranked = np.array(
+        [[oid in exp["ranks"] for oid in obj_ids] for exp in prepared_experts],
+        dtype=bool,
+    ).reshape(m, n)
+    pen = np.ones((m, n, n), dtype=np.int8)
+    for e in range(m):
+        both = ranked[e][:, None] & ranked[e][None, :]
+        before = ranks[e][:, None] < ranks[e][None, :]
+        pen[e][both] = np.where(before, 0, 2)[both]
+        np.fill_diagonal(pen[e], 0)
+    return {
+        "weights": weights,
+        "ranks": ranks,
+        "ranked": ranked,
+        "pen": pen,
+        "prec": precedence_costs(weights, pen, n),
+        "position": position_costs(weights, ranks, n),
+    }
+
+
+def order_distances(h, perm, distance):
+    """Per-expert distances of the order ``perm`` (object indexes)."""
+    n = len(perm)
+    if distance == "rank":
+        pos = np.empty(n, dtype=np.int64)
+        pos[perm] = np.arange(1, n + 1)
+        return np.abs(pos[None, :] - h["ranks"]).sum(axis=1)
+    sub = h["pen"][:, perm][:, :, perm]
+    return np.triu(sub, 1).sum(axis=(1, 2))
+
+
+def k1_cost(h, perm, distance):
+    """Weighted K1 value of ``perm`` from the aggregated matrices."""
+    n = len(perm)
+    if distance == "rank":
+        return float(h["position"][perm, np.arange(n)].sum())
+    return float(np.triu(h["prec"][np.ix_(perm, perm)], 1).sum())
+
+
+def borda_order(h):
+    # Weighted rank sum, unranked objects counted at n + 1
+    return list(np.argsort(h["weights"] @ h["ranks"], kind="stable"))
+
+
+def copeland_order(h):
+    # Pairwise majority wins minus losses; ties broken by Borda score
+    diff = h["prec"] - h["prec"].T
+    score = (diff < 0).sum(axis=1) - (diff > 0).sum(axis=1)
+    return list(np.lexsort((h["weights"] @ h["ranks"], -score)))
+
+
+def median_rank_order(h):
+    # Weighted median of each object's ranks; ties broken by Borda score
+    ranks, weights = h["ranks"], h["weights"]
+    n = ranks.shape[1]
+    if not len(weights):
+        return list(range(n))
+    idx = np.argsort(ranks, axis=0, kind="stable")
+    sorted_ranks = np.take_along_axis(ranks, idx, axis=0)
+    cum = np.cumsum(weights[idx], axis=0)
+    median = sorted_ranks[np.argmax(cum >= cum[-1] / 2, axis=0), np.arange(n)]
+    return list(np.lexsort((weights @ ranks, median)))
+
+
+def footrule_order(h):
+    """Order with the least weighted footrule (the K1 rank optimum)."""
+    row_to_col, _, _ = _hungarian(h["position"])
+    return list(np.argsort(row_to_col))
+
+
+def insertion_search(perm, prec, tol):
+    """K1 Hamming local search: moves single objects to their best slot.
+
+    Moving o left over x costs ``prec[o, x] - prec[x, o]``; the cost of
+    every target slot is a running sum of these along the order.
+    """
+    perm = list(perm)
+    diff = prec - prec.T
+    for _ in range(LOCAL_SEARCH_MAX_PASSES):
+        improved = False
+        for o in list(perm):
+            i = perm.index(o)
+            row = diff[o, perm]
+            # left[j]: o moved to slot j < i; right[t]: to slot i + 1 + t
+            left = np.cumsum(row[:i][::-1])[::-1]
+            right = -np.cumsum(row[i + 1 :])
+            best_j, best = i, -tol
+            if len(left) and left.min() < best:
+                best_j, best = int(left.argmin()), left.min()
+            if len(right) and right.min() < best:
+                best_j = i + 1 + int(right.argmin())
+            if best_j != i:
+                perm.pop(i)
+                perm.insert(best_j, o)
+                improved = True
+        if not improved:
+            break
+    return perm
+
+
+def swap_search(perm, h, distance):
+    """K2 local search over adjacent swaps.
+
+    A swap is taken when it lowers the largest distance or keeps it and
+    lowers the sum, which lets the search cross plateaus of the max.
+    """
+    perm = list(perm)
+    ranks, pen = h["ranks"], h["pen"]
+    dists = order_distances(h, perm, distance)
+    for _ in range(LOCAL_SEARCH_MAX_PASSES):
+        improved = False
+        for i in range(len(perm) - 1):
+            a, b = perm[i], perm[i + 1]
+            if distance == "rank":
+                delta = (
+                    np.abs(i + 2 - ranks[:, a])
+                    - np.abs(i + 1 - ranks[:, a])
+                    + np.abs(i + 1 - ranks[:, b])
+                    - np.abs(i + 2 - ranks[:, b])
+                )
+            else:
+                delta = pen[:, b, a].astype(np.int64) - pen[:, a, b]
+            new = dists + delta
+            if (new.max(initial=0), new.sum()) < (dists.max(initial=0), dists.sum()):
+                perm[i], perm[i + 1] = b, a
+                dists = new
+                improved = True
+        if not improved:
+            break
+    return perm
+
+
+def lower_bounds(h, criteria, footrule_val=None):
+    """Lower bounds on each criterion's optimum.
+
+    K1 rank is exact (the assignment optimum) and K1 Hamming sums the
+    cheaper direction of every pair. K2 values are integers and at least
+    the weighted mean distance (the K1 bound over the total weight), every
+    single expert's own minimum, and half the distance between any two
+    experts (triangle inequality).
+    """
+    ranks, ranked, pen = h["ranks"], h["ranked"], h["pen"]
+    m, n = ranks.shape
+    upper = np.triu(np.ones((n, n), dtype=bool), 1)
+    kemeny = float(np.minimum(h["prec"], h["prec"].T)[upper].sum())
+    total_weight = float(h["weights"].sum())
+
+    def mean_bound(k1_bound):
+        # Only valid when no expert has a zero or negative weight
+        if not m or h["weights"].min() <= 0:
+            return 0
+        mean = k1_bound / total_weight
+        return math.ceil(mean - 1e-9 * max(1.0, mean))
+
+    bounds = {}
+    for key, distance, aggregate in EXACT_SEARCHES:
+        if key not in criteria:
+            continue
+        if key == "k1_rank":
+            bounds[key] = footrule_val
+        elif key == "k1_hamming":
+            bounds[key] = kemeny
+        elif m == 0:
+            bounds[key] = 0
+        elif distance == "rank":
+            own = np.abs(np.sort(ranks, axis=1) - np.arange(1, n + 1)).sum(axis=1)
+            between = np.abs(ranks[:, None, :] - ranks[None, :, :]).sum(axis=2)
+            bounds[key] = int(
+                max(mean_bound(footrule_val), own.max(), -(-between.max() // 2))
+            )
+        else:
+            known = ranked.sum(axis=1)
+            # Pairs an expert left unranked cost 1 whatever the order
+            own = n * (n - 1) // 2 - known * (known - 1) // 2
+            # Pairwise distance: pairs known to either minus twice the agreeing ones
+            agree = (pen == 0).reshape(m, n * n).astype(np.float32)
+            agree[:, :: n + 1] = 0
+            shared = np.rint(agree @ agree.T).astype(np.int64)
+            pairs = known * (known - 1) // 2
+            between = pairs[:, None] + pairs[None, :] - 2 * shared
+            bounds[key] = int(
+                max(mean_bound(kemeny), own.max(), -(-between.max() // 2))
+            )
+    return bounds
+
+
+def heuristic_search(
+    prepared_experts,
+    obj_ids,
+    method="local_search",
+    criteria=CRITERIA,
+    trackers=None,
+    starts=None,
+):
+    """Consensus orders from one of ``HEURISTIC_SOLVERS``.
+
+    Each tracker keeps the single order found for its criterion plus
+    ``lower_bound`` and ``start`` (the order the value came from). Local
+    search also tries ``starts`` ({criterion: order of object ids}, e.g.
+    the previous optimum) first. Yields the number of criteria done and
+    returns the trackers.
+    """
+    h = heuristic_tables(prepared_experts, obj_ids)
+    weights = h["weights"].tolist()
+    n = len(obj_ids)
+    if trackers is None:
+        trackers = new_trackers()
+
+    footrule = footrule_order(h)
+    footrule_val = aggregate_value(
+        order_distances(h, footrule, "rank").tolist(), weights, "sum"
+    )
+    bounds = lower_bounds(h, criteria, footrule_val)
+    candidates = {
+        "borda": borda_order(h),
+        "copeland": copeland_order(h),
+        "median_rank": median_rank_order(h),
+    }
+    if method == "local_search":
+        candidates["footrule"] = footrule
+    else:
+        candidates = {method: candidates[method]}
+
+    index_of = {oid: i for i, oid in enumerate(obj_ids)}
+    # Candidate distances are shared by the K1 and K2 criteria of a kind
+    candidate_dists = {}
+
+    def distances_of(perm, distance):
+        if (tuple(perm), distance) not in candidate_dists:
+            candidate_dists[tuple(perm), distance] = order_distances(
+                h, perm, distance
+            ).tolist()
+        return candidate_dists[tuple(perm), distance]
+
+    done = 0
+    for key, distance, aggregate in EXACT_SEARCHES:
+        if key not in criteria:
+            continue
+        tried = candidates
+        if method == "local_search" and starts and key in starts:
+            previous = [index_of[oid] for oid in starts[key]]
+            tried = {"previous": previous, **candidates}
+        # First candidate wins ties, so the listing order above is the
+        # preference; K1 compares aggregated costs, no per-expert distances
+        if aggregate == "sum":
+            costs = {name: k1_cost(h, perm, distance) for name, perm in tried.items()}
+            low = min(costs.values())
+            start = next(
+                name for name in costs if costs[name] <= low + k1_tolerance(low)
+            )
+        else:
+            start = min(
+                tried,
+                key=lambda name: aggregate_value(
+                    distances_of(tried[name], distance), weights, aggregate
+                ),
+            )
+        perm = tried[start]
+        dists = distances_of(perm, distance)
+        if method == "local_search" and n > 1:
+            if key == "k1_hamming":
+                tol = 1e-9 * max(1.0, float(np.abs(h["weights"]).sum()))
+                perm = insertion_search(perm, h["prec"], tol)
+            elif aggregate == "max":
+                perm = swap_search(perm, h, distance)
+            dists = order_distances(h, perm, distance).tolist()
+        val = aggregate_value(dists, weights, aggregate)
+        tracker = trackers[key]
+        update_best(tracker, val, [obj_ids[o] for o in perm], dists)
+        # Float rounding must not push the bound above a reachable value
+        tracker["lower_bound"] = min(bounds[key], val)
+        tracker["start"] = start
+        done += 1
+        yield done
+    return trackers
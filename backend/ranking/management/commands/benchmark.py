@@ -0,0 +1,132 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ranking.benchmarks import (
+    FULL_GRID,
+    QUICK_GRID,
+    api_cases,
+    compare,
+    engine_cases,
+    environment,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the consensus solvers on seeded synthetic experts and the "
+        "DB-heavy endpoints on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--quick", action="store_true", help="Small grid, e.g. for CI."
+        )
+        parser.add_argument("--solvers", nargs="+", help="Solvers to benchmark.")
+        parser.add_argument(
+            "--all-sizes",
+            action="store_true",
+            help="Run every solver at every grid size. By default exhaustive "
+            "stops at n=8 and vectorized/sjt at 9 (SOLVER_MAX_N), since they "
+            "take n! steps; past that expect their cases to hit --timeout.",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60.0,
+            help="Seconds after which one engine case is abandoned.",
+        )
+        parser.add_argument(
+            "--no-memory",
+            action="store_true",
+            help="Skip the second, traced run that measures peak memory.",
+        )
+        parser.add_argument(
+            "--skip-api", action="store_true", help="Only benchmark the engine."
+        )
+        parser.add_argument(
+            "--db-size",
+            nargs=3,
+            type=int,
+            metavar=("OBJECTS", "EXPERTS", "RANKINGS"),
+            help="Populated database shape (rankings per expert).",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--writers",
+            type=int,
+            default=50,
+            help="Concurrent save-ranking/ writers (0 to skip), each saving "
+            "--repeat times.",
+        )
+        parser.add_argument("--output", help="Write the results as JSON here.")
+        parser.add_argument(
+            "--baseline", help="Fail if a case got slower than in this JSON file."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed slowdown against the baseline (0.25 = 25%%).",
+        )
+
+    def handle(self, *args, **options):
+        grid = dict(QUICK_GRID if options["quick"] else FULL_GRID)
+        if options["solvers"]:
+            grid["solvers"] = options["solvers"]
+        db_size = options["db_size"] or ((50, 10, 5) if options["quick"] else (200, 50, 20))
+
+        def log(case):
+            line = f"{case['name']:<45} {case['seconds']:>10.4f}s"
+            if case.get("timed_out"):
+                line += "  timed out"
+            if "perms_per_sec" in case:
+                line += f"  {case['perms_per_sec']:>12,} perms/s"
+            if "p99_seconds" in case:
+                line += f"  p99 {case['p99_seconds']:.4f}s, {case['failed']} failed"
+            if "peak_bytes" in case:
+                line += f"  {case['peak_bytes'] / 2**20:>8.1f} MiB peak"
+            self.stdout.write(line)
+
+        cases = engine_cases(
+            grid,
+            options["seed"],
+            options["timeout"],
+            not options["no_memory"],
+            log,
+            all_sizes=options["all_sizes"],
+        )
+        if not options["skip_api"]:
+            cases += api_cases(
+                *db_size,
+                options["seed"],
+                options["repeat"],
+                options["writers"],
+                log,
+            )
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "seed": options["seed"],
+            "grid": grid,
+            "all_sizes": options["all_sizes"],
+            "db_size": list(db_size),
+            "environment": environment(),
+            "cases": cases,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            slower = compare(cases, baseline, options["tolerance"])
+            for name, before, now in slower:
+                self.stderr.write(f"{name}: {before:.4f}s -> {now:.4f}s")
+            if slower:
+                raise CommandError(f"{len(slower)} case(s) slower than the baseline")
+            self.stdout.write("No regressions against the baseline.")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ranking.tasks import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Runs queued consensus jobs, resuming interrupted ones from their checkpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty."
+        )
+        parser.add_argument(
+            "--poll", type=float, default=1.0, help="Seconds between queue checks."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
+                continue
+            self.stdout.write(f"Running consensus job {job.id} (attempt {job.attempts})")
+            run_job(job)
+            job.refresh_from_db()
+            self.stdout.write(f"Consensus job {job.id} {job.status}")
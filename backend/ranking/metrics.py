@@ -0,0 +1,161 @@
+"""In-process metrics, rendered in the Prometheus text format at metrics/.
+
+Values live in this process only; with several server workers every
+worker reports its own numbers. Also keeps the last few cProfile
+summaries taken for requests sent with the X-Profile header.
+"""
+
+import functools
+import io
+import pstats
+import threading
+import uuid
+from collections import OrderedDict
+
+_lock = threading.Lock()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "ranking_request_seconds": (
+        "histogram",
+        "Request latency per route, streamed bodies included.",
+        LATENCY_BUCKETS,
+    ),
+    "ranking_request_db_queries": (
+        "histogram",
+        "Database queries per request.",
+        QUERY_BUCKETS,
+    ),
+    "ranking_consensus_phase_seconds": (
+        "histogram",
+        "Time spent in each phase of a consensus run.",
+        LATENCY_BUCKETS,
+    ),
+    "ranking_consensus_candidates_total": (
+        "counter",
+        "Candidate orders covered by consensus searches.",
+        None,
+    ),
+    "ranking_consensus_enumeration_seconds_total": (
+        "counter",
+        "Time consensus searches spent enumerating candidates.",
+        None,
+    ),
+    "ranking_consensus_candidates_per_second": (
+        "gauge",
+        "Throughput of the last consensus search per solver.",
+        None,
+    ),
+    "ranking_consensus_active_streams": (
+        "gauge",
+        "Consensus event streams currently being sent.",
+        None,
+    ),
+}
+
+_values = {}  # (name, labels) -> number, or histogram state
+
+# Latest profiles by id, oldest dropped first
+MAX_PROFILES = 20
+_profiles = OrderedDict()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    with _lock:
+        state = _values.setdefault(
+            _key(name, labels), {"counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        )
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                state["counts"][i] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _values[key] = _values.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _values[_key(name, labels)] = value
+
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+    return "{" + inner + "}"
+
+
+def render(extra_lines=()):
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        items = sorted(_values.items(), key=lambda item: item[0])
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in items:
+                if metric != name:
+                    continue
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels_text(labels)} {value}")
+                    continue
+                for bound, count in zip(buckets, value["counts"]):
+                    le = _labels_text(labels, [("le", bound)])
+                    lines.append(f"{name}_bucket{le} {count}")
+                inf = _labels_text(labels, [("le", "+Inf")])
+                lines.append(f"{name}_bucket{inf} {value['count']}")
+                lines.append(f"{name}_sum{_labels_text(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_labels_text(labels)} {value['count']}")
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+def new_profile_id():
+    return uuid.uuid4().hex
+
+
+def store_profile(profile_id, profiler, limit=40):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(limit)
+    with _lock:
+        _profiles[profile_id] = out.getvalue()
+        while len(_profiles) > MAX_PROFILES:
+            _profiles.popitem(last=False)
+
+
+def get_profile(profile_id):
+    with _lock:
+        return _profiles.get(profile_id)
+
+
+def track_active(name):
+    """Decorates a generator function so gauge ``name`` counts the
+    generators currently being iterated."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            inc(name)
+            try:
+                yield from func(*args, **kwargs)
+            finally:
+                inc(name, -1)
+
+        return wrapper
+
+    return decorate
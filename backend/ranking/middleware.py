@@ -0,0 +1,101 @@
+import cProfile
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Records latency and query count of every request per route.
+
+    Streamed responses are measured until their last chunk is sent (or the
+    client goes away). With
+    METRICS_PROFILING on, a request sent with ``X-Profile: 1`` runs under
+    cProfile; the response carries ``X-Profile-Id`` and the summary is
+    served at metrics/profiles/<id>/.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        profiler = None
+        if settings.METRICS_PROFILING and request.headers.get("X-Profile"):
+            profiler = cProfile.Profile()
+        with connection.execute_wrapper(count_query):
+            if profiler:
+                response = profiler.runcall(self.get_response, request)
+            else:
+                response = self.get_response(request)
+        route = getattr(request.resolver_match, "route", None) or "unmatched"
+        profile_id = metrics.new_profile_id() if profiler else None
+        if profile_id:
+            response["X-Profile-Id"] = profile_id
+
+        def finish():
+            metrics.observe(
+                "ranking_request_seconds", time.perf_counter() - start, route=route
+            )
+            metrics.observe("ranking_request_db_queries", queries[0], route=route)
+            if profiler:
+                metrics.store_profile(profile_id, profiler)
+
+        if response.streaming and response.is_async:
+            response.streaming_content = self.astream(
+                response.streaming_content, finish
+            )
+        elif response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, count_query, profiler, finish
+            )
+        else:
+            finish()
+        return response
+
+    def stream(self, content, count_query, profiler, finish):
+        try:
+            with connection.execute_wrapper(count_query):
+                iterator = iter(content)
+                while True:
+                    if profiler:
+                        profiler.enable()
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        break
+                    finally:
+                        if profiler:
+                            profiler.disable()
+                    yield chunk
+        finally:
+            finish()
+
+    async def astream(self, content, finish):
+        # Async bodies produce their events on other threads, so only the
+        # time to the last chunk is recorded for them
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            finish()
+
+
+class LargeResponseGZipMiddleware(GZipMiddleware):
+    """Gzips complete responses of at least GZIP_MIN_LENGTH bytes for
+    clients that accept it. Streams are left alone so SSE events are not
+    held back in the compressor."""
+
+    def process_response(self, request, response):
+        if response.streaming or len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:00
+
+import json
+
+from django.db import migrations, models
+
+
+def matrix_to_order(apps, schema_editor):
+    PairwiseMatrix = apps.get_model('ranking', 'PairwiseMatrix')
+    for pm in PairwiseMatrix.objects.all().iterator():
+        data = json.loads(pm.matrix_json or '{}')
+        pm.order_json = json.dumps(data.get('order', []))
+        pm.save(update_fields=['order_json'])
+
+
+def order_to_matrix(apps, schema_editor):
+    PairwiseMatrix = apps.get_model('ranking', 'PairwiseMatrix')
+    for pm in PairwiseMatrix.objects.all().iterator():
+        order = json.loads(pm.order_json)
+        n = len(order)
+        pm.matrix_json = json.dumps({
+            'n': n,
+            'order': order,
+            'pairs': [[int(order[i]), int(order[j]), 1] for i in range(n) for j in range(i + 1, n)],
+            'ranks': {obj_id: idx + 1 for idx, obj_id in enumerate(order)},
+        })
+        pm.save(update_fields=['matrix_json'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0003_consensusjob_consensusjobevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pairwisematrix',
+            name='order_json',
+            field=models.TextField(default='[]'),
+        ),
+        # A default lets the column be re-added when migrating backwards
+        migrations.AlterField(
+            model_name='pairwisematrix',
+            name='matrix_json',
+            field=models.TextField(default='{}'),
+        ),
+        migrations.RunPython(matrix_to_order, order_to_matrix),
+        migrations.RemoveField(
+            model_name='pairwisematrix',
+            name='matrix_json',
+        ),
+    ]
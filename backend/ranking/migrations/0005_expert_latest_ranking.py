@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_latest_ranking(apps, schema_editor):
+    Expert = apps.get_model('ranking', 'Expert')
+    PairwiseMatrix = apps.get_model('ranking', 'PairwiseMatrix')
+    for expert in Expert.objects.all():
+        expert.latest_ranking = (
+            PairwiseMatrix.objects.filter(expert=expert).order_by('-created_at', '-id').first()
+        )
+        expert.save(update_fields=['latest_ranking'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0004_pairwisematrix_order_json'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expert',
+            name='latest_ranking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ranking.pairwisematrix'),
+        ),
+        migrations.AddIndex(
+            model_name='pairwisematrix',
+            index=models.Index(fields=['expert', 'created_at'], name='ranking_pai_expert__8d32d3_idx'),
+        ),
+        migrations.RunPython(fill_latest_ranking, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0005_expert_latest_ranking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expertlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
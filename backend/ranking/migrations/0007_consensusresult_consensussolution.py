@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0006_expertlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsensusResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inputs_json', models.TextField()),
+                ('summary_json', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConsensusSolution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('criterion', models.CharField(max_length=20)),
+                ('position', models.PositiveIntegerField()),
+                ('order_json', models.TextField()),
+                ('distances_json', models.TextField()),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solutions', to='ranking.consensusresult')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['result', 'criterion', 'position'], name='ranking_con_result__ba4b3e_idx')],
+            },
+        ),
+    ]
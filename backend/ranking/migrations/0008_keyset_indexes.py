@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ranking', '0007_consensusresult_consensussolution'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expertlog',
+            index=models.Index(fields=['timestamp', 'id'], name='ranking_exp_timesta_c39d40_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pairwisematrix',
+            index=models.Index(fields=['created_at', 'id'], name='ranking_pai_created_91419f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankedobject',
+            index=models.Index(fields=['created_at', 'id'], name='ranking_ran_created_fc8a0c_idx'),
+        ),
+    ]
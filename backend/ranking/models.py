@@ -1,10 +1,19 @@
 from django.db import models
+from django.utils import timezone
 import json
 
 
 class Expert(models.Model):
     name = models.CharField(max_length=100, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Kept up to date by save_ranking so readers skip the per-expert lookup
+    latest_ranking = models.ForeignKey(
+        "PairwiseMatrix",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
 
     def __str__(self):
         return self.name
@@ -15,6 +24,10 @@ class RankedObject(models.Model):
     details = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Keyset pages (pagination.py) walk (created_at, id) backwards
+        indexes = [models.Index(fields=["created_at", "id"])]
+
     def __str__(self):
         return self.name
 
@@ -24,7 +37,11 @@ class ExpertLog(models.Model):
     expert = models.ForeignKey(Expert, on_delete=models.CASCADE, null=True, blank=True)
     action = models.CharField(max_length=200)
     payload = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the entry is queued; the buffered writer saves it later
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["timestamp", "id"])]
 
     def __str__(self):
         return f"{self.timestamp} - {self.action}"
@@ -33,7 +50,99 @@ class ExpertLog(models.Model):
 class PairwiseMatrix(models.Model):
     expert = models.ForeignKey(Expert, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
-    matrix_json = models.TextField()
+    # Object ids best first; the pairwise and rank views are derived from it
+    order_json = models.TextField(default="[]")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expert", "created_at"]),
+            models.Index(fields=["created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"Ranking by {self.expert.name} ({self.created_at})"
+
+    @property
+    def order(self):
+        return json.loads(self.order_json)
+
+    @property
+    def matrix_data(self):
+        """The old stored format (n, order, i<j pairs, ranks), built on demand."""
+        return ranking_matrix_data(self.order)
+
+    @property
+    def matrix_json(self):
+        return json.dumps(self.matrix_data)
+
+
+def ranking_matrix_data(order):
+    n = len(order)
+    ids = [int(oid) for oid in order]
+    pairs = [[a, b, 1] for i, a in enumerate(ids) for b in ids[i + 1 :]]
+    return {
+        "n": n,
+        "order": order,
+        "pairs": pairs,
+        "ranks": {obj_id: idx + 1 for idx, obj_id in enumerate(order)},
+    }
+
+
+class ConsensusJob(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    # Snapshot of the inputs and solver options at submission time
+    params_json = models.TextField()
+    # Last saved enumeration position and trackers, empty until the first one
+    checkpoint_json = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Consensus job {self.id} ({self.status})"
+
+
+class ConsensusJobEvent(models.Model):
+    # The id doubles as the SSE event id clients send back in Last-Event-ID
+    job = models.ForeignKey(ConsensusJob, on_delete=models.CASCADE, related_name="events")
+    data = models.TextField()
+
+    def __str__(self):
+        return f"Event {self.id} of job {self.job_id}"
+
+
+class ConsensusResult(models.Model):
+    # Experts (name, order, weight) and objects the result was computed for
+    inputs_json = models.TextField()
+    # The final SSE event: criteria values, counts and timings, no solutions
+    summary_json = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Consensus result {self.id} ({self.created_at})"
+
+
+class ConsensusSolution(models.Model):
+    result = models.ForeignKey(
+        ConsensusResult, on_delete=models.CASCADE, related_name="solutions"
+    )
+    criterion = models.CharField(max_length=20)
+    # Place among the kept ties of the criterion, from 0
+    position = models.PositiveIntegerField()
+    order_json = models.TextField()
+    distances_json = models.TextField()
+
+    class Meta:
+        indexes = [models.Index(fields=["result", "criterion", "position"])]
+
+    def __str__(self):
+        return f"Solution {self.position} ({self.criterion}) of result {self.result_id}"
@@ -0,0 +1,99 @@
+"""MessagePack responses for clients that send ``Accept: application/msgpack``
+(or ``?format=msgpack``).
+
+A small stdlib-only encoder of what DRF responses hold: dicts, lists,
+strings, numbers, booleans and None, plus whatever DRF's JSON encoder
+turns into those (datetimes, decimals, ...). Integers take the smallest
+MessagePack form, so matrices of -1/0/1 and short object ids cost one
+byte per entry against two to four as JSON text, and any MessagePack
+library can read the result.
+"""
+
+import struct
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback = JSONEncoder()
+
+
+def _pack_int(value, out):
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -0x20 <= value < 0:
+        out.append(value & 0xFF)
+    elif value > 0:
+        for tag, fmt in ((b"\xcc", ">B"), (b"\xcd", ">H"), (b"\xce", ">I")):
+            if value < 1 << (8 * struct.calcsize(fmt)):
+                out += tag + struct.pack(fmt, value)
+                return
+        out += b"\xcf" + struct.pack(">Q", value)
+    else:
+        for tag, fmt in ((b"\xd0", ">b"), (b"\xd1", ">h"), (b"\xd2", ">i")):
+            if value >= -(1 << (8 * struct.calcsize(fmt) - 1)):
+                out += tag + struct.pack(fmt, value)
+                return
+        out += b"\xd3" + struct.pack(">q", value)
+
+
+def _pack_length(length, fix_tag, fix_max, tags, out):
+    """Header of a str/bin/array/map: the fix form, or a tag and 8/16/32-bit
+    length (``tags`` maps each width to its tag, None where it has none)."""
+    if fix_tag is not None and length <= fix_max:
+        out.append(fix_tag | length)
+    elif tags[0] is not None and length < 0x100:
+        out += tags[0] + struct.pack(">B", length)
+    elif length < 0x10000:
+        out += tags[1] + struct.pack(">H", length)
+    else:
+        out += tags[2] + struct.pack(">I", length)
+
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+    elif isinstance(obj, float):
+        out += b"\xcb" + struct.pack(">d", obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        _pack_length(len(data), 0xA0, 31, (b"\xd9", b"\xda", b"\xdb"), out)
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        _pack_length(len(obj), None, 0, (b"\xc4", b"\xc5", b"\xc6"), out)
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_length(len(obj), 0x90, 15, (None, b"\xdc", b"\xdd"), out)
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_length(len(obj), 0x80, 15, (None, b"\xde", b"\xdf"), out)
+        for key, value in obj.items():
+            # Keys as strings, like the JSON rendering of the same data
+            _pack(key if isinstance(key, str) else str(key), out)
+            _pack(value, out)
+    else:
+        _pack(_fallback.default(obj), out)
+
+
+def packb(obj):
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return packb(data)
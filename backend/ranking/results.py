@@ -0,0 +1,130 @@
+"""Stored consensus results, read back a page at a time.
+
+The final event of a consensus run only carries the criteria values and
+counts. The kept tied solutions are saved as one row each, so a page of
+them is one indexed range scan on (result, criterion, position); expert
+statistics are worked out for the page being read and expert matrices
+when one is asked for. Only the CONSENSUS_RESULTS_KEPT newest results
+are kept.
+"""
+
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from .consensus import rank_distance
+from .models import ConsensusResult, ConsensusSolution
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+
+# Rows per INSERT when saving the solutions
+SAVE_BATCH = 1000
+
+
+def store_consensus_result(summary, trackers, expert_data, objects, obj_ids):
+    """Saves a finished run and returns the new result id."""
+    inputs = {
+        "experts": [
+            {"name": e["name"], "order": e["order"], "weight": e["weight"]}
+            for e in expert_data
+        ],
+        "objects": [[oid, objects[oid].name] for oid in obj_ids],
+    }
+    with transaction.atomic():
+        result = ConsensusResult.objects.create(
+            inputs_json=json.dumps(inputs), summary_json=json.dumps(summary)
+        )
+        rows = (
+            ConsensusSolution(
+                result=result,
+                criterion=key,
+                position=position,
+                order_json=json.dumps(sol["order"]),
+                distances_json=json.dumps(sol["distances"]),
+            )
+            for key in summary["criteria"]
+            for position, sol in enumerate(trackers[key]["solutions"])
+        )
+        ConsensusSolution.objects.bulk_create(rows, batch_size=SAVE_BATCH)
+    prune_results()
+    return result.id
+
+
+def prune_results():
+    keep = settings.CONSENSUS_RESULTS_KEPT
+    stale = ConsensusResult.objects.order_by("-id").values_list("id", flat=True)[
+        keep : keep + 1
+    ]
+    if stale:
+        ConsensusResult.objects.filter(id__lte=stale[0]).delete()
+
+
+def result_exists(result_id):
+    return ConsensusResult.objects.filter(id=result_id).exists()
+
+
+def result_summary(result):
+    return {**json.loads(result.summary_json), "result_id": result.id}
+
+
+def result_inputs(result):
+    """Objects and experts of ``result`` the way calculate_consensus_stream
+    takes them: ({id: name}, obj_ids, expert_data)."""
+    inputs = json.loads(result.inputs_json)
+    names = {oid: name for oid, name in inputs["objects"]}
+    obj_ids = [oid for oid, _ in inputs["objects"]]
+    expert_data = [
+        {**exp, "ranks": {oid: idx + 1 for idx, oid in enumerate(exp["order"])}}
+        for exp in inputs["experts"]
+    ]
+    return names, obj_ids, expert_data
+
+
+def expert_stats(order, expert_data, obj_ids):
+    """Rank distance of every expert from ``order`` and the competence it
+    gives them (inverse distance, normalised over the experts)."""
+    center_ranks = {oid: i + 1 for i, oid in enumerate(order)}
+    dists = [rank_distance(center_ranks, exp["ranks"], obj_ids) for exp in expert_data]
+    total_inv_dist = sum(1 / (1 + d) for d in dists)
+    return [
+        {
+            "expert_name": exp["name"],
+            "d_rank": d,
+            "input_weight": exp["weight"],
+            "calculated_competence": (
+                round((1 / (1 + d)) / total_inv_dist, 4) if total_inv_dist > 0 else 0
+            ),
+        }
+        for exp, d in zip(expert_data, dists)
+    ]
+
+
+def solutions_page(result, criterion, offset, limit):
+    """Solutions ``offset`` to ``offset + limit`` of one criterion with their
+    expert statistics. Returns (solutions, next_offset); next_offset is None
+    on the last page."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = list(
+        ConsensusSolution.objects.filter(
+            result=result, criterion=criterion, position__gte=max(offset, 0)
+        ).order_by("position")[: limit + 1]
+    )
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = rows[-1].position + 1
+    names, obj_ids, expert_data = result_inputs(result)
+    solutions = []
+    for row in rows:
+        order = json.loads(row.order_json)
+        solutions.append(
+            {
+                "position": row.position,
+                "order": [{"id": oid, "name": names[oid]} for oid in order],
+                "distances": json.loads(row.distances_json),
+                "expert_stats": expert_stats(order, expert_data, obj_ids),
+            }
+        )
+    return solutions, next_offset
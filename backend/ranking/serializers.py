@@ -1,20 +1,36 @@
 from rest_framework import serializers
-from .models import RankedObject, ExpertLog, PairwiseMatrix, Expert
+from .models import RankedObject, ExpertLog, PairwiseMatrix, Expert, ConsensusJob
+import json
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """Takes an optional ``fields`` list and drops every other field; raises
+    ValueError when it names fields the serializer doesn't have."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            unknown = sorted(set(fields) - set(self.fields))
+            if unknown:
+                raise ValueError(f"unknown fields {unknown}")
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class ExpertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expert
-        fields = "__all__"
+        exclude = ["latest_ranking"]
 
 
-class RankedObjectSerializer(serializers.ModelSerializer):
+class RankedObjectSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = RankedObject
         fields = "__all__"
 
 
-class ExpertLogSerializer(serializers.ModelSerializer):
+class ExpertLogSerializer(DynamicFieldsModelSerializer):
     expert_name = serializers.CharField(source="expert.name", read_only=True)
 
     class Meta:
@@ -22,9 +38,34 @@ class ExpertLogSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class PairwiseMatrixSerializer(serializers.ModelSerializer):
+class PairwiseMatrixSerializer(DynamicFieldsModelSerializer):
     expert_name = serializers.CharField(source="expert.name", read_only=True)
+    # Rebuilt from the stored order in the old format, sent as an object
+    # rather than a JSON string inside the JSON
+    matrix_json = serializers.JSONField(source="matrix_data", read_only=True)
 
     class Meta:
         model = PairwiseMatrix
         fields = ["id", "expert", "expert_name", "created_at", "matrix_json"]
+
+
+class ConsensusJobSerializer(serializers.ModelSerializer):
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ConsensusJob
+        fields = [
+            "id",
+            "status",
+            "attempts",
+            "error",
+            "created_at",
+            "heartbeat_at",
+            "finished_at",
+            "position",
+        ]
+
+    def get_position(self, obj):
+        if not obj.checkpoint_json:
+            return 0
+        return json.loads(obj.checkpoint_json)["position"]
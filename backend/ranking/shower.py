@@ -0,0 +1,140 @@
+"""Rule table of the Lab 5 shower expert system.
+
+Facts f1-f7 are packed into a 7-bit mask and the rules are evaluated once
+for all 128 masks at import, so an inference is one list lookup. The rules
+and their order are the ones shower-inference/ always used.
+"""
+
+FACTS = ["f1", "f2", "f3", "f4", "f5", "f6", "f7"]
+
+LOG_HEADER = "--- [Classic Lab 5] ---"
+
+# Limits of the simulated valves and how far one action moves them
+VALVE_MAX = 100
+DEFAULT_STEP = 10
+
+# Largest batch / simulation accepted in one request
+MAX_BATCH = 10000
+MAX_STEPS = 10000
+
+# (facts that must be true, facts that must be false, action, fact
+# updates, reasoning), tried in order; the first match fires
+RULES = [
+    (["f7"], [], "NONE", {}, "Norm."),
+    (
+        ["f1", "f5"],
+        ["f4", "f7"],
+        "OPEN_COLD",
+        {"f5": False, "f7": True},
+        "Hot->Open Cold",
+    ),
+    (
+        ["f2", "f6"],
+        ["f3", "f7"],
+        "OPEN_HOT",
+        {"f6": False, "f7": True},
+        "Cold->Open Hot",
+    ),
+    (
+        ["f4", "f1", "f2", "f5"],
+        ["f7"],
+        "CLOSE_HOT",
+        {"f5": False, "f7": True},
+        "Hot+ColdMax->Close Hot",
+    ),
+    (
+        ["f3", "f1", "f2", "f6"],
+        ["f7"],
+        "CLOSE_COLD",
+        {"f6": False, "f7": True},
+        "Cold+HotMax->Close Cold",
+    ),
+]
+NO_RULE = ("NONE", {}, "No rule")
+
+
+def pack(facts):
+    """Bit i of the mask is the truth of FACTS[i]."""
+    mask = 0
+    for i, name in enumerate(FACTS):
+        if facts.get(name):
+            mask |= 1 << i
+    return mask
+
+
+def _decide(mask):
+    def bit(name):
+        return bool(mask & (1 << FACTS.index(name)))
+
+    for true, false, action, updates, reasoning in RULES:
+        if all(bit(f) for f in true) and not any(bit(f) for f in false):
+            return action, updates, reasoning
+    return NO_RULE
+
+
+TABLE = [_decide(mask) for mask in range(1 << len(FACTS))]
+
+
+def infer(facts):
+    """The shower-inference/ response for one fact dict."""
+    action, updates, reasoning = TABLE[pack(facts)]
+    return {
+        "facts": {**facts, **updates},
+        "logs": [LOG_HEADER],
+        "action": action,
+        # "Norm." and "No rule" leave the valves alone
+        "explanation": {"active": bool(updates), "reasoning": reasoning},
+    }
+
+
+def perceived(hot, cold):
+    """f5-f7 from the valve levels, as the frontend thermometer sees them."""
+    if hot == 0 and cold == 0:
+        return {"f5": False, "f6": False, "f7": False}
+    diff = hot - cold
+    return {"f5": diff > 15, "f6": diff < -15, "f7": -15 <= diff <= 15}
+
+
+def simulate(hot, cold, steps, step=DEFAULT_STEP, feelings=None):
+    """Runs the frontend's regulation loop for up to ``steps`` ticks.
+
+    Each tick derives f1-f4 from the valve levels and f5-f7 from the
+    perceived temperature (or keeps the user's ``feelings``), infers an
+    action and moves the matching valve by ``step``. Stops early once an
+    action leaves the levels unchanged, since every later tick would
+    repeat it. Returns the trace and the final levels.
+    """
+    trace = []
+    for tick in range(steps):
+        facts = {
+            "f1": hot > 0,
+            "f2": cold > 0,
+            "f3": hot >= VALVE_MAX,
+            "f4": cold >= VALVE_MAX,
+            **(feelings or perceived(hot, cold)),
+            "f8": step,
+        }
+        result = infer(facts)
+        action = result["action"]
+        before = (hot, cold)
+        if action == "OPEN_COLD":
+            cold = min(cold + step, VALVE_MAX)
+        elif action == "CLOSE_COLD":
+            cold = max(cold - step, 0)
+        elif action == "OPEN_HOT":
+            hot = min(hot + step, VALVE_MAX)
+        elif action == "CLOSE_HOT":
+            hot = max(hot - step, 0)
+        trace.append(
+            {
+                "tick": tick,
+                "facts": facts,
+                "action": action,
+                "explanation": result["explanation"],
+                "hot": hot,
+                "cold": cold,
+            }
+        )
+        if (hot, cold) == before:
+            break
+    return {"trace": trace, "hot": hot, "cold": cold, "steps_run": len(trace)}
@@ -0,0 +1,107 @@
+"""Async serving of consensus event streams under ASGI.
+
+The consensus generator is CPU-bound, so it runs on a small dedicated
+thread pool instead of the event loop. Events are passed to the response
+through a short queue, a heartbeat event goes out whenever the search has
+been quiet for CONSENSUS_HEARTBEAT_INTERVAL seconds, and when the client
+disconnects the producing thread stops pulling from the generator and
+closes it, so an abandoned run gives its thread back within one progress
+step instead of finishing the whole search. Other sync bodies (job event
+replays, the CSV export) are served the same way so they are sent as
+they are produced rather than collected in full first.
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+
+# Events buffered between the producing thread and a slow client
+QUEUE_SIZE = 16
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CONSENSUS_STREAM_THREADS,
+                thread_name_prefix="consensus-stream",
+            )
+        return _executor
+
+
+def is_async_request(request):
+    """Whether ``request`` (a DRF or Django request) is served over ASGI."""
+    request = getattr(request, "_request", request)
+    return settings.CONSENSUS_ASYNC_STREAMING and isinstance(request, ASGIRequest)
+
+
+def heartbeat_event():
+    return f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+
+
+def produce(stream, queue, loop, cancelled):
+    """Runs on the executor: feeds ``stream`` into ``queue`` until done or
+    cancelled, then closes it. None (or the exception raised) marks the end
+    of the stream. Empty chunks are not sent; a stream that waits on
+    something can yield them to be stopped while it waits."""
+
+    def put(item):
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        # Blocks while the queue is full, so a slow client slows the search
+        while not cancelled.is_set():
+            try:
+                return future.result(timeout=0.5)
+            except FutureTimeout:
+                continue
+        future.cancel()
+
+    end = None
+    try:
+        for event in stream:
+            if cancelled.is_set():
+                return
+            if event:
+                put(event)
+    except Exception as exc:
+        end = exc
+    finally:
+        stream.close()
+        # Pool threads outlive the stream; don't leave its connection open
+        connection.close()
+    put(end)
+
+
+async def async_event_stream(stream, heartbeat=True):
+    """Async iterator over the chunks of the sync generator ``stream``;
+    SSE heartbeats are added in quiet spells unless ``heartbeat`` is off
+    (for bodies that are not event streams)."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(QUEUE_SIZE)
+    cancelled = threading.Event()
+    loop.run_in_executor(get_executor(), produce, stream, queue, loop, cancelled)
+    interval = settings.CONSENSUS_HEARTBEAT_INTERVAL if heartbeat else None
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), interval)
+            except asyncio.TimeoutError:
+                yield heartbeat_event()
+                continue
+            if event is None:
+                return
+            if isinstance(event, Exception):
+                raise event
+            yield event
+    finally:
+        # Done, or the client went away (CancelledError): stop the thread
+        cancelled.set()
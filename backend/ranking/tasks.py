@@ -0,0 +1,97 @@
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ConsensusJob, ConsensusJobEvent, RankedObject
+from .views import calculate_consensus_stream
+
+
+def claim_next_job():
+    """Marks the oldest queued job, or a running one whose worker went
+    silent, as taken by this worker and returns it (None if there is none).
+
+    A silent job that already had CONSENSUS_JOB_MAX_ATTEMPTS workers is
+    marked failed instead, so one that kills its worker every time (e.g.
+    out of memory) is not retried forever.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.CONSENSUS_JOB_STALE_AFTER)
+    candidates = ConsensusJob.objects.filter(
+        Q(status="queued") | Q(status="running", heartbeat_at__lt=stale)
+    ).order_by("created_at")
+    for job in candidates[:5]:
+        # Compare-and-set so two workers never run the same job
+        same_job = ConsensusJob.objects.filter(
+            pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at
+        )
+        if job.attempts >= settings.CONSENSUS_JOB_MAX_ATTEMPTS:
+            error = f"worker stopped responding in each of {job.attempts} attempts"
+            if same_job.update(
+                status="failed", error=error, finished_at=timezone.now()
+            ):
+                ConsensusJobEvent.objects.create(
+                    job=job, data=json.dumps({"type": "error", "message": error})
+                )
+            continue
+        claimed = same_job.update(
+            status="running", heartbeat_at=timezone.now(), attempts=F("attempts") + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def run_job(job):
+    """Runs one consensus job, storing its SSE events and checkpoints.
+
+    A job that already has a checkpoint continues from the saved
+    enumeration position and trackers instead of starting over.
+    """
+    params = json.loads(job.params_json)
+    obj_ids = [oid for oid, _ in params["objects"]]
+    objects_map = {
+        oid: RankedObject(id=oid, name=name) for oid, name in params["objects"]
+    }
+    expert_data = [
+        {**exp, "ranks": {oid: idx + 1 for idx, oid in enumerate(exp["order"])}}
+        for exp in params["experts"]
+    ]
+    resume = json.loads(job.checkpoint_json) if job.checkpoint_json else None
+    last_saved = [time.time()]
+
+    def checkpoint(position, trackers):
+        now = time.time()
+        if now - last_saved[0] < settings.CONSENSUS_CHECKPOINT_INTERVAL:
+            return
+        last_saved[0] = now
+        ConsensusJob.objects.filter(pk=job.pk).update(
+            checkpoint_json=json.dumps({"position": position, "trackers": trackers}),
+            heartbeat_at=timezone.now(),
+        )
+
+    try:
+        for event in calculate_consensus_stream(
+            expert_data,
+            objects_map,
+            obj_ids,
+            resume=resume,
+            checkpoint=checkpoint,
+            **params["options"],
+        ):
+            ConsensusJobEvent.objects.create(job=job, data=event[len("data: ") :].strip())
+            ConsensusJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+    except Exception as exc:
+        ConsensusJobEvent.objects.create(
+            job=job, data=json.dumps({"type": "error", "message": str(exc)})
+        )
+        ConsensusJob.objects.filter(pk=job.pk).update(
+            status="failed", error=str(exc), finished_at=timezone.now()
+        )
+        return
+    ConsensusJob.objects.filter(pk=job.pk).update(
+        status="done", finished_at=timezone.now()
+    )
@@ -0,0 +1,80 @@
+"""The buffered ExpertLog writer, in both modes."""
+
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from .. import audit
+from ..models import Expert, ExpertLog, RankedObject
+
+# Keeps save-ranking's cache invalidation off the on-disk store
+TEST_CACHES = {
+    name: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for name in ["default", "consensus", "consensus_disk", "consensus_warm"]
+}
+
+
+@override_settings(EXPERT_LOG_ASYNC=False)
+class SyncAuditTests(TestCase):
+    def test_saved_on_the_spot(self):
+        flushed = audit.log_stats()["flushed"]
+        audit.log_action("test", "{}")
+        self.assertEqual(ExpertLog.objects.get().action, "test")
+        stats = audit.log_stats()
+        self.assertEqual(stats["flushed"], flushed + 1)
+        self.assertEqual(stats["pending"], 0)
+
+    @override_settings(CACHES=TEST_CACHES)
+    def test_save_ranking_logs_with_its_expert(self):
+        obj = RankedObject.objects.create(name="A")
+        expert = Expert.objects.create(name="Expert")
+        response = self.client.post(
+            "/api/save-ranking/",
+            {"expertId": expert.id, "order": [obj.id]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        entry = ExpertLog.objects.get(action="save_ranking")
+        self.assertEqual(entry.expert, expert)
+        self.assertEqual(json.loads(entry.payload), {"order": [obj.id]})
+
+
+# The writer thread stays off so the tests decide when entries are written
+@override_settings(
+    EXPERT_LOG_ASYNC=True, EXPERT_LOG_BATCH_SIZE=100, EXPERT_LOG_MAX_PENDING=3
+)
+@mock.patch("ranking.audit._start_worker")
+class AsyncAuditTests(TestCase):
+    def tearDown(self):
+        with audit._lock:
+            audit._pending.clear()
+
+    def test_queued_until_flushed(self, start_worker):
+        audit.log_action("first", "{}")
+        audit.log_action("second", "{}")
+        self.assertTrue(start_worker.called)
+        self.assertFalse(ExpertLog.objects.exists())
+        self.assertEqual(audit.log_stats()["pending"], 2)
+
+        self.assertEqual(audit.flush_logs(), 2)
+        self.assertEqual(audit.flush_logs(), 0)
+        # Stamped when queued, so the order survives the batch
+        actions = ExpertLog.objects.order_by("timestamp").values_list(
+            "action", flat=True
+        )
+        self.assertEqual(list(actions), ["first", "second"])
+
+    def test_full_queue_drops(self, start_worker):
+        dropped = audit.log_stats()["dropped"]
+        for i in range(5):
+            audit.log_action(f"action {i}", "{}")
+        stats = audit.log_stats()
+        self.assertEqual(stats["pending"], 3)
+        self.assertEqual(stats["dropped"], dropped + 2)
+
+    def test_logs_list_flushes(self, start_worker):
+        audit.log_action("queued", "{}")
+        response = self.client.get("/api/logs/")
+        self.assertEqual([row["action"] for row in response.json()], ["queued"])
+        self.assertEqual(audit.log_stats()["pending"], 0)
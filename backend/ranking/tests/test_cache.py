@@ -0,0 +1,120 @@
+"""The consensus result cache: keys, hits and invalidation on writes."""
+
+import json
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..cache import consensus_cache_key
+from ..models import Expert, PairwiseMatrix, RankedObject
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+# In memory and per test, so the tests never touch the on-disk store
+TEST_CACHES = {
+    name: {"BACKEND": LOCMEM, "LOCATION": f"test-{name}"}
+    for name in ["default", "consensus", "consensus_disk", "consensus_warm"]
+}
+
+
+class CacheKeyTests(SimpleTestCase):
+    objects = {1: RankedObject(id=1, name="A"), 2: RankedObject(id=2, name="B")}
+    experts = [{"name": "Expert", "order": [2, 1], "weight": 1.0}]
+
+    def key(self, solver, experts=None, limit=1000, count_ties=False):
+        return consensus_cache_key(
+            experts or self.experts,
+            self.objects,
+            [1, 2],
+            ["k1_rank"],
+            limit,
+            solver,
+            count_ties,
+        )
+
+    def test_exact_solvers_share_a_key(self):
+        key = self.key("exhaustive")
+        for solver in ["vectorized", "sjt"]:
+            self.assertEqual(self.key(solver), key)
+        self.assertEqual(self.key("exact", count_ties=True), key)
+        # Nothing to cut short without a limit
+        self.assertEqual(self.key("exact", limit=None), self.key("sjt", limit=None))
+
+    def test_own_keys(self):
+        key = self.key("exhaustive")
+        # Counts may be lower bounds
+        self.assertNotEqual(self.key("exact"), key)
+        self.assertNotEqual(self.key("borda"), key)
+        self.assertNotEqual(self.key("borda"), self.key("copeland"))
+
+    def test_inputs_change_the_key(self):
+        key = self.key("exhaustive")
+        reweighted = [{**self.experts[0], "weight": 2.0}]
+        self.assertNotEqual(self.key("exhaustive", reweighted), key)
+        reordered = [{**self.experts[0], "order": [1, 2]}]
+        self.assertNotEqual(self.key("exhaustive", reordered), key)
+        self.assertNotEqual(self.key("exhaustive", limit=5), key)
+
+
+@override_settings(CACHES=TEST_CACHES, EXPERT_LOG_ASYNC=False)
+class CacheInvalidationTests(TestCase):
+    def setUp(self):
+        objects = RankedObject.objects.bulk_create(
+            [RankedObject(name=f"Object {i}") for i in range(4)]
+        )
+        self.obj_ids = [o.id for o in objects]
+        self.expert = Expert.objects.create(name="Expert")
+        ranking = PairwiseMatrix.objects.create(
+            expert=self.expert, order_json=json.dumps(self.obj_ids)
+        )
+        Expert.objects.filter(id=self.expert.id).update(latest_ranking=ranking)
+
+    def consensus(self):
+        response = self.client.post(
+            "/api/calculate-consensus/", {}, content_type="application/json"
+        )
+        body = b"".join(response.streaming_content).decode()
+        events = [json.loads(e[6:]) for e in body.split("\n\n") if e[:6] == "data: "]
+        return next(e for e in events if e["type"] == "result")
+
+    def test_repeated_request_is_cached(self):
+        first = self.consensus()
+        self.assertFalse(first["cached"])
+        second = self.consensus()
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["criteria"], first["criteria"])
+        self.assertEqual(second["result_id"], first["result_id"])
+
+    def test_disk_store_backs_memory(self):
+        self.consensus()
+        caches["consensus"].clear()
+        self.assertTrue(self.consensus()["cached"])
+
+    # Keys are content addressed, so these writes leave the inputs as they
+    # were: only the invalidation can make the next request miss
+
+    def test_save_ranking_invalidates(self):
+        self.consensus()
+        response = self.client.post(
+            "/api/save-ranking/",
+            {"expertId": self.expert.id, "order": self.obj_ids},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.consensus()["cached"])
+
+    def test_upload_invalidates(self):
+        self.consensus()
+        upload = SimpleUploadedFile("objects.csv", b"name\nObject 0\n")
+        response = self.client.post("/api/upload-csv/?header=1", {"file": upload})
+        self.assertEqual(response.json()["inserted"], 0)
+        self.assertFalse(self.consensus()["cached"])
+
+    def test_create_object_invalidates(self):
+        self.consensus()
+        response = self.client.post("/api/objects/", {"name": "Object 9"})
+        self.assertEqual(response.status_code, 201)
+        result = self.consensus()
+        self.assertFalse(result["cached"])
+        self.assertEqual(len(result["objects_header"]), 5)
@@ -0,0 +1,450 @@
+"""Every exact consensus engine against the exhaustive search.
+
+Inputs are small seeded random rankings: experts with partial orders,
+objects nobody ranked, ids outside the ranked set, float weights, and
+runs where most experts agree so there are many tied optima. Each engine
+must reach the same value, count the same ties and keep the same
+solutions in the same order as ``exhaustive_search``.
+"""
+
+import copy
+import math
+import random
+import time
+
+from django.test import SimpleTestCase
+
+from ..consensus import (
+    CRITERIA,
+    EXACT_SEARCHES,
+    branch_and_bound,
+    build_cost_tables,
+    chunked_search,
+    exact_search,
+    exhaustive_search,
+    footrule_assignment,
+    kemeny_dp,
+    new_tracker,
+    new_trackers,
+    sharded_search,
+    sjt_search,
+    vectorized_search,
+)
+
+WEIGHTS = [1.0, 0.5, 2.0, 0.3, 1.7, 0.25]
+
+
+def make_experts(n, m, seed, ties=False):
+    """``m`` experts over objects 10..10+n (plus two ids outside the set),
+    prepared the way calculate_consensus_stream does it."""
+    rnd = random.Random(seed)
+    obj_ids = list(range(10, 10 + n))
+    universe = obj_ids + [900, 901]
+    shared = rnd.sample(universe, len(universe))
+    experts = []
+    for e in range(m):
+        if ties and rnd.random() < 0.7:
+            order = list(shared)
+        else:
+            order = rnd.sample(universe, len(universe))
+        if rnd.random() < 0.4:
+            order = order[: rnd.randint(0, len(order))]
+        valid = [o for o in order if o in obj_ids]
+        experts.append(
+            {
+                "name": f"expert {e}",
+                "weight": rnd.choice(WEIGHTS),
+                "ranks": {oid: i + 1 for i, oid in enumerate(order)},
+                "pairs": {
+                    (valid[i], valid[j])
+                    for i in range(len(valid))
+                    for j in range(i + 1, len(valid))
+                },
+            }
+        )
+    return experts, obj_ids
+
+
+def run(search):
+    """Drives an engine generator to the end and returns its result."""
+    while True:
+        try:
+            next(search)
+        except StopIteration as done:
+            return done.value
+
+
+def cases():
+    """(label, experts, obj_ids) for the seeded inputs, up to 8 objects."""
+    out = []
+    for seed in range(12):
+        n = [1, 2, 3, 4, 5, 6][seed % 6]
+        m = [1, 2, 3, 5][seed % 4]
+        out.append((f"n={n} m={m} seed={seed}", *make_experts(n, m, seed)))
+        out.append(
+            (f"ties n={n} m={m} seed={seed}", *make_experts(n, m, seed, ties=True))
+        )
+    for seed in range(2):
+        out.append((f"n=7 seed={seed}", *make_experts(7, 3, 100 + seed, ties=seed)))
+    out.append(("n=8", *make_experts(8, 2, 200, ties=True)))
+    out.append(("no experts", [], list(range(10, 14))))
+    out.append(("no objects", *make_experts(0, 3, 300)))
+    return out
+
+
+CASES = cases()
+
+
+def chunk_size(obj_ids):
+    """A handful of chunks per run, whatever the number of objects."""
+    return max(1, math.factorial(len(obj_ids)) // 7)
+
+
+class OracleTestCase(SimpleTestCase):
+    def assertSameTracker(self, expected, actual, msg):
+        if expected["val"] == float("inf"):
+            self.assertEqual(actual["val"], expected["val"], msg)
+        else:
+            self.assertAlmostEqual(actual["val"], expected["val"], msg=msg)
+        if actual["count_exact"]:
+            self.assertEqual(actual["count"], expected["count"], msg)
+        else:
+            # Cut short past the kept ties: a lower bound
+            self.assertGreaterEqual(actual["count"], len(actual["solutions"]), msg)
+            self.assertLessEqual(actual["count"], expected["count"], msg)
+        self.assertEqual(
+            [s["order"] for s in actual["solutions"]],
+            [s["order"] for s in expected["solutions"]],
+            msg,
+        )
+        for got, want in zip(actual["solutions"], expected["solutions"]):
+            for a, b in zip(got["distances"], want["distances"]):
+                self.assertAlmostEqual(a, b, msg=msg)
+
+    def assertSameTrackers(self, expected, actual, msg, criteria=CRITERIA):
+        for key in criteria:
+            self.assertSameTracker(expected[key], actual[key], f"{msg} {key}")
+
+    _oracle_results = {}
+
+    def oracle(self, experts, obj_ids, limit=None):
+        """Exhaustive trackers for the inputs, worked out once per limit."""
+        key = (id(experts), limit)
+        if key not in self._oracle_results:
+            trackers = new_trackers(limit)
+            self._oracle_results[key] = run(
+                exhaustive_search(experts, obj_ids, trackers=trackers)
+            )
+        return copy.deepcopy(self._oracle_results[key])
+
+
+class ExactEngineTests(OracleTestCase):
+    def test_vectorized_search(self):
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            actual = run(vectorized_search(experts, obj_ids))
+            self.assertSameTrackers(expected, actual, label)
+            small_blocks = run(vectorized_search(experts, obj_ids, block_size=7))
+            self.assertSameTrackers(expected, small_blocks, f"{label} blocks of 7")
+
+    def test_sjt_search(self):
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            self.assertSameTrackers(expected, run(sjt_search(experts, obj_ids)), label)
+
+    def test_exact_search(self):
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            actual = run(exact_search(experts, obj_ids))
+            self.assertSameTrackers(expected, actual, label)
+
+    def test_footrule_assignment(self):
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            tables = build_cost_tables(experts, obj_ids, with_pairs=False)
+            actual = run(footrule_assignment(tables, obj_ids))
+            self.assertSameTracker(expected["k1_rank"], actual, label)
+
+    def test_kemeny_dp(self):
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            tables = build_cost_tables(experts, obj_ids)
+            actual = run(kemeny_dp(tables, obj_ids))
+            self.assertSameTracker(expected["k1_hamming"], actual, label)
+
+    def test_branch_and_bound(self):
+        # Every criterion, including the K1 ones exact_search hands to the
+        # assignment and subset DP solvers
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            tables = build_cost_tables(experts, obj_ids)
+            for key, criterion, aggregate in EXACT_SEARCHES:
+                actual = run(branch_and_bound(tables, obj_ids, criterion, aggregate))
+                self.assertSameTracker(expected[key], actual, f"{label} {key}")
+
+    def test_branch_and_bound_upper_bound(self):
+        # A bound reached by some order must not lose any of its ties
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            tables = build_cost_tables(experts, obj_ids)
+            for key, criterion, aggregate in EXACT_SEARCHES:
+                if expected[key]["val"] == float("inf"):
+                    continue
+                actual = run(
+                    branch_and_bound(
+                        tables,
+                        obj_ids,
+                        criterion,
+                        aggregate,
+                        upper_bound=expected[key]["val"],
+                    )
+                )
+                self.assertSameTracker(expected[key], actual, f"{label} {key}")
+
+    def test_chunked_search(self):
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            for engine in (exhaustive_search, vectorized_search):
+                search = chunked_search(
+                    engine, experts, obj_ids, new_trackers(), chunk=chunk_size(obj_ids)
+                )
+                actual = run(search)
+                self.assertSameTrackers(expected, actual, f"{label} {engine.__name__}")
+
+    def test_chunked_search_resumes_from_checkpoint(self):
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            checkpoints = []
+
+            def on_chunk(position, trackers):
+                checkpoints.append((position, copy.deepcopy(trackers)))
+
+            run(
+                chunked_search(
+                    exhaustive_search,
+                    experts,
+                    obj_ids,
+                    new_trackers(),
+                    chunk=chunk_size(obj_ids),
+                    on_chunk=on_chunk,
+                )
+            )
+            for position, trackers in checkpoints[:: max(1, len(checkpoints) // 4)]:
+                actual = run(
+                    chunked_search(
+                        vectorized_search,
+                        experts,
+                        obj_ids,
+                        trackers,
+                        start=position,
+                        chunk=chunk_size(obj_ids),
+                    )
+                )
+                self.assertSameTrackers(expected, actual, f"{label} from {position}")
+
+    def test_sharded_search(self):
+        # Shards are merged in index order, so the tie order survives
+        for label, experts, obj_ids in CASES[::3]:
+            expected = self.oracle(experts, obj_ids)
+            for vectorized in (False, True):
+                actual = run(sharded_search(experts, obj_ids, 2, vectorized=vectorized))
+                self.assertSameTrackers(
+                    expected, actual, f"{label} vectorized={vectorized}"
+                )
+
+
+class SolutionLimitTests(OracleTestCase):
+    """A bounded tracker keeps the first ``limit`` ties of the exhaustive
+    order. The exhaustive engines still count all ties, the exact solvers
+    only with ``count_all``."""
+
+    LIMITS = [1, 2, 5]
+
+    def test_exhaustive_search(self):
+        for label, experts, obj_ids in CASES:
+            full = self.oracle(experts, obj_ids)
+            for limit in self.LIMITS:
+                bounded = self.oracle(experts, obj_ids, limit)
+                for key in CRITERIA:
+                    self.assertEqual(bounded[key]["count"], full[key]["count"])
+                    self.assertEqual(
+                        bounded[key]["solutions"], full[key]["solutions"][:limit]
+                    )
+
+    def test_engines(self):
+        engines = {
+            "vectorized": lambda e, o, t: vectorized_search(e, o, trackers=t),
+            "sjt": lambda e, o, t: sjt_search(e, o, t),
+            "exact": lambda e, o, t: exact_search(e, o, trackers=t),
+            "chunked": lambda e, o, t: chunked_search(
+                vectorized_search, e, o, t, chunk=chunk_size(o)
+            ),
+        }
+        for label, experts, obj_ids in CASES:
+            for limit in self.LIMITS:
+                expected = self.oracle(experts, obj_ids, limit)
+                for name, engine in engines.items():
+                    actual = run(engine(experts, obj_ids, new_trackers(limit)))
+                    self.assertSameTrackers(
+                        expected, actual, f"{label} {name} limit={limit}"
+                    )
+                    if name != "exact":
+                        for key in CRITERIA:
+                            self.assertTrue(actual[key]["count_exact"])
+
+    def test_exact_search_counts(self):
+        cut_short = 0
+        for label, experts, obj_ids in CASES:
+            for limit in self.LIMITS:
+                expected = self.oracle(experts, obj_ids, limit)
+                msg = f"{label} limit={limit}"
+                trackers = new_trackers(limit, count_all=True)
+                actual = run(exact_search(experts, obj_ids, trackers=trackers))
+                self.assertSameTrackers(expected, actual, f"{msg} count_all")
+                for key in CRITERIA:
+                    self.assertTrue(actual[key]["count_exact"], f"{msg} {key}")
+                trackers = new_trackers(limit)
+                bounded = run(exact_search(experts, obj_ids, trackers=trackers))
+                for key in CRITERIA:
+                    if not bounded[key]["count_exact"]:
+                        # Only cut short once the limit was reached
+                        self.assertGreaterEqual(bounded[key]["count"], limit, msg)
+                        cut_short += 1
+                    elif expected[key]["count"] > limit:
+                        self.fail(f"{msg} {key}: counted every tie past the limit")
+        self.assertGreater(cut_short, 0)
+
+    def test_footrule_assignment_many_objects(self):
+        # Without experts all 150! orders tie; with experts ranking only
+        # their top five the unranked objects do. Either must stop at the
+        # limit instead of enumerating them.
+        obj_ids = list(range(10, 160))
+        experts, _ = make_experts(150, 3, 400)
+        partial = [
+            {**e, "ranks": {o: r for o, r in e["ranks"].items() if r <= 5}}
+            for e in experts
+        ]
+        for label, inputs in [("no experts", []), ("top five", partial)]:
+            started = time.perf_counter()
+            tables = build_cost_tables(inputs, obj_ids, with_pairs=False)
+            tracker = run(footrule_assignment(tables, obj_ids, new_tracker(10)))
+            self.assertLess(time.perf_counter() - started, 5.0, label)
+            orders = {tuple(s["order"]) for s in tracker["solutions"]}
+            self.assertEqual(len(orders), 10, label)
+            self.assertGreaterEqual(tracker["count"], 10, label)
+            self.assertFalse(tracker["count_exact"], label)
+
+    def test_branch_and_bound_k2_plateau(self):
+        # Half the experts reverse the others, so each order is 2 * 45 away
+        # from the two camps together: K2 Hamming is at least 45 everywhere
+        # but, with even distances only, 46 at best. The bounds must see
+        # that, or all of the many orders bounded by 45 are visited.
+        obj_ids = list(range(10, 20))
+        experts = []
+        for e in range(20):
+            order = obj_ids if e % 2 else obj_ids[::-1]
+            experts.append(
+                {
+                    "weight": 1.0,
+                    "ranks": {oid: i + 1 for i, oid in enumerate(order)},
+                    "pairs": {
+                        (order[i], order[j])
+                        for i in range(len(order))
+                        for j in range(i + 1, len(order))
+                    },
+                }
+            )
+        started = time.perf_counter()
+        tables = build_cost_tables(experts, obj_ids)
+        tracker = run(
+            branch_and_bound(tables, obj_ids, "hamming", "max", tracker=new_tracker(10))
+        )
+        self.assertLess(time.perf_counter() - started, 5.0)
+        self.assertEqual(tracker["val"], 46)
+        self.assertEqual(len(tracker["solutions"]), 10)
+        self.assertFalse(tracker["count_exact"])
+
+    def test_single_criterion_solvers(self):
+        for label, experts, obj_ids in CASES:
+            tables = build_cost_tables(experts, obj_ids)
+            for limit in self.LIMITS:
+                expected = self.oracle(experts, obj_ids, limit)
+                msg = f"{label} limit={limit}"
+                self.assertSameTracker(
+                    expected["k1_rank"],
+                    run(footrule_assignment(tables, obj_ids, new_tracker(limit))),
+                    msg,
+                )
+                self.assertSameTracker(
+                    expected["k1_hamming"],
+                    run(kemeny_dp(tables, obj_ids, new_tracker(limit))),
+                    msg,
+                )
+                for key, criterion, aggregate in EXACT_SEARCHES:
+                    search = branch_and_bound(
+                        tables,
+                        obj_ids,
+                        criterion,
+                        aggregate,
+                        tracker=new_tracker(limit),
+                    )
+                    self.assertSameTracker(expected[key], run(search), f"{msg} {key}")
+
+    def test_sharded_search(self):
+        for label, experts, obj_ids in CASES[1::4]:
+            expected = self.oracle(experts, obj_ids, 2)
+            actual = run(sharded_search(experts, obj_ids, 2, trackers=new_trackers(2)))
+            self.assertSameTrackers(expected, actual, label)
+
+
+class CriteriaSubsetTests(OracleTestCase):
+    """Engines asked for some criteria match the oracle on those and leave
+    the trackers of the others untouched."""
+
+    SUBSETS = [
+        ["k1_rank"],
+        ["k2_rank"],
+        ["k1_hamming"],
+        ["k2_hamming"],
+        ["k1_rank", "k1_hamming"],
+        ["k2_rank", "k2_hamming"],
+        ["k1_hamming", "k2_rank"],
+    ]
+
+    def assertUntouched(self, trackers, criteria, msg):
+        for key in CRITERIA:
+            if key not in criteria:
+                self.assertEqual(trackers[key], new_tracker(), f"{msg} {key}")
+
+    def test_engines(self):
+        engines = {
+            "exhaustive": lambda e, o, c: exhaustive_search(e, o, criteria=c),
+            "vectorized": lambda e, o, c: vectorized_search(e, o, criteria=c),
+            "sjt": lambda e, o, c: sjt_search(e, o, criteria=c),
+            "exact": lambda e, o, c: exact_search(e, o, criteria=c),
+            "chunked": lambda e, o, c: chunked_search(
+                exhaustive_search,
+                e,
+                o,
+                new_trackers(),
+                chunk=chunk_size(o),
+                criteria=c,
+            ),
+        }
+        for label, experts, obj_ids in CASES:
+            expected = self.oracle(experts, obj_ids)
+            for criteria in self.SUBSETS:
+                for name, engine in engines.items():
+                    msg = f"{label} {name} {criteria}"
+                    actual = run(engine(experts, obj_ids, criteria))
+                    self.assertSameTrackers(expected, actual, msg, criteria)
+                    self.assertUntouched(actual, criteria, msg)
+
+    def test_sharded_search(self):
+        for label, experts, obj_ids in CASES[2::6]:
+            expected = self.oracle(experts, obj_ids)
+            for criteria in self.SUBSETS[4:]:
+                msg = f"{label} {criteria}"
+                actual = run(sharded_search(experts, obj_ids, 2, criteria=criteria))
+                self.assertSameTrackers(expected, actual, msg, criteria)
+                self.assertUntouched(actual, criteria, msg)
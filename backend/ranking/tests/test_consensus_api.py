@@ -0,0 +1,37 @@
+"""Request validation of calculate-consensus/ and consensus-jobs/."""
+
+from django.test import TestCase, override_settings
+
+from ..models import ConsensusJob, RankedObject
+
+
+@override_settings(CONSENSUS_EXACT_MAX_N=3)
+class ExactSolverLimitTests(TestCase):
+    def setUp(self):
+        RankedObject.objects.bulk_create(
+            [RankedObject(name=f"Object {i}") for i in range(4)]
+        )
+
+    def test_branch_and_bound_criteria_refused(self):
+        for url in ["/api/calculate-consensus/", "/api/consensus-jobs/"]:
+            for criteria in [None, ["k2_rank"], ["k1_rank", "k2_hamming"]]:
+                body = {"solver": "exact"}
+                if criteria:
+                    body["criteria"] = criteria
+                response = self.client.post(url, body, content_type="application/json")
+                self.assertEqual(response.status_code, 400, f"{url} {criteria}")
+                self.assertIn("at most 3 objects, not 4", response.json()["error"])
+        self.assertFalse(ConsensusJob.objects.exists())
+
+    def test_within_the_limit(self):
+        bodies = [
+            # K1 Hamming only needs branch and bound past KEMENY_DP_MAX_N
+            {"solver": "exact", "criteria": ["k1_rank", "k1_hamming"]},
+            {"solver": "exact", "limit_objects": 3},
+            {"solver": "local_search"},
+        ]
+        for body in bodies:
+            response = self.client.post(
+                "/api/consensus-jobs/", body, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 201, body)
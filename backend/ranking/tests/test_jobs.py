@@ -0,0 +1,180 @@
+"""Background consensus jobs: submission, claiming, resuming and replay."""
+
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from ..consensus import chunked_search, exhaustive_search, new_trackers
+from ..models import (
+    ConsensusJob,
+    ConsensusJobEvent,
+    Expert,
+    PairwiseMatrix,
+    RankedObject,
+)
+from ..tasks import claim_next_job, run_job
+
+
+def create_rankings(n=6):
+    """n objects and three experts' latest rankings of them."""
+    objects = RankedObject.objects.bulk_create(
+        [RankedObject(name=f"Object {i}") for i in range(n)]
+    )
+    ids = [o.id for o in objects]
+    orders = [ids, ids[::-1], ids[1:] + ids[:1]]
+    for i, order in enumerate(orders):
+        expert = Expert.objects.create(name=f"Expert {i}")
+        ranking = PairwiseMatrix.objects.create(
+            expert=expert, order_json=json.dumps(order)
+        )
+        Expert.objects.filter(id=expert.id).update(latest_ranking=ranking)
+    return ids
+
+
+def job_events(job):
+    return [json.loads(e.data) for e in job.events.order_by("id")]
+
+
+def result_of(job):
+    return next(e for e in job_events(job) if e["type"] == "result")
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.obj_ids = create_rankings()
+
+    def submit(self, **body):
+        response = self.client.post(
+            "/api/consensus-jobs/", body, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        return ConsensusJob.objects.get(id=response.json()["id"])
+
+    def test_create_snapshots_the_inputs(self):
+        job = self.submit(solver="vectorized", criteria=["k1_rank"])
+        self.assertEqual(job.status, "queued")
+        params = json.loads(job.params_json)
+        self.assertEqual([oid for oid, _ in params["objects"]], self.obj_ids)
+        self.assertEqual(len(params["experts"]), 3)
+        self.assertEqual(params["options"]["solver"], "vectorized")
+        self.assertEqual(params["options"]["criteria"], ["k1_rank"])
+        # Only used to pick the inputs
+        self.assertNotIn("weights", params["options"])
+        self.assertNotIn("limit_objects", params["options"])
+
+    def test_claim(self):
+        job = self.submit()
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, "running")
+        self.assertEqual(claimed.attempts, 1)
+        # Its worker is alive, so nobody else takes it
+        self.assertIsNone(claim_next_job())
+
+        stale = timezone.now() - timedelta(
+            seconds=settings.CONSENSUS_JOB_STALE_AFTER + 1
+        )
+        ConsensusJob.objects.filter(id=job.id).update(heartbeat_at=stale)
+        self.assertEqual(claim_next_job().attempts, 2)
+
+    def test_claim_gives_up_after_max_attempts(self):
+        job = self.submit()
+        stale = timezone.now() - timedelta(
+            seconds=settings.CONSENSUS_JOB_STALE_AFTER + 1
+        )
+        ConsensusJob.objects.filter(id=job.id).update(
+            status="running",
+            heartbeat_at=stale,
+            attempts=settings.CONSENSUS_JOB_MAX_ATTEMPTS,
+        )
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertIn("stopped responding", job.error)
+        self.assertEqual(job_events(job)[-1]["type"], "error")
+
+    def test_resume_from_checkpoint(self):
+        full = self.submit()
+        run_job(claim_next_job())
+        full.refresh_from_db()
+        self.assertEqual(full.status, "done")
+
+        # A checkpoint as run_job saves it, taken a few chunks into the run
+        job = self.submit()
+        params = json.loads(job.params_json)
+        options = params["options"]
+        prepared = []
+        for exp in params["experts"]:
+            order = exp["order"]
+            prepared.append(
+                {
+                    "weight": exp["weight"],
+                    "ranks": {oid: i + 1 for i, oid in enumerate(order)},
+                    "pairs": {
+                        (a, b) for i, a in enumerate(order) for b in order[i + 1 :]
+                    },
+                }
+            )
+        saved = []
+        search = chunked_search(
+            exhaustive_search,
+            prepared,
+            self.obj_ids,
+            new_trackers(options["solution_limit"]),
+            chunk=100,
+            on_chunk=lambda position, trackers: saved.append(
+                json.dumps({"position": position, "trackers": trackers})
+            ),
+        )
+        while len(saved) < 3:
+            next(search)
+        search.close()
+        job.checkpoint_json = saved[2]
+        job.save()
+
+        run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        messages = [e.get("message") for e in job_events(job)]
+        self.assertIn("Resuming from candidate 300.", messages)
+        expected, actual = result_of(full), result_of(job)
+        self.assertEqual(actual["criteria"], expected["criteria"])
+        self.assertEqual(actual["solution_counts"], expected["solution_counts"])
+
+
+class JobEventReplayTests(TestCase):
+    def setUp(self):
+        self.job = ConsensusJob.objects.create(params_json="{}", status="done")
+        self.events = [
+            ConsensusJobEvent.objects.create(
+                job=self.job, data=json.dumps({"type": "log", "message": str(i)})
+            )
+            for i in range(3)
+        ]
+        self.url = f"/api/consensus-jobs/{self.job.id}/events/"
+
+    def replayed_ids(self, response):
+        body = b"".join(response.streaming_content).decode()
+        return [int(line[4:]) for line in body.splitlines() if line.startswith("id: ")]
+
+    def test_replays_everything(self):
+        ids = self.replayed_ids(self.client.get(self.url))
+        self.assertEqual(ids, [e.id for e in self.events])
+
+    def test_replays_after_last_event_id(self):
+        after = self.events[0].id
+        response = self.client.get(self.url, HTTP_LAST_EVENT_ID=str(after))
+        self.assertEqual(self.replayed_ids(response), [e.id for e in self.events[1:]])
+        response = self.client.get(self.url, {"last_event_id": after})
+        self.assertEqual(self.replayed_ids(response), [e.id for e in self.events[1:]])
+
+    def test_malformed_last_event_id(self):
+        for response in [
+            self.client.get(self.url, HTTP_LAST_EVENT_ID="abc"),
+            self.client.get(self.url, {"last_event_id": "1.5"}),
+        ]:
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Last-Event-ID", response.json()["error"])
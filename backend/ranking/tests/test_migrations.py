@@ -0,0 +1,102 @@
+"""Data migrations, run against rows saved with the models they started from."""
+
+import json
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Migrates back to ``migrate_from`` before each test; ``migrate()``
+    then applies ``migrate_to``. The tables end up on the latest migration
+    again afterwards."""
+
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate([("ranking", self.migrate_from)])
+        self.old_apps = self.executor.loader.project_state(
+            ("ranking", self.migrate_from)
+        ).apps
+
+    def migrate(self, target=None):
+        self.executor.loader.build_graph()
+        self.executor.migrate([("ranking", target or self.migrate_to)])
+        return self.executor.loader.project_state(
+            ("ranking", target or self.migrate_to)
+        ).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes("ranking"))
+
+
+class OrderJsonMigrationTests(MigrationTestCase):
+    migrate_from = "0003_consensusjob_consensusjobevent"
+    migrate_to = "0004_pairwisematrix_order_json"
+
+    def setUp(self):
+        super().setUp()
+        Expert = self.old_apps.get_model("ranking", "Expert")
+        PairwiseMatrix = self.old_apps.get_model("ranking", "PairwiseMatrix")
+        expert = Expert.objects.create(name="Expert")
+        self.orders = [[3, 1, 2], [], [7]]
+        for order in self.orders:
+            matrix = {
+                "n": len(order),
+                "order": order,
+                "pairs": [
+                    [a, b, 1] for i, a in enumerate(order) for b in order[i + 1 :]
+                ],
+                "ranks": {str(oid): i + 1 for i, oid in enumerate(order)},
+            }
+            PairwiseMatrix.objects.create(expert=expert, matrix_json=json.dumps(matrix))
+
+    def test_matrix_json_becomes_order_json(self):
+        apps = self.migrate()
+        PairwiseMatrix = apps.get_model("ranking", "PairwiseMatrix")
+        rows = PairwiseMatrix.objects.order_by("id")
+        self.assertEqual([json.loads(pm.order_json) for pm in rows], self.orders)
+
+    def test_backwards_rebuilds_matrix_json(self):
+        self.migrate()
+        apps = self.migrate(self.migrate_from)
+        PairwiseMatrix = apps.get_model("ranking", "PairwiseMatrix")
+        for pm, order in zip(PairwiseMatrix.objects.order_by("id"), self.orders):
+            data = json.loads(pm.matrix_json)
+            self.assertEqual(data["order"], order)
+            self.assertEqual(len(data["pairs"]), len(order) * (len(order) - 1) // 2)
+
+
+class LatestRankingMigrationTests(MigrationTestCase):
+    migrate_from = "0004_pairwisematrix_order_json"
+    migrate_to = "0005_expert_latest_ranking"
+
+    def test_latest_ranking_filled(self):
+        Expert = self.old_apps.get_model("ranking", "Expert")
+        PairwiseMatrix = self.old_apps.get_model("ranking", "PairwiseMatrix")
+        first = Expert.objects.create(name="A")
+        second = Expert.objects.create(name="B")
+        # Never ranked anything
+        Expert.objects.create(name="C")
+        newer = PairwiseMatrix.objects.create(expert=first, order_json="[1, 2]")
+        older = PairwiseMatrix.objects.create(expert=first, order_json="[2, 1]")
+        PairwiseMatrix.objects.filter(id=older.id).update(
+            created_at=newer.created_at.replace(year=2000)
+        )
+        # Same timestamp: the later row wins
+        tied = [
+            PairwiseMatrix.objects.create(expert=second, order_json="[1]")
+            for _ in range(2)
+        ]
+        PairwiseMatrix.objects.filter(id__in=[pm.id for pm in tied]).update(
+            created_at=newer.created_at
+        )
+
+        apps = self.migrate()
+        Expert = apps.get_model("ranking", "Expert")
+        latest = dict(Expert.objects.values_list("name", "latest_ranking"))
+        self.assertEqual(latest, {"A": newer.id, "B": tied[1].id, "C": None})
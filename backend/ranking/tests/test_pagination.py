@@ -0,0 +1,110 @@
+"""Keyset pagination of the list endpoints."""
+
+import base64
+import json
+from datetime import datetime, timezone
+
+from django.test import SimpleTestCase, TestCase
+
+from ..models import ExpertLog, RankedObject
+from ..pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        moment = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor(moment, 42)), (moment, 42))
+
+    def test_invalid(self):
+        cursors = [
+            "",
+            "not base64!",
+            base64.urlsafe_b64encode(b"not json").decode(),
+            raw_cursor("2024-05-01T12:00:00"),
+            raw_cursor(["2024-05-01T12:00:00"]),
+            raw_cursor(["yesterday", 1]),
+            raw_cursor([20240501, 1]),
+            raw_cursor(["2024-05-01T12:00:00", "one"]),
+            raw_cursor(["2024-05-01T12:00:00", None]),
+        ]
+        for cursor in cursors:
+            with self.assertRaisesMessage(ValueError, "invalid cursor"):
+                decode_cursor(cursor)
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        objects = RankedObject.objects.bulk_create(
+            [RankedObject(name=f"Object {i}") for i in range(7)]
+        )
+        # Rows of one moment are told apart by id
+        moment = objects[0].created_at
+        RankedObject.objects.filter(id__in=[o.id for o in objects[2:5]]).update(
+            created_at=moment.replace(year=2000)
+        )
+        self.expected = list(
+            RankedObject.objects.order_by("-created_at", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_pages_in_order(self):
+        seen = []
+        page = self.get("/api/objects/", limit=3)
+        while True:
+            seen += [row["id"] for row in page["results"]]
+            if page["next_cursor"] is None:
+                break
+            self.assertEqual(len(page["results"]), 3)
+            page = self.get("/api/objects/", limit=3, cursor=page["next_cursor"])
+        self.assertEqual(seen, self.expected)
+
+    def test_new_rows_do_not_shift_pages(self):
+        first = self.get("/api/objects/", limit=3)
+        RankedObject.objects.create(name="Newer")
+        second = self.get("/api/objects/", limit=3, cursor=first["next_cursor"])
+        self.assertEqual([row["id"] for row in second["results"]], self.expected[3:6])
+
+    def test_plain_list_without_paging(self):
+        rows = self.get("/api/objects/")
+        self.assertEqual([row["id"] for row in rows], self.expected)
+
+    def test_limit_clamped(self):
+        page = self.get("/api/objects/", limit=0)
+        self.assertEqual(len(page["results"]), 1)
+        page = self.get("/api/objects/", limit=-5)
+        self.assertEqual(len(page["results"]), 1)
+
+    def test_bad_parameters(self):
+        for params, error in [
+            ({"cursor": "garbage"}, "invalid cursor"),
+            ({"cursor": raw_cursor(["2024-05-01T12:00:00", "x"])}, "invalid cursor"),
+            ({"limit": "ten"}, "invalid limit"),
+        ]:
+            response = self.client.get("/api/objects/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json()["error"], error)
+
+    def test_logs(self):
+        ExpertLog.objects.bulk_create(
+            [ExpertLog(action=f"action {i}") for i in range(5)]
+        )
+        expected = list(
+            ExpertLog.objects.order_by("-timestamp", "-id").values_list(
+                "action", flat=True
+            )
+        )
+        page = self.get("/api/logs/", limit=2)
+        rest = self.get("/api/logs/", limit=10, cursor=page["next_cursor"])
+        self.assertIsNone(rest["next_cursor"])
+        actions = [row["action"] for row in page["results"] + rest["results"]]
+        self.assertEqual(actions, expected)
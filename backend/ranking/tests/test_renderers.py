@@ -0,0 +1,150 @@
+"""The MessagePack renderer, read back with a decoder written from the spec."""
+
+import json
+import struct
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from ..models import RankedObject
+from ..renderers import MessagePackRenderer, packb
+
+# Tag: (struct format of the value or length, kind)
+TAGS = {
+    0xC4: (">B", "bin"),
+    0xC5: (">H", "bin"),
+    0xC6: (">I", "bin"),
+    0xCB: (">d", "value"),
+    0xCC: (">B", "value"),
+    0xCD: (">H", "value"),
+    0xCE: (">I", "value"),
+    0xCF: (">Q", "value"),
+    0xD0: (">b", "value"),
+    0xD1: (">h", "value"),
+    0xD2: (">i", "value"),
+    0xD3: (">q", "value"),
+    0xD9: (">B", "str"),
+    0xDA: (">H", "str"),
+    0xDB: (">I", "str"),
+    0xDC: (">H", "array"),
+    0xDD: (">I", "array"),
+    0xDE: (">H", "map"),
+    0xDF: (">I", "map"),
+}
+CONSTANTS = {0xC0: None, 0xC2: False, 0xC3: True}
+
+
+def unpackb(data):
+    value, end = _unpack(data, 0)
+    if end != len(data):
+        raise ValueError("trailing bytes")
+    return value
+
+
+def _unpack(data, pos):
+    tag = data[pos]
+    pos += 1
+    if tag < 0x80:
+        return tag, pos
+    if tag >= 0xE0:
+        return tag - 0x100, pos
+    if tag in CONSTANTS:
+        return CONSTANTS[tag], pos
+    if 0x80 <= tag <= 0x8F:
+        kind, length = "map", tag & 0x0F
+    elif 0x90 <= tag <= 0x9F:
+        kind, length = "array", tag & 0x0F
+    elif 0xA0 <= tag <= 0xBF:
+        kind, length = "str", tag & 0x1F
+    else:
+        fmt, kind = TAGS[tag]
+        (length,) = struct.unpack_from(fmt, data, pos)
+        pos += struct.calcsize(fmt)
+        if kind == "value":
+            return length, pos
+    if kind == "str":
+        return data[pos : pos + length].decode("utf-8"), pos + length
+    if kind == "bin":
+        return data[pos : pos + length], pos + length
+    items = []
+    for _ in range(length * (2 if kind == "map" else 1)):
+        item, pos = _unpack(data, pos)
+        items.append(item)
+    if kind == "map":
+        return dict(zip(items[::2], items[1::2])), pos
+    return items, pos
+
+
+class PackTests(SimpleTestCase):
+    def test_round_trip(self):
+        values = [
+            None,
+            True,
+            False,
+            0.5,
+            -1e300,
+            "",
+            "ключ",
+            "x" * 31,
+            "x" * 32,
+            "x" * 0x100,
+            "x" * 0x10000,
+            b"\x00\xff",
+            [],
+            list(range(15)),
+            list(range(16)),
+            list(range(0x10000)),
+            {},
+            {str(i): i for i in range(15)},
+            {str(i): i for i in range(16)},
+            {"nested": [{"a": [1, -1, 0]}, None, {"b": {"c": "d"}}]},
+        ]
+        # Every integer width, on both sides of each boundary
+        for bits in [5, 7, 8, 15, 16, 31, 32, 63]:
+            values += [(1 << bits) - 1, -(1 << bits)]
+            if bits < 63:
+                values += [1 << bits, -(1 << bits) - 1]
+        values.append((1 << 64) - 1)
+        for value in values:
+            self.assertEqual(unpackb(packb(value)), value)
+
+    def test_smallest_forms(self):
+        for value, packed in [
+            (0, b"\x00"),
+            (127, b"\x7f"),
+            (128, b"\xcc\x80"),
+            (-1, b"\xff"),
+            (-32, b"\xe0"),
+            (-33, b"\xd0\xdf"),
+            (256, b"\xcd\x01\x00"),
+            (-129, b"\xd1\xff\x7f"),
+            ([1, -1, 0], b"\x93\x01\xff\x00"),
+            ({"a": None}, b"\x81\xa1a\xc0"),
+            ("x" * 32, b"\xd9\x20" + b"x" * 32),
+        ]:
+            self.assertEqual(packb(value), packed, value)
+
+    def test_like_the_json_rendering(self):
+        moment = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        data = {1: (Decimal("2.50"), moment), "ids": (3, 4)}
+        expected = json.loads(JSONRenderer().render(data))
+        self.assertEqual(expected["1"][1], "2024-05-01T12:00:00Z")
+        self.assertEqual(unpackb(packb(data)), expected)
+
+    def test_empty_response(self):
+        self.assertEqual(MessagePackRenderer().render(None), b"")
+
+
+class NegotiationTests(TestCase):
+    def test_same_data_as_json(self):
+        RankedObject.objects.bulk_create(
+            [RankedObject(name=f"Object {i}") for i in range(3)]
+        )
+        as_json = self.client.get("/api/objects/").json()
+        response = self.client.get("/api/objects/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(unpackb(response.content), as_json)
+        response = self.client.get("/api/objects/", {"format": "msgpack"})
+        self.assertEqual(unpackb(response.content), as_json)
@@ -0,0 +1,126 @@
+"""Stored consensus results and the endpoints paging through them."""
+
+import json
+
+from django.test import TestCase, override_settings
+
+from ..models import ConsensusResult, ConsensusSolution, RankedObject
+from ..results import MAX_PAGE_SIZE, expert_stats, result_inputs
+from ..views import calculate_consensus_stream
+
+
+def expert(name, order, weight=1.0):
+    return {
+        "name": name,
+        "order": order,
+        "ranks": {oid: i + 1 for i, oid in enumerate(order)},
+        "weight": weight,
+    }
+
+
+class ConsensusResultTests(TestCase):
+    def setUp(self):
+        objects = RankedObject.objects.bulk_create(
+            [RankedObject(name=f"Object {i}") for i in range(4)]
+        )
+        self.obj_ids = [o.id for o in objects]
+        self.objects = {o.id: o for o in objects}
+        # Opposite rankings tie many orders on every criterion
+        self.expert_data = [
+            expert("A", self.obj_ids),
+            expert("B", self.obj_ids[::-1]),
+        ]
+
+    def run_consensus(self):
+        seen = {}
+        events = calculate_consensus_stream(
+            self.expert_data,
+            self.objects,
+            self.obj_ids,
+            on_result=lambda payload, trackers: seen.update(trackers=trackers),
+        )
+        result = [json.loads(e[6:]) for e in events if '"type": "result"' in e][0]
+        return result, seen["trackers"]
+
+    def get(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def test_summary(self):
+        result, _ = self.run_consensus()
+        self.assertNotIn("solutions", result)
+        summary = self.get(f"/api/consensus-results/{result['result_id']}/")
+        self.assertEqual(summary["criteria"], result["criteria"])
+        self.assertEqual(summary["solution_counts"], result["solution_counts"])
+        self.get("/api/consensus-results/999999/", status=404)
+
+    def test_solutions_paged_in_order(self):
+        result, trackers = self.run_consensus()
+        _, obj_ids, expert_data = result_inputs(
+            ConsensusResult.objects.get(id=result["result_id"])
+        )
+        for key, tracker in trackers.items():
+            url = f"/api/consensus-results/{result['result_id']}/solutions/{key}/"
+            self.assertGreater(len(tracker["solutions"]), 3, key)
+            seen = []
+            offset = 0
+            while offset is not None:
+                page = self.get(url, offset=offset, limit=3)
+                self.assertEqual(page["val"], result["criteria"][key])
+                self.assertEqual(page["count"], result["solution_counts"][key])
+                self.assertTrue(page["count_exact"])
+                self.assertLessEqual(len(page["results"]), 3)
+                seen += page["results"]
+                offset = page["next_offset"]
+            self.assertEqual([s["position"] for s in seen], list(range(len(seen))))
+            for sol, kept in zip(seen, tracker["solutions"], strict=True):
+                order = [obj["id"] for obj in sol["order"]]
+                self.assertEqual(order, list(kept["order"]))
+                self.assertEqual(sol["distances"], list(kept["distances"]))
+                self.assertEqual(
+                    sol["expert_stats"], expert_stats(order, expert_data, obj_ids)
+                )
+
+    def test_page_limits(self):
+        result, trackers = self.run_consensus()
+        url = f"/api/consensus-results/{result['result_id']}/solutions/k1_rank/"
+        kept = len(trackers["k1_rank"]["solutions"])
+        page = self.get(url, limit=0)
+        self.assertEqual(len(page["results"]), 1)
+        self.assertEqual(page["next_offset"], 1)
+        page = self.get(url, limit=MAX_PAGE_SIZE + 1)
+        self.assertEqual(len(page["results"]), min(kept, MAX_PAGE_SIZE))
+        page = self.get(url, offset=kept)
+        self.assertEqual((page["results"], page["next_offset"]), ([], None))
+
+    def test_solution_errors(self):
+        result, _ = self.run_consensus()
+        url = f"/api/consensus-results/{result['result_id']}/solutions/"
+        self.assertIn("not in result", self.get(f"{url}median/", status=400)["error"])
+        self.get(f"{url}k1_rank/", status=400, offset="x")
+        self.get(f"{url}k1_rank/", status=400, limit="1.5")
+        self.get("/api/consensus-results/999999/solutions/k1_rank/", status=404)
+
+    def test_matrix(self):
+        result, _ = self.run_consensus()
+        url = f"/api/consensus-results/{result['result_id']}/experts/"
+        matrix = self.get(f"{url}1/matrix/")
+        self.assertEqual(matrix["expert_name"], "B")
+        self.assertEqual(
+            matrix["headers"], [self.objects[oid].name for oid in self.obj_ids]
+        )
+        # B ranks the objects in reverse, so each one beats those before it
+        expected = [[(r > c) - (r < c) for c in range(4)] for r in range(4)]
+        self.assertEqual(matrix["matrix"], expected)
+        self.get(f"{url}2/matrix/", status=404)
+
+    @override_settings(CONSENSUS_RESULTS_KEPT=2)
+    def test_oldest_results_pruned(self):
+        ids = [self.run_consensus()[0]["result_id"] for _ in range(3)]
+        self.assertEqual(
+            list(ConsensusResult.objects.order_by("id").values_list("id", flat=True)),
+            ids[1:],
+        )
+        self.assertFalse(ConsensusSolution.objects.filter(result_id=ids[0]).exists())
+        self.get(f"/api/consensus-results/{ids[0]}/", status=404)
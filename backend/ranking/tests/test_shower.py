@@ -0,0 +1,106 @@
+"""The shower rule table against the if-chain it replaced."""
+
+from django.test import SimpleTestCase
+
+from .. import shower
+
+
+def chained_inference(facts):
+    """shower-inference/ as it was written before the rule table."""
+    f1, f2, f3, f4 = facts.get("f1"), facts.get("f2"), facts.get("f3"), facts.get("f4")
+    f5, f6, f7 = facts.get("f5"), facts.get("f6"), facts.get("f7")
+
+    def answer(action, updates, reasoning):
+        return {
+            "facts": {**facts, **updates},
+            "logs": ["--- [Classic Lab 5] ---"],
+            "action": action,
+            "explanation": {"active": bool(updates), "reasoning": reasoning},
+        }
+
+    if f7:
+        return answer("NONE", {}, "Norm.")
+    if (not f4) and (not f7) and f1 and f5:
+        return answer("OPEN_COLD", {"f5": False, "f7": True}, "Hot->Open Cold")
+    if (not f3) and (not f7) and f2 and f6:
+        return answer("OPEN_HOT", {"f6": False, "f7": True}, "Cold->Open Hot")
+    if f4 and (not f7) and f1 and f2 and f5:
+        return answer("CLOSE_HOT", {"f5": False, "f7": True}, "Hot+ColdMax->Close Hot")
+    if f3 and (not f7) and f1 and f2 and f6:
+        return answer(
+            "CLOSE_COLD", {"f6": False, "f7": True}, "Cold+HotMax->Close Cold"
+        )
+    return answer("NONE", {}, "No rule")
+
+
+def unpack(mask):
+    return {name: bool(mask & (1 << i)) for i, name in enumerate(shower.FACTS)}
+
+
+class RuleTableTests(SimpleTestCase):
+    def test_every_mask_matches_the_if_chain(self):
+        self.assertEqual(len(shower.TABLE), 128)
+        for mask in range(128):
+            facts = unpack(mask)
+            self.assertEqual(shower.pack(facts), mask)
+            self.assertEqual(shower.infer(facts), chained_inference(facts), mask)
+
+    def test_missing_and_extra_facts(self):
+        # Missing facts are false; others such as the f8 step pass through
+        for facts in [{}, {"f1": True, "f5": 1}, {"f2": 1, "f6": True, "f8": 5}]:
+            self.assertEqual(shower.infer(facts), chained_inference(facts))
+
+
+class ShowerEndpointTests(SimpleTestCase):
+    def test_single_and_batch(self):
+        facts = [unpack(mask) for mask in range(128)]
+        response = self.client.post(
+            "/api/shower-inference/",
+            {"facts": facts[17]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), chained_inference(facts[17]))
+        response = self.client.post(
+            "/api/shower-inference/batch/",
+            {"facts": facts},
+            content_type="application/json",
+        )
+        self.assertEqual(
+            response.json()["results"], [chained_inference(f) for f in facts]
+        )
+
+    def test_batch_errors(self):
+        for facts in [None, {"f1": True}, [{"f1": True}, "f2"]]:
+            response = self.client.post(
+                "/api/shower-inference/batch/",
+                {"facts": facts},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400, facts)
+        response = self.client.post(
+            "/api/shower-inference/batch/",
+            {"facts": [{}] * (shower.MAX_BATCH + 1)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_simulation_settles(self):
+        response = self.client.post(
+            "/api/shower-inference/simulate/",
+            {"hot": 60, "cold": 0, "steps": 100},
+            content_type="application/json",
+        )
+        result = response.json()
+        # Cold opens in steps of 10 until the difference is within 15
+        self.assertEqual(
+            [tick["action"] for tick in result["trace"]], ["OPEN_COLD"] * 5 + ["NONE"]
+        )
+        self.assertEqual((result["hot"], result["cold"]), (60, 50))
+        self.assertEqual(result["steps_run"], 6)
+
+    def test_simulation_errors(self):
+        for body in [{"steps": 0}, {"steps": shower.MAX_STEPS + 1}, {"hot": "x"}]:
+            response = self.client.post(
+                "/api/shower-inference/simulate/", body, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 400, body)
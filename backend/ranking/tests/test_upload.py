@@ -0,0 +1,82 @@
+"""upload-csv/: column mapping, skipped rows and the returned summary."""
+
+import json
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from ..models import RankedObject
+
+# Keeps the upload's cache invalidation off the on-disk store
+TEST_CACHES = {
+    name: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    for name in ["default", "consensus", "consensus_disk", "consensus_warm"]
+}
+
+
+@override_settings(CACHES=TEST_CACHES, EXPERT_LOG_ASYNC=False)
+class UploadCsvTests(TestCase):
+    def upload(self, content, query=""):
+        upload = SimpleUploadedFile("objects.csv", content)
+        return self.client.post(f"/api/upload-csv/{query}", {"file": upload})
+
+    def details(self, name):
+        details = RankedObject.objects.get(name=name).details
+        return json.loads(details) if details else {}
+
+    def test_summary(self):
+        RankedObject.objects.create(name="B")
+        response = self.upload(
+            b"name,price,country\n"
+            b"A,10,UA\n"
+            b"B,2.5,\n"
+            b"A,3,PL\n"
+            b",4,X\n"
+            b"C\n",
+            "?header=1",
+        )
+        self.assertEqual(response.status_code, 200)
+        # B is already stored, A repeats and one row has no name
+        self.assertEqual(
+            response.json(),
+            {"inserted": 2, "skipped": 3, "header": ["name", "price", "country"]},
+        )
+        self.assertEqual(self.details("A"), {"price": 10, "country": "UA"})
+        self.assertEqual(self.details("C"), {})
+        self.assertEqual(RankedObject.objects.count(), 3)
+
+    def test_header_detected(self):
+        response = self.upload(b"name,year\nA,1999\nB,2004\nC,2011\n")
+        self.assertEqual(
+            response.json(), {"inserted": 3, "skipped": 0, "header": ["name", "year"]}
+        )
+        self.assertEqual(self.details("B"), {"year": 2004})
+
+    def test_header_forced_off(self):
+        response = self.upload(b"name,1.5\nother,2\n", "?header=0")
+        self.assertEqual(response.json(), {"inserted": 2, "skipped": 0, "header": []})
+        self.assertEqual(self.details("name"), {"column_2": 1.5})
+
+    def test_header_forced_on(self):
+        response = self.upload(b"title,,year\nA,x,1999\n", "?header=1")
+        self.assertEqual(response.json()["header"], ["title", "", "year"])
+        # Unnamed columns fall back to their number
+        self.assertEqual(self.details("A"), {"column_2": "x", "year": 1999})
+
+    def test_batches(self):
+        names = [f"Object {i}" for i in range(5)]
+        with mock.patch("ranking.views.CSV_BATCH_SIZE", 2):
+            response = self.upload("\n".join(names).encode(), "?header=0")
+        self.assertEqual(response.json()["inserted"], 5)
+        self.assertEqual(
+            sorted(RankedObject.objects.values_list("name", flat=True)), names
+        )
+
+    def test_bad_files(self):
+        response = self.client.post("/api/upload-csv/")
+        self.assertEqual(response.status_code, 400)
+        response = self.upload(b"name\n\xff\xfe broken\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("unreadable CSV", response.json()["error"])
+        self.assertFalse(RankedObject.objects.exists())
@@ -0,0 +1,125 @@
+"""Warm starts: the previous optima as bounds for the next run."""
+
+import json
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..consensus import CRITERIA, EXACT_SEARCHES, aggregate_value, expert_distance
+from ..models import Expert, PairwiseMatrix, RankedObject
+from ..views import calculate_consensus_stream, warm_start_bounds, warm_start_state
+
+# Separate locations, as in the settings: invalidation must leave the warm
+# starts alone
+TEST_CACHES = {
+    name: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": name}
+    for name in ["default", "consensus", "consensus_disk", "consensus_warm"]
+}
+
+
+def expert(name, order, weight=1.0):
+    return {
+        "name": name,
+        "order": order,
+        "ranks": {oid: i + 1 for i, oid in enumerate(order)},
+        "weight": weight,
+    }
+
+
+def run_stream(expert_data, obj_ids, **options):
+    """The result event and the trackers of one run."""
+    objects = {oid: RankedObject(id=oid, name=f"Object {oid}") for oid in obj_ids}
+    seen = {}
+    events = calculate_consensus_stream(
+        expert_data,
+        objects,
+        obj_ids,
+        store=False,
+        on_result=lambda payload, trackers: seen.update(trackers=trackers),
+        **options,
+    )
+    result = [json.loads(e[6:]) for e in events if '"type": "result"' in e][0]
+    return result, seen["trackers"]
+
+
+class WarmStartBoundTests(SimpleTestCase):
+    obj_ids = [1, 2, 3, 4, 5]
+
+    def setUp(self):
+        self.before = [
+            expert("A", [1, 2, 3, 4, 5]),
+            expert("B", [5, 3, 1, 2, 4], 2.0),
+            expert("C", [2, 1], 0.5),
+        ]
+        _, trackers = run_stream(self.before, self.obj_ids, solver="exact")
+        self.state = warm_start_state(trackers, self.before)
+
+    def test_rescores_only_changed_rankings(self):
+        after = [self.before[0], expert("B", [4, 3, 2, 1, 5], 2.0), self.before[2]]
+        bounds = warm_start_bounds(self.state, after, self.obj_ids, CRITERIA)
+        self.assertEqual(set(bounds), set(CRITERIA))
+        weights = [exp["weight"] for exp in after]
+        for key, distance, aggregate in EXACT_SEARCHES:
+            seed = bounds[key]
+            self.assertEqual(seed["rescored"], 1)
+            self.assertEqual(seed["order"], self.state[key]["order"])
+            # Exactly the value the old order has on the new rankings
+            dists = [
+                expert_distance(exp["ranks"], seed["order"], distance) for exp in after
+            ]
+            self.assertEqual(seed["val"], aggregate_value(dists, weights, aggregate))
+
+    def test_other_objects_get_no_bound(self):
+        bounds = warm_start_bounds(self.state, self.before, [1, 2, 3, 4, 6], CRITERIA)
+        self.assertEqual(bounds, {})
+
+    def test_only_requested_criteria(self):
+        bounds = warm_start_bounds(self.state, self.before, self.obj_ids, ["k2_rank"])
+        self.assertEqual(list(bounds), ["k2_rank"])
+
+    def test_same_result_as_a_cold_run(self):
+        after = [self.before[0], expert("B", [4, 3, 2, 1, 5], 2.0), self.before[2]]
+        for solver in ["exact", "exhaustive", "local_search"]:
+            cold, _ = run_stream(after, self.obj_ids, solver=solver)
+            warm, _ = run_stream(
+                after, self.obj_ids, solver=solver, warm_start=self.state
+            )
+            self.assertNotIn("warm_start", cold)
+            self.assertEqual(warm["criteria"], cold["criteria"], solver)
+            if solver != "local_search":
+                self.assertEqual(warm["solution_counts"], cold["solution_counts"])
+            for key in CRITERIA:
+                self.assertGreaterEqual(warm["warm_start"][key], warm["criteria"][key])
+
+
+@override_settings(CACHES=TEST_CACHES, EXPERT_LOG_ASYNC=False)
+class WarmStartApiTests(TestCase):
+    def test_survives_invalidation(self):
+        objects = RankedObject.objects.bulk_create(
+            [RankedObject(name=f"Object {i}") for i in range(4)]
+        )
+        ids = [o.id for o in objects]
+        expert_row = Expert.objects.create(name="Expert")
+        ranking = PairwiseMatrix.objects.create(
+            expert=expert_row, order_json=json.dumps(ids)
+        )
+        Expert.objects.filter(id=expert_row.id).update(latest_ranking=ranking)
+
+        def consensus():
+            response = self.client.post(
+                "/api/calculate-consensus/", {}, content_type="application/json"
+            )
+            body = b"".join(response.streaming_content).decode()
+            events = [json.loads(e[6:]) for e in body.split("\n\n") if e]
+            return [e for e in events if e["type"] == "result"][0]
+
+        self.assertNotIn("warm_start", consensus())
+        self.client.post(
+            "/api/save-ranking/",
+            {"expertId": expert_row.id, "order": ids[::-1]},
+            content_type="application/json",
+        )
+        result = consensus()
+        self.assertFalse(result["cached"])
+        # The old optimum is the old ranking, now the farthest from the new one
+        self.assertEqual(result["warm_start"]["k1_rank"], 8)
+        self.assertEqual(result["criteria"]["k1_rank"], 0)
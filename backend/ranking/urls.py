@@ -14,6 +14,22 @@ urlpatterns = [
     path("experts/<int:expert_id>/ranking/", views.get_expert_ranking),
     # New Lab 3 Endpoint
     path("calculate-consensus/", views.calculate_consensus),
+    path("consensus-jobs/", views.consensus_jobs_create),
+    path("consensus-jobs/<int:job_id>/", views.consensus_job_detail),
+    path("consensus-jobs/<int:job_id>/events/", views.consensus_job_events),
+    path("consensus-results/<int:result_id>/", views.consensus_result_detail),
+    path(
+        "consensus-results/<int:result_id>/solutions/<str:criterion>/",
+        views.consensus_result_solutions,
+    ),
+    path(
+        "consensus-results/<int:result_id>/experts/<int:expert_index>/matrix/",
+        views.consensus_result_matrix,
+    ),
+    path("metrics/", views.metrics_view),
+    path("metrics/profiles/<str:profile_id>/", views.metrics_profile),
     # Lab 6
     path("shower-inference/", views.run_shower_inference),
+    path("shower-inference/batch/", views.shower_inference_batch),
+    path("shower-inference/simulate/", views.shower_simulation),
 ]
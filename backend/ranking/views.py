@@ -1,16 +1,66 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import StreamingHttpResponse, HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import RankedObject, ExpertLog, PairwiseMatrix, Expert
+from .models import (
+    RankedObject,
+    ExpertLog,
+    PairwiseMatrix,
+    Expert,
+    ConsensusJob,
+    ConsensusJobEvent,
+    ConsensusResult,
+)
 from .serializers import (
     RankedObjectSerializer,
     ExpertLogSerializer,
     PairwiseMatrixSerializer,
     ExpertSerializer,
+    ConsensusJobSerializer,
+)
+from .consensus import (
+    CONSENSUS_SOLVERS,
+    CRITERIA,
+    EXACT_SEARCHES,
+    aggregate_value,
+    branch_and_bound_criteria,
+    chunked_search,
+    drain_pending,
+    exact_search,
+    exhaustive_search,
+    expert_distance,
+    new_trackers,
+    sharded_search,
+    sjt_search,
+    vectorized_search,
+)
+from .heuristics import HEURISTIC_SOLVERS, heuristic_search
+from .pagination import keyset_page, wants_page
+from .audit import flush_logs, log_action, log_stats
+from .db import write_transaction
+from . import metrics, shower
+from .streaming import async_event_stream, is_async_request
+from .results import (
+    PAGE_SIZE,
+    result_exists,
+    result_inputs,
+    result_summary,
+    solutions_page,
+    store_consensus_result,
 )
-import csv, io, json, itertools, time, math
+from .cache import (
+    consensus_cache_key,
+    get_cached_result,
+    get_warm_start,
+    invalidate_consensus_cache,
+    store_result,
+    store_warm_start,
+)
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import csv, io, itertools, json, time, math, os
 
 
 @api_view(["GET", "POST"])
@@ -27,55 +77,155 @@ def experts_list_create(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def requested_fields(request, serializer_class):
+    """The ?fields=a,b list, or None to keep every field. Raises ValueError
+    when ``serializer_class`` has no field of one of the names."""
+    fields = request.query_params.get("fields")
+    if not fields:
+        return None
+    fields = [name.strip() for name in fields.split(",") if name.strip()]
+    serializer_class(fields=fields)
+    return fields
+
+
+def list_response(request, queryset, serializer_class, time_field, plain_limit=None):
+    """The rows as a plain list, or as a keyset page with ?limit= / ?cursor=.
+
+    ?fields=a,b keeps only those fields, e.g. to skip matrix_json.
+    """
+    try:
+        fields = requested_fields(request, serializer_class)
+        if not wants_page(request):
+            if plain_limit:
+                queryset = queryset[:plain_limit]
+            return Response(serializer_class(queryset, many=True, fields=fields).data)
+        rows, next_cursor = keyset_page(request, queryset, time_field)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+    return Response(
+        {
+            "results": serializer_class(rows, many=True, fields=fields).data,
+            "next_cursor": next_cursor,
+        }
+    )
+
+
 @api_view(["GET"])
 def get_expert_ranking(request, expert_id):
-    expert = get_object_or_404(Expert, id=expert_id)
-    ranking = (
-        PairwiseMatrix.objects.filter(expert=expert).order_by("-created_at").first()
+    expert = get_object_or_404(
+        Expert.objects.select_related("latest_ranking"), id=expert_id
     )
+    ranking = expert.latest_ranking
     if not ranking:
         return Response({"order": []}, status=200)
-    matrix_data = json.loads(ranking.matrix_json)
-    return Response({"order": matrix_data.get("order", [])}, status=200)
+    return Response({"order": ranking.order}, status=200)
 
 
 @api_view(["GET", "POST"])
 def objects_list_create(request):
     if request.method == "GET":
         objs = RankedObject.objects.all().order_by("-created_at")
-        serializer = RankedObjectSerializer(objs, many=True)
-        return Response(serializer.data)
+        return list_response(request, objs, RankedObjectSerializer, "created_at")
     else:
         serializer = RankedObjectSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
-        ExpertLog.objects.create(
-            action="create_object", payload=json.dumps(serializer.data)
-        )
+        invalidate_consensus_cache()
+        log_action("create_object", json.dumps(serializer.data))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Rows per existence check and bulk insert when importing a CSV
+CSV_BATCH_SIZE = 1000
+
+
+def csv_value(text):
+    """The cell as a number if it reads as one, else as stripped text."""
+    text = text.strip()
+    for cast in (int, float):
+        try:
+            value = cast(text)
+        except ValueError:
+            continue
+        if math.isfinite(value):
+            return value
+    return text
+
+
+def csv_has_header(head_lines, forced=None):
+    if forced is not None:
+        return forced in ("1", "true")
+    try:
+        return csv.Sniffer().has_header("".join(head_lines))
+    except csv.Error:
+        return False
+
+
+def csv_details(row, columns):
+    """JSON of the cells after the name, keyed by header or column number."""
+    details = {}
+    for i, value in enumerate(row[1:], 1):
+        key = columns[i] if i < len(columns) and columns[i] else f"column_{i + 1}"
+        details[key] = csv_value(value)
+    return json.dumps(details) if details else ""
+
+
+def insert_new_objects(batch):
+    """Bulk-creates the names of ``batch`` (name -> details) not stored yet."""
+    existing = set(
+        RankedObject.objects.filter(name__in=list(batch)).values_list("name", flat=True)
+    )
+    new = [
+        RankedObject(name=name, details=details)
+        for name, details in batch.items()
+        if name not in existing
+    ]
+    RankedObject.objects.bulk_create(new, batch_size=CSV_BATCH_SIZE)
+    return len(new)
+
+
 @api_view(["POST"])
 def upload_csv(request):
+    """Imports objects named by column 0 of a CSV, inserted in batches.
+
+    Other columns are stored in details as JSON keyed by the header
+    (column_<n> without one). Names already present, or repeated in the
+    file, are skipped. ?header=1/0 overrides the header detection.
+    The whole file is decoded and parsed before the write lock is taken,
+    so other writers only wait for the inserts.
+    """
     f = request.FILES.get("file")
     if not f:
         return Response({"error": "no file"}, status=400)
-    data = f.read().decode("utf-8")
-    reader = csv.reader(io.StringIO(data))
-    created = []
-    for row in reader:
-        if not row:
-            continue
-        name = row[0].strip()
-        if name:
-            obj, _ = RankedObject.objects.get_or_create(name=name)
-            created.append(obj)
-    ExpertLog.objects.create(
-        action="upload_csv", payload=json.dumps({"created": [o.id for o in created]})
-    )
-    serializer = RankedObjectSerializer(created, many=True)
-    return Response(serializer.data)
+    text = io.TextIOWrapper(f.file, encoding="utf-8-sig", newline="")
+    rows = inserted = 0
+    # name -> details, first occurrence in the file
+    parsed = {}
+    try:
+        head = list(itertools.islice(text, 20))
+        reader = csv.reader(itertools.chain(head, text))
+        columns = []
+        if head and csv_has_header(head, request.query_params.get("header")):
+            columns = [c.strip() for c in next(reader)]
+        for row in reader:
+            if not row:
+                continue
+            rows += 1
+            name = row[0].strip()
+            if name and name not in parsed:
+                parsed[name] = csv_details(row, columns)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        return Response({"error": f"unreadable CSV: {exc}"}, status=400)
+    names = list(parsed)
+    with write_transaction():
+        for i in range(0, len(names), CSV_BATCH_SIZE):
+            batch = {name: parsed[name] for name in names[i : i + CSV_BATCH_SIZE]}
+            inserted += insert_new_objects(batch)
+    summary = {"inserted": inserted, "skipped": rows - inserted, "header": columns}
+    invalidate_consensus_cache()
+    log_action("upload_csv", json.dumps(summary))
+    return Response(summary)
 
 
 @api_view(["POST"])
@@ -96,9 +246,8 @@ def load_sample_objects(request):
     for name in sample:
         o, _ = RankedObject.objects.get_or_create(name=name)
         created.append(o)
-    ExpertLog.objects.create(
-        action="load_sample", payload=json.dumps({"count": len(created)})
-    )
+    invalidate_consensus_cache()
+    log_action("load_sample", json.dumps({"count": len(created)}))
     serializer = RankedObjectSerializer(created, many=True)
     return Response(serializer.data)
 
@@ -106,9 +255,8 @@ def load_sample_objects(request):
 @api_view(["POST"])
 def clear_objects(request):
     RankedObject.objects.all().delete()
-    ExpertLog.objects.create(
-        action="clear_objects", payload=json.dumps({"status": "cleared"})
-    )
+    invalidate_consensus_cache()
+    log_action("clear_objects", json.dumps({"status": "cleared"}))
     return Response({"status": "cleared"})
 
 
@@ -119,66 +267,111 @@ def save_ranking(request):
     expert_id = data.get("expertId")
     if not order or not expert_id:
         return Response({"error": "order or expertId missing"}, status=400)
+    try:
+        fields = requested_fields(request, PairwiseMatrixSerializer)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+    # Checked before the insert: a bad id in a stored order would break
+    # every later reader of the rankings
+    try:
+        if not isinstance(order, list):
+            raise TypeError
+        order = [int(oid) for oid in order]
+    except (TypeError, ValueError):
+        return Response({"error": "order must be a list of object ids"}, status=400)
+    if len(set(order)) != len(order):
+        return Response({"error": "order contains duplicate ids"}, status=400)
+    known = set(RankedObject.objects.filter(id__in=order).values_list("id", flat=True))
+    unknown = [oid for oid in order if oid not in known]
+    if unknown:
+        return Response({"error": f"unknown object ids {unknown}"}, status=400)
     try:
         expert = Expert.objects.get(id=expert_id)
-    except Expert.DoesNotExist:
+    except (Expert.DoesNotExist, TypeError, ValueError):
         return Response({"error": "Expert not found"}, status=404)
-    ExpertLog.objects.create(
-        expert=expert, action="save_ranking", payload=json.dumps({"order": order})
-    )
-    n = len(order)
-    pairs = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            pairs.append([int(order[i]), int(order[j]), 1])
-    matrix_data = {
-        "n": n,
-        "order": order,
-        "pairs": pairs,
-        "ranks": {obj_id: idx + 1 for idx, obj_id in enumerate(order)},
-    }
-    pm = PairwiseMatrix.objects.create(
-        expert=expert, matrix_json=json.dumps(matrix_data)
-    )
-    serializer = PairwiseMatrixSerializer(pm)
+    # One write transaction for the ranking and the expert's pointer to it.
+    # The log entry only joins it with EXPERT_LOG_ASYNC off; by default it
+    # is queued for the buffered writer and saved in a later batch
+    with write_transaction():
+        pm = PairwiseMatrix.objects.create(expert=expert, order_json=json.dumps(order))
+        Expert.objects.filter(id=expert.id).update(latest_ranking=pm)
+        log_action("save_ranking", json.dumps({"order": order}), expert=expert)
+    invalidate_consensus_cache()
+    # ?fields= as on the lists; skipping matrix_json saves building n^2 pairs
+    serializer = PairwiseMatrixSerializer(pm, fields=fields)
     return Response(serializer.data)
 
 
 @api_view(["GET"])
 def logs_list(request):
-    logs = ExpertLog.objects.all().order_by("-timestamp")[:200]
-    serializer = ExpertLogSerializer(logs, many=True)
-    return Response(serializer.data)
+    # Entries still buffered would otherwise be missing from the list
+    flush_logs()
+    logs = ExpertLog.objects.select_related("expert").order_by("-timestamp")
+    return list_response(
+        request, logs, ExpertLogSerializer, "timestamp", plain_limit=200
+    )
 
 
 @api_view(["GET"])
 def latest_matrix(request):
-    matrices = PairwiseMatrix.objects.all().order_by("-created_at")
-    serializer = PairwiseMatrixSerializer(matrices, many=True)
-    return Response(serializer.data)
+    matrices = PairwiseMatrix.objects.select_related("expert").order_by("-created_at")
+    return list_response(request, matrices, PairwiseMatrixSerializer, "created_at")
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def collective_csv_rows(rankings, objects):
+    writer = csv.writer(Echo())
+    header = ["Object ID", "Object Name"]
+    # Each ranking is parsed once into object id -> rank
+    columns = []
+    for r in rankings:
+        header.append(f"{r.expert.name} ({r.created_at.strftime('%H:%M')})")
+        ranks = {}
+        for idx, oid in enumerate(r.order):
+            ranks.setdefault(oid, idx + 1)
+        columns.append(ranks)
+    yield writer.writerow(header)
+    for obj in objects:
+        yield writer.writerow(
+            [obj.id, obj.name] + [ranks.get(obj.id, "-") for ranks in columns]
+        )
 
 
 @api_view(["GET"])
 def collective_matrix_csv(request):
-    all_objects = RankedObject.objects.all()
-    all_rankings = PairwiseMatrix.objects.all().order_by("created_at")
-    response = HttpResponse(content_type="text/csv")
+    """Every ranking as a column of ranks; ?latest=1 keeps each expert's
+    latest one, ?since= / ?until= (ISO datetimes) a time window."""
+    rankings = PairwiseMatrix.objects.select_related("expert").order_by("created_at")
+    if request.query_params.get("latest") in ("1", "true"):
+        rankings = rankings.filter(
+            id__in=Expert.objects.filter(latest_ranking__isnull=False).values(
+                "latest_ranking"
+            )
+        )
+    for param, lookup in (("since", "created_at__gte"), ("until", "created_at__lte")):
+        value = request.query_params.get(param)
+        if not value:
+            continue
+        moment = parse_datetime(value)
+        if moment is None:
+            return Response({"error": f"invalid {param} datetime"}, status=400)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        rankings = rankings.filter(**{lookup: moment})
+    rows = collective_csv_rows(
+        rankings.iterator(), RankedObject.objects.all().iterator(chunk_size=2000)
+    )
+    if is_async_request(request):
+        # Sent as written instead of collected in full by Django first
+        rows = async_event_stream(rows, heartbeat=False)
+    response = StreamingHttpResponse(rows, content_type="text/csv")
     response["Content-Disposition"] = 'attachment; filename="collective_ranks.csv"'
-    writer = csv.writer(response)
-    header = ["Object ID", "Object Name"] + [
-        f"{r.expert.name} ({r.created_at.strftime('%H:%M')})" for r in all_rankings
-    ]
-    writer.writerow(header)
-    for obj in all_objects:
-        row = [obj.id, obj.name]
-        for ranking in all_rankings:
-            data = json.loads(ranking.matrix_json)
-            try:
-                rank = data["order"].index(obj.id) + 1
-            except ValueError:
-                rank = "-"
-            row.append(rank)
-        writer.writerow(row)
     return response
 
 
@@ -208,8 +401,136 @@ def generate_matrix(ranks_map, obj_ids):
     return matrix
 
 
-def calculate_consensus_stream(expert_data, objects, obj_ids):
+def relay_progress(search, total, drain=None):
+    """Runs a search generator, turning its candidate counts into progress events.
+
+    ``drain`` (optional) returns extra events to send after every step,
+    e.g. streamed tied solutions.
+    """
+    last_yield_time = time.time()
+    while True:
+        try:
+            count = next(search)
+        except StopIteration as stop:
+            if drain:
+                yield from drain()
+            return stop.value
+        if drain:
+            yield from drain()
+        now = time.time()
+        if now - last_yield_time > 0.2:
+            progress_data = {
+                "type": "progress",
+                "current": count,
+                "total": total,
+                "percent": round((count / total) * 100, 1),
+            }
+            yield f"data: {json.dumps(progress_data)}\n\n"
+            last_yield_time = now
+
+
+def ranking_key(order):
+    return ",".join(str(oid) for oid in order)
+
+
+def warm_start_state(trackers, expert_data):
+    """First optimum of each criterion in ``trackers`` with its distance per
+    expert ranking, for get_warm_start."""
+    state = {}
+    for key, tracker in trackers.items():
+        if not tracker["solutions"]:
+            continue
+        best = tracker["solutions"][0]
+        state[key] = {
+            "order": list(best["order"]),
+            "distances": {
+                ranking_key(exp["order"]): d
+                for exp, d in zip(expert_data, best["distances"])
+            },
+        }
+    return state
+
+
+def warm_start_bounds(warm_start, expert_data, obj_ids, criteria):
+    """The previous optima re-scored on the current inputs.
+
+    Distances are kept per expert ranking, so only rankings saved since
+    the last run are measured again; the rest of each value is the stored
+    distances re-weighted. Returns {criterion: {"order", "val",
+    "rescored"}}; every val is reached by its order, so it is a safe upper
+    bound for the search.
+    """
+    weights = [exp["weight"] for exp in expert_data]
+    bounds = {}
+    for key, distance, aggregate in EXACT_SEARCHES:
+        previous = warm_start.get(key)
+        if key not in criteria or not previous:
+            continue
+        order = previous["order"]
+        if sorted(order) != sorted(obj_ids):
+            continue
+        dists = []
+        rescored = 0
+        for exp in expert_data:
+            d = previous["distances"].get(ranking_key(exp["order"]))
+            if d is None:
+                d = expert_distance(exp["ranks"], order, distance)
+                rescored += 1
+            dists.append(d)
+        bounds[key] = {
+            "order": order,
+            "val": aggregate_value(dists, weights, aggregate),
+            "rescored": rescored,
+        }
+    return bounds
+
+
+# Tied solutions per "solutions" event when streaming them
+SOLUTION_CHUNK = 200
+
+
+@metrics.track_active("ranking_consensus_active_streams")
+def calculate_consensus_stream(
+    expert_data,
+    objects,
+    obj_ids,
+    solver="exhaustive",
+    criteria=CRITERIA,
+    workers=1,
+    solution_limit=None,
+    stream_solutions=False,
+    count_ties=False,
+    resume=None,
+    checkpoint=None,
+    on_result=None,
+    load_time=None,
+    warm_start=None,
+    store=True,
+):
+    """SSE events of one consensus run.
+
+    ``checkpoint(position, trackers)`` is called periodically by the
+    exhaustive and vectorized solvers with their enumeration position, and
+    ``resume`` (a saved ``{"position", "trackers"}``) continues such a run.
+    ``on_result(payload, trackers)`` gets the final result event and the
+    trackers behind it before it is sent; the solutions themselves are
+    stored under ``payload["result_id"]``.
+    With ``count_ties`` the exact solver counts every tie even past
+    ``solution_limit``; otherwise its counts may be lower bounds, flagged
+    in ``counts_exact`` of the result.
+    ``load_time`` is how long loading the inputs took, reported apart from
+    the solve time. ``warm_start`` (from get_warm_start) seeds the search
+    with the previous optima re-scored on these inputs: their values bound
+    the exact solvers from the start and local search starts from them.
+    With ``store`` off the solutions are not saved and the result has no
+    ``result_id``, e.g. for benchmarks.
+    """
     start_time = time.time()
+    # Seconds spent in each phase, sent with the result
+    timings = {}
+    if load_time is not None:
+        timings["load"] = load_time
+    phase_start = time.perf_counter()
     n = len(obj_ids)
     total_permutations = math.factorial(n)
 
@@ -217,6 +538,9 @@ def calculate_consensus_stream(expert_data, objects, obj_ids):
     yield f"data: {json.dumps({'type': 'log', 'message': f'Starting consensus calculation for {n} objects.'})}\n\n"
     yield f"data: {json.dumps({'type': 'log', 'message': f'Total permutations to check: {total_permutations}'})}\n\n"
     yield f"data: {json.dumps({'type': 'log', 'message': f'Active experts: {len(expert_data)}'})}\n\n"
+    if load_time is not None:
+        yield f"data: {json.dumps({'type': 'log', 'message': f'Inputs loaded in {load_time:.4f} seconds.'})}\n\n"
+    yield f"data: {json.dumps({'type': 'log', 'message': f'Solver: {solver}, workers: {workers}'})}\n\n"
 
     prepared_experts = []
     for exp in expert_data:
@@ -224,9 +548,11 @@ def calculate_consensus_stream(expert_data, objects, obj_ids):
         p_pairs = set()
         order = exp["order"]
         valid_order = [o for o in order if o in obj_ids]
-        for i in range(len(valid_order)):
-            for j in range(i + 1, len(valid_order)):
-                p_pairs.add((valid_order[i], valid_order[j]))
+        # The heuristics only need ranks; pair sets are O(n^2) per expert
+        if solver not in HEURISTIC_SOLVERS:
+            for i in range(len(valid_order)):
+                for j in range(i + 1, len(valid_order)):
+                    p_pairs.add((valid_order[i], valid_order[j]))
         prepared_experts.append(
             {
                 "weight": exp["weight"],
@@ -235,87 +561,132 @@ def calculate_consensus_stream(expert_data, objects, obj_ids):
                 "name": exp["name"],
             }
         )
+    timings["prepare"] = time.perf_counter() - phase_start
 
-    # Trackers
-    best_k1_r = {"val": float("inf"), "solutions": []}
-    best_k2_r = {"val": float("inf"), "solutions": []}
-    best_k1_h = {"val": float("inf"), "solutions": []}
-    best_k2_h = {"val": float("inf"), "solutions": []}
-
-    def get_hamming(cand_pairs, exp_pairs):
-        return len(cand_pairs.symmetric_difference(exp_pairs))
-
-    def get_rank_dist(cand_ranks, exp_ranks):
-        d = 0
-        for oid in obj_ids:
-            r_exp = exp_ranks.get(oid, n + 1)
-            d += abs(cand_ranks[oid] - r_exp)
-        return d
+    def fmt(order):
+        return [{"id": oid, "name": objects[oid].name} for oid in order]
 
-    yield f"data: {json.dumps({'type': 'start', 'total': total_permutations})}\n\n"
+    # Bounded trackers: at most solution_limit ties kept per criterion
+    trackers = new_trackers(solution_limit, stream_solutions, count_ties)
+    start_position = 0
+    if resume:
+        trackers = resume["trackers"]
+        for tracker in trackers.values():
+            # Checkpoints saved before the trackers had these
+            tracker.setdefault("count_all", count_ties)
+            tracker.setdefault("count_exact", True)
+        start_position = resume["position"]
+        yield f"data: {json.dumps({'type': 'log', 'message': f'Resuming from candidate {start_position}.'})}\n\n"
+
+    warm = {}
+    if warm_start and not resume:
+        warm = warm_start_bounds(warm_start, expert_data, obj_ids, criteria)
+    if warm:
+        rescored = max(seed["rescored"] for seed in warm.values())
+        yield f"data: {json.dumps({'type': 'log', 'message': f'Warm start from the previous optimum, {rescored} expert rankings re-scored.'})}\n\n"
+        if solver not in HEURISTIC_SOLVERS:
+            # Every seed value is reached by an order, so nothing optimal is cut
+            for key, seed in warm.items():
+                trackers[key]["val"] = seed["val"]
+    bounded = branch_and_bound_criteria(criteria, n) if solver == "exact" else []
+    if bounded and not resume:
+        # Branch and bound prunes from its first node when it starts from an
+        # order local search found, instead of from the first order it meets
+        local = new_trackers()
+        for _ in heuristic_search(
+            prepared_experts, obj_ids, criteria=bounded, trackers=local
+        ):
+            pass
+        for key in bounded:
+            trackers[key]["val"] = min(trackers[key]["val"], local[key]["val"])
+
+    def drain_solutions():
+        for key in criteria:
+            reset, found = drain_pending(trackers[key])
+            for i in range(0, len(found), SOLUTION_CHUNK):
+                event = {
+                    "type": "solutions",
+                    "criterion": key,
+                    "val": trackers[key]["val"],
+                    # Ties sent earlier for this criterion are no longer optimal
+                    "reset": reset and i == 0,
+                    "solutions": [
+                        {"order": fmt(sol["order"]), "distances": sol["distances"]}
+                        for sol in found[i : i + SOLUTION_CHUNK]
+                    ],
+                }
+                yield f"data: {json.dumps(event)}\n\n"
+
+    if solver in HEURISTIC_SOLVERS:
+        total = len(criteria)
+        search = heuristic_search(
+            prepared_experts,
+            obj_ids,
+            solver,
+            criteria,
+            trackers,
+            starts={key: seed["order"] for key, seed in warm.items()},
+        )
+    elif solver == "exact":
+        total = total_permutations * len(criteria)
+        search = exact_search(prepared_experts, obj_ids, criteria, trackers)
+    elif solver == "sjt":
+        total = total_permutations
+        search = sjt_search(prepared_experts, obj_ids, trackers, criteria)
+    elif checkpoint and solver in ("exhaustive", "vectorized"):
+        total = total_permutations
+        engine = vectorized_search if solver == "vectorized" else exhaustive_search
+        search = chunked_search(
+            engine,
+            prepared_experts,
+            obj_ids,
+            trackers,
+            start=start_position,
+            on_chunk=checkpoint,
+            criteria=criteria,
+        )
+    elif workers > 1:
+        total = total_permutations
+        search = sharded_search(
+            prepared_experts,
+            obj_ids,
+            workers,
+            vectorized=solver == "vectorized",
+            trackers=trackers,
+            criteria=criteria,
+        )
+    elif solver == "vectorized":
+        total = total_permutations
+        search = vectorized_search(
+            prepared_experts, obj_ids, trackers=trackers, criteria=criteria
+        )
+    else:
+        total = total_permutations
+        search = exhaustive_search(
+            prepared_experts, obj_ids, trackers=trackers, criteria=criteria
+        )
 
-    count = 0
-    last_yield_time = time.time()
+    yield f"data: {json.dumps({'type': 'start', 'total': total})}\n\n"
 
-    for p_tuple in itertools.permutations(obj_ids):
-        count += 1
-        cand_order = list(p_tuple)
-        cand_ranks = {oid: i + 1 for i, oid in enumerate(cand_order)}
-
-        cand_pairs = set()
-        for i in range(n):
-            for j in range(i + 1, n):
-                cand_pairs.add((cand_order[i], cand_order[j]))
-
-        d_ranks_vector = []
-        d_hams_vector = []
-
-        sum_rank = 0
-        max_rank = 0
-        sum_ham = 0
-        max_ham = 0
-
-        for exp in prepared_experts:
-            dr = get_rank_dist(cand_ranks, exp["ranks"])
-            dh = get_hamming(cand_pairs, exp["pairs"])
-
-            d_ranks_vector.append(dr)
-            d_hams_vector.append(dh)
-
-            w = exp["weight"]
-            sum_rank += dr * w
-            sum_ham += dh * w
-
-            max_rank = max(max_rank, dr)
-            max_ham = max(max_ham, dh)
-
-        def update_best(tracker, val, order, dists):
-            if val < tracker["val"]:
-                tracker["val"] = val
-                tracker["solutions"] = [
-                    {"order": list(order), "distances": list(dists)}
-                ]
-            elif val == tracker["val"]:
-                tracker["solutions"].append(
-                    {"order": list(order), "distances": list(dists)}
-                )
-
-        update_best(best_k1_r, sum_rank, cand_order, d_ranks_vector)
-        update_best(best_k2_r, max_rank, cand_order, d_ranks_vector)
-        update_best(best_k1_h, sum_ham, cand_order, d_hams_vector)
-        update_best(best_k2_h, max_ham, cand_order, d_hams_vector)
-
-        if count % 2000 == 0:
-            now = time.time()
-            if now - last_yield_time > 0.2:
-                progress_data = {
-                    "type": "progress",
-                    "current": count,
-                    "total": total_permutations,
-                    "percent": round((count / total_permutations) * 100, 1),
-                }
-                yield f"data: {json.dumps(progress_data)}\n\n"
-                last_yield_time = now
+    phase_start = time.perf_counter()
+    trackers = yield from relay_progress(
+        search, total, drain_solutions if stream_solutions else None
+    )
+    timings["enumeration"] = time.perf_counter() - phase_start
+    if solver not in HEURISTIC_SOLVERS:
+        # Candidates covered in this run (all of them unless resumed)
+        covered = total - start_position
+        metrics.inc("ranking_consensus_candidates_total", covered, solver=solver)
+        metrics.inc(
+            "ranking_consensus_enumeration_seconds_total",
+            timings["enumeration"],
+            solver=solver,
+        )
+        metrics.set_gauge(
+            "ranking_consensus_candidates_per_second",
+            round(covered / max(timings["enumeration"], 1e-9)),
+            solver=solver,
+        )
 
     # Log completion
     end_time = time.time()
@@ -324,73 +695,14 @@ def calculate_consensus_stream(expert_data, objects, obj_ids):
 
     # --- FINAL PROCESSING ---
 
-    def fmt(order):
-        return [{"id": oid, "name": objects[oid].name} for oid in order]
-
-    def process_tracker_results(tracker):
-        final_solutions = []
-
-        for sol in tracker["solutions"]:
-            formatted_order = fmt(sol["order"])
-            center_ranks = {oid: i + 1 for i, oid in enumerate(sol["order"])}
-
-            local_metrics = []
-            total_inv_dist = 0
-
-            for exp in prepared_experts:
-                dist = get_rank_dist(center_ranks, exp["ranks"])
-                raw_comp = 1 / (1 + dist)
-                total_inv_dist += raw_comp
-
-                local_metrics.append(
-                    {
-                        "expert_name": exp["name"],
-                        "d_rank": dist,
-                        "raw_competence": raw_comp,
-                        "original_weight": exp["weight"],
-                    }
-                )
-
-            expert_stats = []
-            for em in local_metrics:
-                norm_comp = 0
-                if total_inv_dist > 0:
-                    norm_comp = em["raw_competence"] / total_inv_dist
-
-                expert_stats.append(
-                    {
-                        "expert_name": em.get("expert_name"),
-                        "d_rank": em.get("d_rank"),
-                        "input_weight": em.get(
-                            "original_weight"
-                        ),  # Ensure input weight is here
-                        "calculated_competence": round(norm_comp, 4),
-                    }
-                )
-
-            final_solutions.append(
-                {
-                    "order": formatted_order,
-                    "distances": sol["distances"],
-                    "expert_stats": expert_stats,
-                }
-            )
-
-        return final_solutions
-
-    # Prepare Inputs with Matrix
-    input_rankings_display = []
-    for exp in expert_data:
-        valid_order_ids = [o for o in exp["order"] if o in obj_ids]
-        # Generate NxN matrix for this specific subset of objects
-        mat = generate_matrix(exp["ranks"], obj_ids)
-        input_rankings_display.append(
-            {
-                "expert_name": exp["name"],
-                "order": fmt(valid_order_ids),
-                "matrix": mat,
-            }
-        )
+    # The expert rankings without their matrices, fetched on demand
+    input_rankings_display = [
+        {
+            "expert_name": exp["name"],
+            "order": fmt([o for o in exp["order"] if o in obj_ids]),
+        }
+        for exp in expert_data
+    ]
 
     result_payload = {
         "type": "result",
@@ -398,119 +710,417 @@ def calculate_consensus_stream(expert_data, objects, obj_ids):
         "expert_names": [e["name"] for e in prepared_experts],
         "objects_header": [objects[oid].name for oid in obj_ids],  # For matrix headers
         "execution_time": total_time,
-        "rankings": {
-            "k1_rank": process_tracker_results(best_k1_r),
-            "k2_rank": process_tracker_results(best_k2_r),
-            "k1_hamming": process_tracker_results(best_k1_h),
-            "k2_hamming": process_tracker_results(best_k2_h),
-        },
-        "criteria": {
-            "k1_rank": best_k1_r["val"],
-            "k2_rank": best_k2_r["val"],
-            "k1_hamming": best_k1_h["val"],
-            "k2_hamming": best_k2_h["val"],
-        },
+        "load_time": load_time,
+        "criteria": {key: trackers[key]["val"] for key in criteria},
+        # All tied optima, of which at most solution_limit are in rankings;
+        # only a lower bound where counts_exact is false
+        "solution_counts": {key: trackers[key]["count"] for key in criteria},
+        "counts_exact": {key: trackers[key]["count_exact"] for key in criteria},
+        "solution_limit": solution_limit,
     }
+    if warm:
+        result_payload["warm_start"] = {key: seed["val"] for key, seed in warm.items()}
+    if solver in HEURISTIC_SOLVERS:
+        # How far each heuristic value can be from the optimum
+        result_payload["bounds"] = {
+            key: {
+                "lower_bound": trackers[key]["lower_bound"],
+                "gap": trackers[key]["val"] - trackers[key]["lower_bound"],
+                "start": trackers[key]["start"],
+            }
+            for key in criteria
+        }
 
-    yield f"data: {json.dumps(result_payload)}\n\n"
+    if store:
+        # The solutions are stored and paged through consensus-results/<id>/
+        phase_start = time.perf_counter()
+        result_payload["result_id"] = store_consensus_result(
+            result_payload, trackers, expert_data, objects, obj_ids
+        )
+        timings["results"] = time.perf_counter() - phase_start
+
+    result_payload["timings"] = {k: round(v, 6) for k, v in timings.items()}
+    phases = ", ".join(f"{k} {v:.4f}s" for k, v in timings.items())
+    yield f"data: {json.dumps({'type': 'log', 'message': f'Phase timings: {phases}'})}\n\n"
+
+    if on_result:
+        on_result(result_payload, trackers)
+    phase_start = time.perf_counter()
+    result_event = f"data: {json.dumps(result_payload)}\n\n"
+    timings["serialization"] = time.perf_counter() - phase_start
+    for phase, seconds in timings.items():
+        metrics.observe("ranking_consensus_phase_seconds", seconds, phase=phase)
+    yield result_event
+    serialize_time = timings["serialization"]
+    yield f"data: {json.dumps({'type': 'log', 'message': f'Result serialized in {serialize_time:.4f} seconds.'})}\n\n"
+
+
+def cached_consensus_stream(result, load_time=None):
+    yield f"data: {json.dumps({'type': 'log', 'message': 'Inputs unchanged, result loaded from cache.'})}\n\n"
+    yield f"data: {json.dumps({**result, 'cached': True, 'load_time': load_time})}\n\n"
+
+
+def parse_flag(value, name):
+    """A JSON boolean, 0/1 or a "true"/"false" style string; raises ValueError."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if isinstance(value, str) and value.lower() in ("0", "false", "no", "off", ""):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def consensus_options(data):
+    """Validated solver options of a consensus request; raises ValueError.
+
+    Refuses the exact solver for more than CONSENSUS_EXACT_MAX_N objects
+    when a requested criterion would need branch and bound.
+    """
+    solver = data.get("solver", "exhaustive")
+    if solver not in CONSENSUS_SOLVERS + HEURISTIC_SOLVERS:
+        raise ValueError(f"unknown solver '{solver}'")
+    criteria = data.get("criteria") or CRITERIA
+    if not isinstance(criteria, list) or not all(
+        isinstance(key, str) for key in criteria
+    ):
+        raise ValueError("criteria must be a list of criterion names")
+    unknown = [key for key in criteria if key not in CRITERIA]
+    if unknown:
+        raise ValueError(f"unknown criteria {unknown}")
+    # Keep the canonical order whatever order the client sent
+    criteria = [key for key in CRITERIA if key in criteria]
+    try:
+        workers = int(data.get("workers", settings.CONSENSUS_WORKERS))
+    except (TypeError, ValueError):
+        raise ValueError("workers must be an integer")
+    workers = max(1, min(workers, os.cpu_count() or 1))
+    # 0 keeps every tied solution
+    try:
+        solution_limit = int(
+            data.get("solution_limit", settings.CONSENSUS_SOLUTION_LIMIT)
+        )
+    except (TypeError, ValueError):
+        raise ValueError("solution_limit must be an integer")
+    if solution_limit < 0:
+        raise ValueError("solution_limit must not be negative")
+    try:
+        limit_objects = int(data.get("limit_objects", 0))
+    except (TypeError, ValueError):
+        raise ValueError("limit_objects must be an integer")
+    if limit_objects < 0:
+        raise ValueError("limit_objects must not be negative")
+    weights = data.get("weights") or {}
+    try:
+        weights = {str(key): float(value) for key, value in weights.items()}
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("weights must map expert ids to numbers")
+    if not all(math.isfinite(w) for w in weights.values()):
+        raise ValueError("weights must map expert ids to numbers")
+    if solver == "exact":
+        # Refused up front: branch and bound past the limit could hold a
+        # worker for hours
+        n = RankedObject.objects.count()
+        if limit_objects:
+            n = min(n, limit_objects)
+        bounded = branch_and_bound_criteria(criteria, n)
+        if bounded and n > settings.CONSENSUS_EXACT_MAX_N:
+            raise ValueError(
+                f"the exact solver takes {', '.join(bounded)} for at most "
+                f"{settings.CONSENSUS_EXACT_MAX_N} objects, not {n}; set "
+                "limit_objects, leave these criteria out or use a heuristic "
+                "solver"
+            )
+    return {
+        "solver": solver,
+        "criteria": criteria,
+        "workers": workers,
+        "solution_limit": solution_limit or None,
+        "stream_solutions": parse_flag(
+            data.get("stream_solutions", False), "stream_solutions"
+        ),
+        "count_ties": parse_flag(data.get("count_ties", False), "count_ties"),
+        # Only select the inputs; popped before the options reach the solver
+        "limit_objects": limit_objects,
+        "weights": weights,
+    }
 
 
-@api_view(["POST"])
-def calculate_consensus(request):
-    custom_weights = request.data.get("weights", {})
-    limit = int(request.data.get("limit_objects", 0))
+def load_consensus_inputs(custom_weights, limit):
+    """Objects to rank and every expert's latest ranking."""
     all_objects = list(RankedObject.objects.all())
     if limit > 0 and len(all_objects) > limit:
         all_objects = all_objects[:limit]
-    elif limit == 0 and len(all_objects) > 9:
-        pass
     obj_ids = [o.id for o in all_objects]
     objects_map = {o.id: o for o in all_objects}
-    experts_db = Expert.objects.all()
+    # One join over the maintained latest rankings, whatever the expert count
+    experts_db = Expert.objects.filter(latest_ranking__isnull=False).select_related(
+        "latest_ranking"
+    )
     expert_data = []
     for expert in experts_db:
-        matrix = (
-            PairwiseMatrix.objects.filter(expert=expert).order_by("-created_at").first()
-        )
-        if not matrix:
-            continue
-        data = json.loads(matrix.matrix_json)
-        order = [int(x) for x in data.get("order", [])]
+        order = [int(x) for x in expert.latest_ranking.order]
         ranks_map = {oid: idx + 1 for idx, oid in enumerate(order)}
         expert_data.append(
             {
                 "name": expert.name,
                 "ranks": ranks_map,
                 "order": order,
-                "weight": float(custom_weights.get(str(expert.id), 1.0)),
+                "weight": custom_weights.get(str(expert.id), 1.0),
             }
         )
+    return objects_map, obj_ids, expert_data
+
 
-    response = StreamingHttpResponse(
-        calculate_consensus_stream(expert_data, objects_map, obj_ids),
-        content_type="text/event-stream",
+@api_view(["POST"])
+def calculate_consensus(request):
+    try:
+        options = consensus_options(request.data)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+    load_start = time.time()
+    objects_map, obj_ids, expert_data = load_consensus_inputs(
+        options.pop("weights"), options.pop("limit_objects")
     )
+    load_time = time.time() - load_start
+
+    key = consensus_cache_key(
+        expert_data,
+        objects_map,
+        obj_ids,
+        options["criteria"],
+        options["solution_limit"],
+        options["solver"],
+        options["count_ties"],
+    )
+    cached = get_cached_result(key)
+    if cached is not None and not result_exists(cached["result_id"]):
+        # Its stored solutions were pruned since, so compute it again
+        cached = None
+    if cached is not None:
+        stream = cached_consensus_stream(cached, load_time)
+    else:
+
+        def on_result(payload, trackers):
+            payload["cached"] = False
+            store_result(key, payload)
+            store_warm_start(obj_ids, warm_start_state(trackers, expert_data))
+
+        stream = calculate_consensus_stream(
+            expert_data,
+            objects_map,
+            obj_ids,
+            on_result=on_result,
+            load_time=load_time,
+            warm_start=get_warm_start(obj_ids),
+            **options,
+        )
+    if is_async_request(request):
+        # Off the event loop, cancelled when the client goes away
+        stream = async_event_stream(stream)
+
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
     response["Cache-Control"] = "no-cache"
     return response
 
 
 @api_view(["POST"])
-def run_shower_inference(request):
-    facts = request.data.get("facts", {})
-    f1, f2, f3, f4 = facts.get("f1"), facts.get("f2"), facts.get("f3"), facts.get("f4")
-    f5, f6, f7 = facts.get("f5"), facts.get("f6"), facts.get("f7")
-    logs = ["--- [Classic Lab 5] ---"]
-    updated_facts = facts.copy()
-    if f7:
-        return Response(
-            {
-                "facts": updated_facts,
-                "logs": logs,
-                "action": "NONE",
-                "explanation": {"active": False, "reasoning": "Norm."},
-            }
+def consensus_jobs_create(request):
+    """Queues a consensus run for manage.py consensus_worker instead of
+    computing it on the request; takes the calculate-consensus/ body."""
+    try:
+        options = consensus_options(request.data)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+    objects_map, obj_ids, expert_data = load_consensus_inputs(
+        options.pop("weights"), options.pop("limit_objects")
+    )
+    params = {
+        "experts": [
+            {"name": e["name"], "order": e["order"], "weight": e["weight"]}
+            for e in expert_data
+        ],
+        "objects": [[oid, objects_map[oid].name] for oid in obj_ids],
+        "options": options,
+    }
+    job = ConsensusJob.objects.create(params_json=json.dumps(params))
+    return Response(ConsensusJobSerializer(job).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(["GET"])
+def consensus_job_detail(request, job_id):
+    job = get_object_or_404(ConsensusJob, id=job_id)
+    return Response(ConsensusJobSerializer(job).data)
+
+
+def job_event_stream(job_id, last_event_id):
+    while True:
+        events = list(
+            ConsensusJobEvent.objects.filter(job_id=job_id, id__gt=last_event_id)
+            .order_by("id")[:500]
         )
-    if (not f4) and (not f7) and f1 and f5:
-        return Response(
-            {
-                "facts": {**updated_facts, "f5": False, "f7": True},
-                "logs": logs,
-                "action": "OPEN_COLD",
-                "explanation": {"active": True, "reasoning": "Hot->Open Cold"},
-            }
+        for event in events:
+            last_event_id = event.id
+            yield f"id: {event.id}\ndata: {event.data}\n\n"
+        if events:
+            continue
+        job_status = (
+            ConsensusJob.objects.filter(id=job_id)
+            .values_list("status", flat=True)
+            .first()
         )
-    if (not f3) and (not f7) and f2 and f6:
+        if job_status in ("done", "failed", None):
+            # The worker writes its last events before the final status
+            for event in ConsensusJobEvent.objects.filter(
+                job_id=job_id, id__gt=last_event_id
+            ).order_by("id"):
+                yield f"id: {event.id}\ndata: {event.data}\n\n"
+            return
+        # Lets an async consumer stop the replay while the job runs
+        yield ""
+        time.sleep(0.5)
+
+
+@api_view(["GET"])
+def consensus_job_events(request, job_id):
+    """SSE events of a job; reconnecting with Last-Event-ID (or
+    ?last_event_id=) replays only what the client missed."""
+    job = get_object_or_404(ConsensusJob, id=job_id)
+    last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get(
+        "last_event_id", 0
+    )
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        return Response({"error": "Last-Event-ID must be an integer"}, status=400)
+    stream = job_event_stream(job.id, last_event_id)
+    if is_async_request(request):
+        stream = async_event_stream(stream)
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@api_view(["GET"])
+def consensus_result_detail(request, result_id):
+    """The final event of a stored consensus run (criteria values and counts)."""
+    result = get_object_or_404(ConsensusResult, id=result_id)
+    return Response(result_summary(result))
+
+
+@api_view(["GET"])
+def consensus_result_solutions(request, result_id, criterion):
+    """A page of the stored tied solutions of one criterion, with expert
+    statistics; ?offset= and ?limit= select it."""
+    result = get_object_or_404(ConsensusResult, id=result_id)
+    summary = result_summary(result)
+    if criterion not in summary["criteria"]:
+        return Response({"error": f"criterion '{criterion}' not in result"}, status=400)
+    try:
+        offset = int(request.query_params.get("offset", 0))
+        limit = int(request.query_params.get("limit", PAGE_SIZE))
+    except ValueError:
+        return Response({"error": "offset and limit must be integers"}, status=400)
+    solutions, next_offset = solutions_page(result, criterion, offset, limit)
+    return Response(
+        {
+            "criterion": criterion,
+            "val": summary["criteria"][criterion],
+            "count": summary["solution_counts"][criterion],
+            # Results stored before counts could be lower bounds lack this
+            "count_exact": summary.get("counts_exact", {}).get(criterion, True),
+            "offset": offset,
+            "next_offset": next_offset,
+            "results": solutions,
+        }
+    )
+
+
+@api_view(["GET"])
+def consensus_result_matrix(request, result_id, expert_index):
+    """Pairwise matrix of one input ranking of a stored run, by its place
+    in the result's ``inputs``."""
+    result = get_object_or_404(ConsensusResult, id=result_id)
+    names, obj_ids, expert_data = result_inputs(result)
+    if not 0 <= expert_index < len(expert_data):
+        return Response({"error": "no such expert in result"}, status=404)
+    exp = expert_data[expert_index]
+    return Response(
+        {
+            "expert_name": exp["name"],
+            "headers": [names[oid] for oid in obj_ids],
+            "matrix": generate_matrix(exp["ranks"], obj_ids),
+        }
+    )
+
+
+@api_view(["GET"])
+def metrics_view(request):
+    """Prometheus scrape endpoint."""
+    log_counts = log_stats()
+    extra = [
+        "# HELP ranking_expert_log_entries Expert log entries by state.",
+        "# TYPE ranking_expert_log_entries gauge",
+    ] + [
+        f'ranking_expert_log_entries{{state="{state}"}} {count}'
+        for state, count in log_counts.items()
+    ]
+    return HttpResponse(
+        metrics.render(extra), content_type="text/plain; version=0.0.4"
+    )
+
+
+@api_view(["GET"])
+def metrics_profile(request, profile_id):
+    """cProfile summary of a request sent with the X-Profile header."""
+    profile = metrics.get_profile(profile_id)
+    if profile is None:
+        return Response({"error": "Profile not found"}, status=404)
+    return HttpResponse(profile, content_type="text/plain")
+
+
+@api_view(["POST"])
+def run_shower_inference(request):
+    return Response(shower.infer(request.data.get("facts", {})))
+
+
+@api_view(["POST"])
+def shower_inference_batch(request):
+    """shower-inference/ for a list of fact dicts, answered in one go."""
+    batch = request.data.get("facts")
+    if not isinstance(batch, list) or not all(isinstance(f, dict) for f in batch):
+        return Response({"error": "facts must be a list of objects"}, status=400)
+    if len(batch) > shower.MAX_BATCH:
         return Response(
-            {
-                "facts": {**updated_facts, "f6": False, "f7": True},
-                "logs": logs,
-                "action": "OPEN_HOT",
-                "explanation": {"active": True, "reasoning": "Cold->Open Hot"},
-            }
+            {"error": f"at most {shower.MAX_BATCH} fact sets per batch"}, status=400
         )
-    if f4 and (not f7) and f1 and f2 and f5:
+    return Response({"results": [shower.infer(facts) for facts in batch]})
+
+
+@api_view(["POST"])
+def shower_simulation(request):
+    """Runs the regulation loop server-side and returns the action trace.
+
+    Body: hot and cold valve levels (0-100), steps, the valve step size
+    and optionally the user's fixed feelings {f5, f6, f7}.
+    """
+    data = request.data
+    try:
+        hot = min(max(int(data.get("hot", 0)), 0), shower.VALVE_MAX)
+        cold = min(max(int(data.get("cold", 0)), 0), shower.VALVE_MAX)
+        steps = int(data.get("steps", 1))
+        step = int(data.get("step", shower.DEFAULT_STEP))
+    except (TypeError, ValueError):
         return Response(
-            {
-                "facts": {**updated_facts, "f5": False, "f7": True},
-                "logs": logs,
-                "action": "CLOSE_HOT",
-                "explanation": {"active": True, "reasoning": "Hot+ColdMax->Close Hot"},
-            }
+            {"error": "hot, cold, steps and step must be integers"}, status=400
         )
-    if f3 and (not f7) and f1 and f2 and f6:
+    if not 1 <= steps <= shower.MAX_STEPS:
         return Response(
-            {
-                "facts": {**updated_facts, "f6": False, "f7": True},
-                "logs": logs,
-                "action": "CLOSE_COLD",
-                "explanation": {"active": True, "reasoning": "Cold+HotMax->Close Cold"},
-            }
+            {"error": f"steps must be between 1 and {shower.MAX_STEPS}"}, status=400
         )
-    return Response(
-        {
-            "facts": updated_facts,
-            "logs": logs,
-            "action": "NONE",
-            "explanation": {"active": False, "reasoning": "No rule"},
-        }
-    )
+    feelings = data.get("feelings")
+    if feelings is not None:
+        feelings = {key: bool(feelings.get(key)) for key in ("f5", "f6", "f7")}
+    return Response(shower.simulate(hot, cold, steps, step, feelings))
@@ -55,11 +55,15 @@ export async function loadSampleObjects() {
 }
 
 export async function saveRanking(order, expertId) {
-  const res = await fetch(`${API_URL}/save-ranking/`, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ order, expertId }),
-  });
+  // Callers don't use the saved matrix, so skip having it built
+  const res = await fetch(
+    `${API_URL}/save-ranking/?fields=id,expert,created_at`,
+    {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ order, expertId }),
+    }
+  );
   return res.json();
 }
 
@@ -99,3 +103,35 @@ export async function runShowerInference(facts) {
   });
   return res.json();
 }
+
+export async function runShowerBatch(facts) {
+  const res = await fetch(`${API_URL}/shower-inference/batch/`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ facts }),
+  });
+  return res.json();
+}
+
+export async function runShowerSimulation({ hot, cold, steps, step, feelings }) {
+  const res = await fetch(`${API_URL}/shower-inference/simulate/`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ hot, cold, steps, step, feelings }),
+  });
+  return res.json();
+}
+
+export async function getConsensusSolutions(resultId, criterion, offset = 0) {
+  const res = await fetch(
+    `${API_URL}/consensus-results/${resultId}/solutions/${criterion}/?offset=${offset}`
+  );
+  return res.json();
+}
+
+export async function getConsensusMatrix(resultId, expertIndex) {
+  const res = await fetch(
+    `${API_URL}/consensus-results/${resultId}/experts/${expertIndex}/matrix/`
+  );
+  return res.json();
+}
@@ -1,5 +1,9 @@
 import React, { useState, useEffect, useRef } from "react";
-import { getExperts } from "../api";
+import {
+  getExperts,
+  getConsensusSolutions,
+  getConsensusMatrix,
+} from "../api";
 
 const ConsensusViewer = () => {
   const [experts, setExperts] = useState([]);
@@ -23,6 +27,8 @@ const ConsensusViewer = () => {
   const [logs, setLogs] = useState([]);
   const [selectedSolIdx, setSelectedSolIdx] = useState(0);
   const [matrixModalData, setMatrixModalData] = useState(null);
+  // Pages of stored solutions fetched so far, per criterion
+  const [solutionPages, setSolutionPages] = useState({});
   const logsEndRef = useRef(null);
 
   useEffect(() => {
@@ -39,6 +45,34 @@ const ConsensusViewer = () => {
     setSelectedSolIdx(0);
   }, [activeTab]);
 
+  // Solutions are stored on the server; fetch the first page of a tab
+  // when it is first shown
+  useEffect(() => {
+    if (!results?.result_id || results.rankings) return;
+    if (solutionPages[activeTab]) return;
+    loadSolutions(activeTab, 0);
+  }, [results, activeTab]);
+
+  const loadSolutions = async (criterion, offset) => {
+    try {
+      const page = await getConsensusSolutions(
+        results.result_id,
+        criterion,
+        offset
+      );
+      if (page.error) throw new Error(page.error);
+      setSolutionPages((prev) => ({
+        ...prev,
+        [criterion]: {
+          results: [...(prev[criterion]?.results || []), ...page.results],
+          next_offset: page.next_offset,
+        },
+      }));
+    } catch (e) {
+      console.error(e);
+    }
+  };
+
   // Auto-scroll logs to bottom
   useEffect(() => {
     if (logsEndRef.current) {
@@ -50,10 +84,21 @@ const ConsensusViewer = () => {
     setWeights((prev) => ({ ...prev, [id]: val }));
   };
 
-  const openMatrixModal = (expertInput) => {
+  const openMatrixModal = async (expertInput, idx) => {
+    let matrix = expertInput.matrix;
+    if (!matrix) {
+      try {
+        const data = await getConsensusMatrix(results.result_id, idx);
+        if (data.error) throw new Error(data.error);
+        matrix = data.matrix;
+      } catch (e) {
+        console.error(e);
+        return;
+      }
+    }
     setMatrixModalData({
       name: expertInput.expert_name,
-      matrix: expertInput.matrix,
+      matrix,
       headers: results.objects_header || [],
     });
   };
@@ -67,7 +112,7 @@ const ConsensusViewer = () => {
     let csvContent = "\uFEFF";
     const sep = ";";
 
-    const solutions = results.rankings ? results.rankings[activeTab] : [];
+    const solutions = currentSolutions;
     if (!solutions || solutions.length === 0) return;
 
     const currentSol = solutions[selectedSolIdx];
@@ -120,6 +165,7 @@ const ConsensusViewer = () => {
   const startCalculation = async () => {
     setLoading(true);
     setResults(null);
+    setSolutionPages({});
     setProgress(0);
     setLogs([]); // Reset logs
     setStatusText("Ініціалізація...");
@@ -264,7 +310,10 @@ const ConsensusViewer = () => {
     return "Максимум (MinMax)";
   };
 
-  const currentSolutions = results?.rankings?.[activeTab] || [];
+  // Results saved before solutions were stored server-side carry them inline
+  const currentSolutions =
+    results?.rankings?.[activeTab] || solutionPages[activeTab]?.results || [];
+  const nextOffset = solutionPages[activeTab]?.next_offset;
   const currentSelectedSolution = currentSolutions[selectedSolIdx];
   const currentStats = currentSelectedSolution?.expert_stats || [];
 
@@ -283,6 +332,7 @@ const ConsensusViewer = () => {
             <button
               onClick={() => {
                 setResults(null);
+                setSolutionPages({});
                 setLogs([]);
                 localStorage.removeItem("consensusResults");
               }}
@@ -404,7 +454,7 @@ const ConsensusViewer = () => {
                       <strong>{exp.expert_name}</strong>
                       <button
                         className="matrix-btn"
-                        onClick={() => openMatrixModal(exp)}
+                        onClick={() => openMatrixModal(exp, idx)}
                       >
                         Matrix
                       </button>
@@ -474,7 +524,10 @@ const ConsensusViewer = () => {
                 fontStyle: "italic",
               }}
             >
-              Знайдено {currentSolutions.length} оптимальних розв'язків.
+              Знайдено{" "}
+              {results.counts_exact?.[activeTab] === false && "≥ "}
+              {results.solution_counts?.[activeTab] ?? currentSolutions.length}{" "}
+              оптимальних розв'язків.
               <span style={{ color: "#fff", marginLeft: "5px" }}>
                 Клікніть на картку, щоб перерахувати компетентність.
               </span>
@@ -492,6 +545,14 @@ const ConsensusViewer = () => {
                 />
               ))}
             </div>
+            {nextOffset != null && (
+              <button
+                className="matrix-btn"
+                onClick={() => loadSolutions(activeTab, nextOffset)}
+              >
+                Показати ще
+              </button>
+            )}
           </div>
           <hr style={{ borderColor: "#333", margin: "30px 0" }} />
           <div className="competence-section">
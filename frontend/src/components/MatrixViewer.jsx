@@ -1,6 +1,12 @@
 import React, { useState, useEffect } from "react";
 import { getMatrices, getExperts, getCollectiveCSVUrl } from "../api";
 
+// matrix_json comes as an object; older responses sent it as a JSON string
+const matrixData = (matrixObj) =>
+  typeof matrixObj.matrix_json === "string"
+    ? JSON.parse(matrixObj.matrix_json)
+    : matrixObj.matrix_json;
+
 function MatrixViewer() {
   const [allMatrices, setAllMatrices] = useState([]); // Всі завантажені
   const [filteredMatrix, setFilteredMatrix] = useState(null); // Обрана для показу
@@ -54,7 +60,7 @@ function MatrixViewer() {
 
   const exportMatrix = () => {
     if (!filteredMatrix) return;
-    const data = JSON.parse(filteredMatrix.matrix_json);
+    const data = matrixData(filteredMatrix);
     const sortedIds = [...data.order]
       .map((x) => Number(x))
       .sort((a, b) => a - b);
@@ -174,18 +180,18 @@ function MatrixContent({
   loadData,
   exportMatrix,
 }) {
-  const matrixData = JSON.parse(matrixObj.matrix_json);
-  const sortedIds = [...matrixData.order]
+  const data = matrixData(matrixObj);
+  const sortedIds = [...data.order]
     .map((x) => Number(x))
     .sort((a, b) => a - b);
-  const sortedPairs = [...matrixData.pairs].sort((a, b) =>
+  const sortedPairs = [...data.pairs].sort((a, b) =>
     a[0] !== b[0] ? a[0] - b[0] : a[1] - b[1]
   );
 
   const fullMatrix = Array(sortedIds.length)
     .fill(null)
     .map(() => Array(sortedIds.length).fill(0));
-  matrixData.pairs.forEach(([i, j, value]) => {
+  data.pairs.forEach(([i, j, value]) => {
     const idxI = sortedIds.indexOf(Number(i));
     const idxJ = sortedIds.indexOf(Number(j));
     if (idxI !== -1 && idxJ !== -1) {
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import { runShowerInference } from "../api";
+import { runShowerInference, runShowerSimulation } from "../api";
 import Valve from "./Valve";
 import Thermometer from "./Thermometer";
 
@@ -265,6 +265,38 @@ export default function ShowerExpertSystem() {
     }
   };
 
+  // Whole regulation loop in one request; the server stops once stable
+  const handleSimulate = async () => {
+    try {
+      const res = await runShowerSimulation({
+        hot: hotLevel,
+        cold: coldLevel,
+        steps: 50,
+        step: facts.f8,
+        feelings: userOverride
+          ? { f5: facts.f5, f6: facts.f6, f7: facts.f7 }
+          : undefined,
+      });
+      if (res.error) throw new Error(res.error);
+      const timestamp = new Date().toLocaleTimeString();
+      const entries = res.trace.map(
+        (t) => `[${timestamp}] #${t.tick} ${t.action}`
+      );
+      setLogs((prev) => [...entries.reverse(), ...prev]);
+
+      const last = res.trace[res.trace.length - 1];
+      if (last) {
+        setLastAction(last.action);
+        setExplanation(last.explanation);
+      }
+      setHotLevel(res.hot);
+      setColdLevel(res.cold);
+    } catch (e) {
+      console.error(e);
+      alert("Помилка API");
+    }
+  };
+
   const resetSystem = () => {
     setUserOverride(false);
     setColdLevel(0);
@@ -772,6 +804,20 @@ export default function ShowerExpertSystem() {
               >
                 Виконати крок регулювання (AI)
               </button>
+              <button
+                onClick={handleSimulate}
+                style={{
+                  padding: "14px 20px",
+                  backgroundColor: "#333",
+                  color: "#fff",
+                  border: "none",
+                  borderRadius: "10px",
+                  cursor: "pointer",
+                }}
+                title="Регулювати до стабілізації"
+              >
+                ⏩
+              </button>
               <button
                 onClick={resetSystem}
                 style={{